@@ -1 +1,20 @@
-#JWT and token-related business logic
\ No newline at end of file
+#JWT and token-related business logic
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class QueryOrCookieJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that falls back to the `access_token` cookie, then the
+    `access_token` query parameter, when there is no Authorization header.
+    For clients that cannot set headers (EventSource); only use it on GET views.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        raw_token = request.COOKIES.get("access_token") or request.query_params.get("access_token")
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
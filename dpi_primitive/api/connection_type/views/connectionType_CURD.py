@@ -29,6 +29,7 @@ from django.http import JsonResponse
 from django.utils.dateparse import parse_datetime
 from datetime import datetime
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.resource_helper.access_resource_helper import delete_clearing_root_inode
 from django.utils import timezone
 
 
@@ -211,9 +212,9 @@ def edit_delete_connectiontype_details(request):
                     status=400,
                 )
 
-            ConnectionType.objects.get(
+            delete_clearing_root_inode(ConnectionType.objects.get(
                 connection_type_id=connection_type_id
-            ).delete()
+            ))
 
             return JsonResponse(
                 {"success": True, "message": "ConnectionType deleted successfully"},
@@ -0,0 +1,187 @@
+import re
+
+from django.db import transaction
+
+from api.models import Connection, ConnectionTermValue
+
+# Structured copy of Connection.terms_value / terms_value_reverse. Each term is
+# stored as "<value>; <status>", where value is "label|xnode_id" once something
+# was shared for it and status is T (approved), F (pending) or R (rejected);
+# "canShareMoreData" holds extra entries as {"enter_value", "purpose", "typeOfShare"}.
+# sync_term_values keeps ConnectionTermValue in step with the JSON on save, and
+# the readers below query the rows instead of re-parsing the strings. The
+# per-direction status counts are also stored on Connection (set_terms_status,
+# called by Connection.save) so status polls read a single row.
+
+STATUS_SUFFIX = re.compile(r";\s*([TFR])$")
+EXTRA_DATA_KEY = "canShareMoreData"
+SYNCED_FIELDS = ("value", "xnode_id", "status", "share_type")
+TERMS_STATUS_COLUMNS = [column for columns in Connection.TERMS_STATUS_FIELDS.values() for column in columns.values()]
+
+
+def parse_term_value(raw):
+    """(value, xnode_id, status) of a stored term string; status is "" when it has none."""
+    text = raw.strip()
+    value, status = text, ""
+    match = STATUS_SUFFIX.search(text)
+    if match:
+        value, status = text[:match.start()].strip(), match.group(1)
+
+    xnode_id = None
+    parts = value.split("|")
+    if len(parts) == 2 and parts[1].strip().isdigit():
+        xnode_id = int(parts[1])
+    return value, xnode_id, status
+
+
+def term_value_rows(connection, model=ConnectionTermValue, fields=None):
+    """
+    Unsaved rows (of model, the historical one in migrations) for the terms
+    JSON of connection, in JSON order; fields limits them to some terms fields.
+    """
+    rows = []
+    for direction, field in ConnectionTermValue.TERMS_FIELDS.items():
+        if fields is not None and field not in fields:
+            continue
+        terms = getattr(connection, field) or {}
+        if not isinstance(terms, dict):
+            continue
+        for term, raw in terms.items():
+            if term == EXTRA_DATA_KEY:
+                continue
+            if isinstance(raw, str):
+                rows.append(_row(model, connection, direction, term, raw))
+        extra_data = terms.get(EXTRA_DATA_KEY)
+        if isinstance(extra_data, dict):
+            for term, entry in extra_data.items():
+                if isinstance(entry, dict) and isinstance(entry.get("enter_value", ""), str):
+                    share_type = entry.get("typeOfShare") or ""
+                    rows.append(
+                        _row(model, connection, direction, term, entry.get("enter_value", ""), extra=True, share_type=str(share_type).lower())
+                    )
+    return rows
+
+
+def _row(model, connection, direction, term, raw, extra=False, share_type=""):
+    value, xnode_id, status = parse_term_value(raw)
+    return model(
+        connection_id=connection.pk,
+        direction=direction,
+        term=term[:255],
+        extra=extra,
+        share_type=share_type[:20],
+        value=value,
+        xnode_id=xnode_id,
+        status=status,
+    )
+
+
+def sync_term_values(connection, fields=None):
+    """
+    Brings the ConnectionTermValue rows of connection in line with its terms
+    JSON, writing only what changed (a save that did not touch the terms costs
+    one indexed read). fields limits it to some of the terms fields, e.g. the
+    ones a save(update_fields=...) wrote. Returns True when rows were written.
+    """
+    directions = [
+        direction for direction, field in ConnectionTermValue.TERMS_FIELDS.items() if fields is None or field in fields
+    ]
+    wanted = {(row.direction, row.extra, row.term): row for row in term_value_rows(connection, fields=fields)}
+    with transaction.atomic(savepoint=False):
+        existing = {
+            (row.direction, row.extra, row.term): row
+            for row in ConnectionTermValue.objects.filter(connection_id=connection.pk, direction__in=directions)
+        }
+        stale = [row.pk for key, row in existing.items() if key not in wanted]
+        created = [row for key, row in wanted.items() if key not in existing]
+        changed = []
+        for key, row in wanted.items():
+            current = existing.get(key)
+            if current is not None and any(getattr(current, f) != getattr(row, f) for f in SYNCED_FIELDS):
+                for f in SYNCED_FIELDS:
+                    setattr(current, f, getattr(row, f))
+                changed.append(current)
+
+        if stale:
+            ConnectionTermValue.objects.filter(pk__in=stale).delete()
+        if created:
+            ConnectionTermValue.objects.bulk_create(created)
+        if changed:
+            ConnectionTermValue.objects.bulk_update(changed, SYNCED_FIELDS)
+    return bool(stale or created or changed)
+
+
+def approved_term_values(connection, xnode_id=None, extra=None):
+    """Approved rows with an xnode of connection: guest-to-host first, terms before extra entries."""
+    queryset = ConnectionTermValue.objects.filter(
+        connection=connection, status=ConnectionTermValue.APPROVED, xnode_id__isnull=False
+    )
+    if xnode_id is not None:
+        queryset = queryset.filter(xnode_id=xnode_id)
+    if extra is not None:
+        queryset = queryset.filter(extra=extra)
+    return queryset.order_by("direction", "extra", "id")
+
+
+def stored_terms_status(field, connection_name, host_user_username, host_locker_name, guest_user_username, guest_locker_name):
+    """
+    Stored status counts of one terms field ("terms_value" or
+    "terms_value_reverse") of the connection, in one query; None when there is
+    no such connection.
+    """
+    columns = Connection.TERMS_STATUS_FIELDS[field]
+    row = (
+        Connection.objects.filter(
+            connection_name=connection_name,
+            host_user__username=host_user_username,
+            host_locker__name=host_locker_name,
+            host_locker__user__username=host_user_username,
+            guest_user__username=guest_user_username,
+            guest_locker__name=guest_locker_name,
+            guest_locker__user__username=guest_user_username,
+        )
+        .values(*columns.values())
+        .first()
+    )
+    if row is None:
+        return None
+    return {key: row[column] for key, column in columns.items()}
+
+
+def summarize_term_values(rows):
+    """{direction: {"count_T", "count_F", "count_R", "empty", "filled"}} of unsaved rows (term_value_rows), extra entries excluded."""
+    counts = {direction: {} for direction in ConnectionTermValue.TERMS_FIELDS}
+    for row in rows:
+        if row.extra:
+            continue
+        side = counts[row.direction]
+        if row.status:
+            side[f"count_{row.status}"] = side.get(f"count_{row.status}", 0) + 1
+        key = "filled" if row.value else "blank"
+        side[key] = side.get(key, 0) + 1
+    return {direction: _summary(side) for direction, side in counts.items()}
+
+
+def set_terms_status(connection, model=ConnectionTermValue, fields=None):
+    """Sets the stored status counts of connection (of the terms fields in fields) from its terms JSON (not saved)."""
+    summaries = summarize_term_values(term_value_rows(connection, model=model, fields=fields))
+    for direction, field in ConnectionTermValue.TERMS_FIELDS.items():
+        if fields is not None and field not in fields:
+            continue
+        for key, column in Connection.TERMS_STATUS_FIELDS[field].items():
+            setattr(connection, column, summaries[direction][key])
+
+
+def _summary(counts):
+    # "empty" follows the original string count: terms without a value when no
+    # term has a status, otherwise the statused terms minus the filled ones
+    count_T, count_F, count_R = counts.get("count_T", 0), counts.get("count_F", 0), counts.get("count_R", 0)
+    filled = counts.get("filled", 0)
+    total_terms = count_T + count_F + count_R
+    return {
+        "count_T": count_T,
+        "count_F": count_F,
+        "count_R": count_R,
+        "empty": total_terms - filled if total_terms > 0 else counts.get("blank", 0),
+        "filled": filled,
+    }
@@ -1,3 +1,266 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from api.connections.services.term_values import (
+    TERMS_STATUS_COLUMNS,
+    parse_term_value,
+    summarize_term_values,
+    sync_term_values,
+    term_value_rows,
+)
+from api.models import Connection, ConnectionTermValue, ConnectionType, CustomUser, Locker
+
+
+def string_terms_status(terms_value):
+    # compute_terms_status as it was before the counts were stored: parses the
+    # "<value>; <status>" strings of one terms field
+    count_T = count_F = count_R = filled = empty = 0
+    if terms_value:
+        for key, value in terms_value.items():
+            if key == "canShareMoreData":
+                continue
+            value = value.strip()
+            if value.endswith("; T") or value.endswith(";T"):
+                count_T += 1
+            elif value.endswith("; F") or value.endswith(";F"):
+                count_F += 1
+            elif value.endswith("; R") or value.endswith(";R"):
+                count_R += 1
+            stripped_value = (
+                value.rstrip("; T").rstrip(";T").rstrip("; F").rstrip(";F").rstrip("; R").rstrip(";R").strip()
+            )
+            if stripped_value:
+                filled += 1
+            else:
+                empty += 1
+        total_terms = count_T + count_F + count_R
+        if total_terms > 0:
+            empty = total_terms - filled
+    return {"count_T": count_T, "count_F": count_F, "count_R": count_R, "empty": empty, "filled": filled}
+
+
+def status(count_T=0, count_F=0, count_R=0, empty=0, filled=0):
+    return {"count_T": count_T, "count_F": count_F, "count_R": count_R, "empty": empty, "filled": filled}
+
+
+class ParseTermValueTests(SimpleTestCase):
+    CASES = [
+        # raw, (value, xnode_id, status)
+        ("", ("", None, "")),
+        ("; F", ("", None, "F")),
+        (";F", ("", None, "F")),
+        ("; T", ("", None, "T")),
+        ("doc|12; T", ("doc|12", 12, "T")),
+        ("doc|13;R", ("doc|13", 13, "R")),
+        ("  doc|14; F  ", ("doc|14", 14, "F")),
+        ("doc|15", ("doc|15", 15, "")),
+        ("doc|abc; T", ("doc|abc", None, "T")),
+        ("a|1|2; T", ("a|1|2", None, "T")),
+        ("free text", ("free text", None, "")),
+        ("value; X", ("value; X", None, "")),
+    ]
+
+    def test_parse(self):
+        for raw, expected in self.CASES:
+            with self.subTest(raw=raw):
+                self.assertEqual(parse_term_value(raw), expected)
+
+
+class TermsStatusTests(SimpleTestCase):
+    # terms_value, expected summary; every case must also match the old string count
+    CASES = [
+        ({}, status()),
+        ({"a": "", "b": ""}, status(empty=2)),
+        ({"a": "doc|1"}, status(filled=1)),
+        ({"a": "; F", "b": ";F"}, status(count_F=2, empty=2)),
+        ({"a": "doc|1; T", "b": "; F"}, status(count_T=1, count_F=1, empty=1, filled=1)),
+        ({"a": "doc|1; T", "b": "doc|2;R", "c": "doc|3; F"}, status(count_T=1, count_F=1, count_R=1, filled=3)),
+        ({"a": "doc|1; T", "b": ""}, status(count_T=1, filled=1)),
+        ({"a": "doc|1; T", "b": "doc|2"}, status(count_T=1, filled=2, empty=-1)),
+        (
+            {
+                "a": "doc|1; T",
+                "canShareMoreData": {"x": {"enter_value": "doc|2; F", "purpose": "p", "typeOfShare": "Share"}},
+            },
+            status(count_T=1, filled=1),
+        ),
+    ]
+
+    def summaries(self, terms_value, terms_value_reverse):
+        connection = Connection(terms_value=terms_value, terms_value_reverse=terms_value_reverse)
+        return summarize_term_values(term_value_rows(connection))
+
+    def test_counts_match_string_count(self):
+        for terms, expected in self.CASES:
+            with self.subTest(terms=terms):
+                self.assertEqual(string_terms_status(terms), expected)
+                summaries = self.summaries(terms, {})
+                self.assertEqual(summaries[ConnectionTermValue.GUEST_TO_HOST], expected)
+                self.assertEqual(summaries[ConnectionTermValue.HOST_TO_GUEST], status())
+
+    def test_directions_are_counted_apart(self):
+        for terms, expected in self.CASES:
+            with self.subTest(terms=terms):
+                summaries = self.summaries({"z": "doc|9; R"}, terms)
+                self.assertEqual(summaries[ConnectionTermValue.GUEST_TO_HOST], status(count_R=1, filled=1))
+                self.assertEqual(summaries[ConnectionTermValue.HOST_TO_GUEST], expected)
+
+
+class ConnectionFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        host = CustomUser.objects.create(username="host", email="host@example.com")
+        guest = CustomUser.objects.create(username="guest", email="guest@example.com")
+        host_locker = Locker.objects.create(name="host-locker", user=host)
+        guest_locker = Locker.objects.create(name="guest-locker", user=guest)
+        connection_type = ConnectionType.objects.create(
+            connection_type_name="type", owner_user=host, owner_locker=host_locker
+        )
+        cls.connection = Connection.objects.create(
+            connection_name="conn",
+            connection_type=connection_type,
+            host_user=host,
+            host_locker=host_locker,
+            guest_user=guest,
+            guest_locker=guest_locker,
+        )
+
+    def set_terms(self, terms_value, terms_value_reverse=None):
+        # Writes the JSON without Connection.save, so nothing is synced yet
+        Connection.objects.filter(pk=self.connection.pk).update(
+            terms_value=terms_value, terms_value_reverse=terms_value_reverse or {}
+        )
+        self.connection.refresh_from_db()
+
+    def stored_rows(self):
+        return {
+            (row.direction, row.extra, row.term): (row.value, row.xnode_id, row.status)
+            for row in ConnectionTermValue.objects.filter(connection=self.connection)
+        }
+
+
+class SyncTermValuesTests(ConnectionFixtureMixin, TestCase):
+    G2H, H2G = ConnectionTermValue.GUEST_TO_HOST, ConnectionTermValue.HOST_TO_GUEST
+
+    # (terms_value, terms_value_reverse) applied in order, with the rows expected after each sync
+    STEPS = [
+        (
+            "create",
+            {"a": "; F", "b": "doc|1; T"},
+            {"c": ""},
+            {
+                (G2H, False, "a"): ("", None, "F"),
+                (G2H, False, "b"): ("doc|1", 1, "T"),
+                (H2G, False, "c"): ("", None, ""),
+            },
+        ),
+        (
+            "update",
+            {"a": "doc|2; T", "b": "doc|1; T"},
+            {"c": ""},
+            {
+                (G2H, False, "a"): ("doc|2", 2, "T"),
+                (G2H, False, "b"): ("doc|1", 1, "T"),
+                (H2G, False, "c"): ("", None, ""),
+            },
+        ),
+        (
+            "delete and add extra",
+            {"a": "doc|2; T", "canShareMoreData": {"x": {"enter_value": "doc|3; F", "typeOfShare": "Share"}}},
+            {},
+            {
+                (G2H, False, "a"): ("doc|2", 2, "T"),
+                (G2H, True, "x"): ("doc|3", 3, "F"),
+            },
+        ),
+        ("clear", {}, {}, {}),
+    ]
+
+    def test_steps(self):
+        sync_term_values(self.connection)
+        for label, terms_value, terms_value_reverse, expected in self.STEPS:
+            with self.subTest(step=label):
+                before = {
+                    (row.direction, row.extra, row.term): row.pk
+                    for row in ConnectionTermValue.objects.filter(connection=self.connection)
+                }
+                self.set_terms(terms_value, terms_value_reverse)
+                self.assertTrue(sync_term_values(self.connection))
+                self.assertEqual(self.stored_rows(), expected)
+                # Rows that stay are updated in place, not recreated
+                after = {
+                    (row.direction, row.extra, row.term): row.pk
+                    for row in ConnectionTermValue.objects.filter(connection=self.connection)
+                }
+                for key in before.keys() & after.keys():
+                    self.assertEqual(before[key], after[key])
+                # A second sync has nothing to write
+                self.assertFalse(sync_term_values(self.connection))
+
+    def test_save_syncs_rows(self):
+        self.connection.terms_value = {"a": "doc|5; T"}
+        self.connection.save()
+        self.assertEqual(self.stored_rows(), {(self.G2H, False, "a"): ("doc|5", 5, "T")})
+
+    def test_update_fields_limit_the_synced_direction(self):
+        self.connection.terms_value = {"a": "doc|5; T"}
+        self.connection.terms_value_reverse = {"b": "doc|6; T"}
+        self.connection.save(update_fields=["terms_value"])
+        self.assertEqual(self.stored_rows(), {(self.G2H, False, "a"): ("doc|5", 5, "T")})
+        self.connection.save(update_fields=["connection_status"])
+        self.assertEqual(self.stored_rows(), {(self.G2H, False, "a"): ("doc|5", 5, "T")})
+        self.connection.save()
+        self.assertEqual(
+            self.stored_rows(),
+            {(self.G2H, False, "a"): ("doc|5", 5, "T"), (self.H2G, False, "b"): ("doc|6", 6, "T")},
+        )
+
+
+class StoredTermsStatusTests(ConnectionFixtureMixin, TestCase):
+    def stored_status(self):
+        connection = Connection.objects.only(*TERMS_STATUS_COLUMNS).get(pk=self.connection.pk)
+        return connection.terms_status()
+
+    # update_fields given to save, and whether the stored counts change
+    CASES = [
+        (None, True),
+        (["terms_value"], True),
+        (["terms_value_reverse"], True),
+        (["terms_value", "connection_status"], True),
+        (["connection_status"], False),
+    ]
+
+    def test_update_fields(self):
+        for update_fields, counts_written in self.CASES:
+            with self.subTest(update_fields=update_fields):
+                self.set_terms({"a": "; F"}, {"b": "; F"})
+                self.connection.save()
+                before = self.stored_status()
+
+                self.connection.terms_value = {"a": "doc|1; T", "b": "; R"}
+                self.connection.terms_value_reverse = {"b": "doc|2; T"}
+                self.connection.save(update_fields=update_fields)
+
+                # The stored counts always describe the JSON in the row
+                saved = Connection.objects.get(pk=self.connection.pk)
+                stored = self.stored_status()
+                self.assertEqual(
+                    stored,
+                    (string_terms_status(saved.terms_value), string_terms_status(saved.terms_value_reverse)),
+                )
+                self.assertEqual(stored != before, counts_written)
+
+    def test_deferred_terms_leave_counts_alone(self):
+        self.set_terms({"a": "doc|1; T"})
+        self.connection.save()
+        before = self.stored_status()
+        connection = Connection.objects.only("connection_id", "connection_status").get(pk=self.connection.pk)
+        connection.save()
+        self.assertEqual(self.stored_status(), before)
+
+    def test_deferred_reverse_terms(self):
+        self.set_terms({"a": "; F"}, {"b": "doc|2; T"})
+        self.connection.save()
+        connection = Connection.objects.defer("terms_value_reverse").get(pk=self.connection.pk)
+        connection.terms_value = {"a": "doc|1; T"}
+        connection.save()
+        self.assertEqual(self.stored_status(), (status(count_T=1, filled=1), status(count_T=1, filled=1)))
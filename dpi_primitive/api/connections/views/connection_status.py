@@ -176,12 +176,7 @@ def update_connection_status_if_expired_onlogin(request):
                     continue
 
 
-                terms_value = connection.terms_value or {}
-                terms_value_reverse = connection.terms_value_reverse or {}
-
-                
-                summary = compute_terms_status(terms_value)
-                summary_reverse = compute_terms_status(terms_value_reverse)
+                summary, summary_reverse = compute_terms_status(connection)
 
                 count_T = summary["count_T"]
                 count_F = summary["count_F"]
@@ -318,11 +313,7 @@ def update_connection_status_tolive(request):
                 "status": connection.connection_status,
             })
 
-        terms_value = connection.terms_value or {}
-        terms_value_reverse = connection.terms_value_reverse or {}
-
-        summary = compute_terms_status(terms_value)
-        summary_reverse = compute_terms_status(terms_value_reverse)
+        summary, summary_reverse = compute_terms_status(connection)
 
         count_T = summary["count_T"]
         count_F = summary["count_F"]
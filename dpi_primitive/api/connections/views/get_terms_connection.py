@@ -27,6 +27,8 @@ from api.serializers import ResourceSerializer, LockerSerializer, UserSerializer
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.http import HttpRequest, JsonResponse, FileResponse, HttpResponse
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.xnode.xnode_helper import compute_terms_status
+from api.connections.services.term_values import stored_terms_status
 
 
 
@@ -379,6 +381,18 @@ def get_terms_status(request):
                 {"success": False, "error": "All fields are required"}, status=400
             )
 
+        summary = stored_terms_status(
+            "terms_value",
+            connection_name,
+            host_user_username,
+            host_locker_name,
+            guest_user_username,
+            guest_locker_name,
+        )
+        if summary is not None:
+            return JsonResponse({"success": True, **summary}, status=200)
+
+        # No such connection: report which part is missing
         try:
             host_user = CustomUser.objects.get(username=host_user_username)
             host_locker = Locker.objects.get(name=host_locker_name, user=host_user)
@@ -405,67 +419,9 @@ def get_terms_status(request):
                 {"success": False, "error": f"User not found: {e}"}, status=400
             )
 
-        count_T = 0
-        count_F = 0
-        count_R = 0
-        filled = 0
-        empty = 0
-
-        terms_value = connection.terms_value
-
-        # Handle case when terms_value is empty
-        if terms_value:
-            # Exclude 'canShareMoreData' from terms_value
-            filtered_terms = {
-                key: value
-                for key, value in terms_value.items()
-                if key != "canShareMoreData"
-            }
+        summary = compute_terms_status(connection)[0]
 
-            for key, value in filtered_terms.items():
-                value = value.strip()
-                if value.endswith("; T") or value.endswith(";T"):
-                    count_T += 1
-                elif value.endswith("; F") or value.endswith(";F"):
-                    count_F += 1
-                elif value.endswith("; R") or value.endswith(";R"):
-                    count_R += 1
-
-                stripped_value = (
-                    value.rstrip("; T")
-                    .rstrip(";T")
-                    .rstrip("; F")
-                    .rstrip(";F")
-                    .rstrip("; R")
-                    .rstrip(";R")
-                    .strip()
-                )
-                if stripped_value:
-                    filled += 1
-                else:
-                    empty += 1
-
-            # Calculate the number of empty terms based on the total count
-            total_terms = count_T + count_F + count_R
-            if total_terms > 0:
-                empty = total_terms - filled
-        else:
-            # If terms_value is empty, assume all expected terms are empty
-            total_terms = count_T + count_F + count_R
-            empty = total_terms
-            filled = 0
-
-        return JsonResponse(
-            {
-                "success": True,
-                "count_T": count_T,
-                "count_F": count_F,
-                "count_R": count_R,
-                "empty": empty,
-                "filled": filled,
-            },
-            status=200,
-        )
+        return JsonResponse({"success": True, **summary}, status=200)
 
     return JsonResponse(
         {"success": False, "error": "Invalid request method"}, status=405
@@ -534,6 +490,18 @@ def get_terms_status_reverse(request):
                 {"success": False, "error": "All fields are required"}, status=400
             )
 
+        summary = stored_terms_status(
+            "terms_value_reverse",
+            connection_name,
+            host_user_username,
+            host_locker_name,
+            guest_user_username,
+            guest_locker_name,
+        )
+        if summary is not None:
+            return JsonResponse({"success": True, **summary}, status=200)
+
+        # No such connection: report which part is missing
         try:
             host_user = CustomUser.objects.get(username=host_user_username)
             host_locker = Locker.objects.get(name=host_locker_name, user=host_user)
@@ -560,67 +528,9 @@ def get_terms_status_reverse(request):
                 {"success": False, "error": f"User not found: {e}"}, status=400
             )
 
-        count_T = 0
-        count_F = 0
-        count_R = 0
-        filled = 0
-        empty = 0
-
-        terms_value = connection.terms_value_reverse
-
-        # Handle case when terms_value is empty
-        if terms_value:
-            # Exclude 'canShareMoreData' from terms_value
-            filtered_terms = {
-                key: value
-                for key, value in terms_value.items()
-                if key != "canShareMoreData"
-            }
+        summary = compute_terms_status(connection)[1]
 
-            for key, value in filtered_terms.items():
-                value = value.strip()
-                if value.endswith("; T") or value.endswith(";T"):
-                    count_T += 1
-                elif value.endswith("; F") or value.endswith(";F"):
-                    count_F += 1
-                elif value.endswith("; R") or value.endswith(";R"):
-                    count_R += 1
-
-                stripped_value = (
-                    value.rstrip("; T")
-                    .rstrip(";T")
-                    .rstrip("; F")
-                    .rstrip(";F")
-                    .rstrip("; R")
-                    .rstrip(";R")
-                    .strip()
-                )
-                if stripped_value:
-                    filled += 1
-                else:
-                    empty += 1
-
-            # Calculate the number of empty terms based on the total count
-            total_terms = count_T + count_F + count_R
-            if total_terms > 0:
-                empty = total_terms - filled
-        else:
-            # If terms_value is empty, assume all expected terms are empty
-            total_terms = count_T + count_F + count_R
-            empty = total_terms
-            filled = 0
-
-        return JsonResponse(
-            {
-                "success": True,
-                "count_T": count_T,
-                "count_F": count_F,
-                "count_R": count_R,
-                "empty": empty,
-                "filled": filled,
-            },
-            status=200,
-        )
+        return JsonResponse({"success": True, **summary}, status=200)
 
     return JsonResponse(
         {"success": False, "error": "Invalid request method"}, status=405
@@ -0,0 +1,167 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from api.models import Connection, ConnectionStatsCounter, ConnectionType
+
+# Connection counts per direction and status for dashboard/stats/ and
+# locker/get-status/. They come from one conditional-aggregation query over
+# Connection, or from ConnectionStatsCounter when CONNECTION_STATS_COUNTERS is
+# on, and are cached per (user, locker) until a connection or connection type
+# of that user changes. The invalidation reaches every server process only
+# because CACHES is shared (DatabaseCache in settings), not process-local.
+
+CONNECTION_STATS_TTL = 300  # seconds; saves/deletes invalidate earlier
+STATUSES = [status for status, _ in Connection.CONNECTION_STATUS_CHOICES]
+DIRECTIONS = {
+    ConnectionStatsCounter.INCOMING: ("host_user", "host_locker"),
+    ConnectionStatsCounter.OUTGOING: ("guest_user", "guest_locker"),
+}
+
+
+def connection_stats_counters_enabled():
+    return getattr(settings, "CONNECTION_STATS_COUNTERS", False)
+
+
+def _cache_key(user_id, locker_id=None):
+    return f"connection_stats:{user_id}:{locker_id or 'all'}"
+
+
+def _empty_counts():
+    return {"total": 0, **{status: 0 for status in STATUSES}}
+
+
+def _aggregate_counts(user, locker_id=None):
+    # Both directions and every status in one query
+    sides = {}
+    for direction, (user_field, locker_field) in DIRECTIONS.items():
+        side = Q(**{user_field: user})
+        if locker_id:
+            side &= Q(**{f"{locker_field}_id": locker_id})
+        sides[direction] = side
+
+    aggregates = {}
+    for direction, side in sides.items():
+        aggregates[f"{direction}__total"] = Count("pk", filter=side)
+        for status in STATUSES:
+            aggregates[f"{direction}__{status}"] = Count("pk", filter=side & Q(connection_status=status))
+    row = Connection.objects.filter(sides[ConnectionStatsCounter.INCOMING] | sides[ConnectionStatsCounter.OUTGOING]).aggregate(**aggregates)
+
+    counts = {}
+    for key, value in row.items():
+        direction, name = key.split("__")
+        counts.setdefault(direction, {})[name] = value
+    return counts
+
+
+def _counter_counts(user, locker_id=None):
+    queryset = ConnectionStatsCounter.objects.filter(user=user)
+    if locker_id:
+        queryset = queryset.filter(locker_id=locker_id)
+    counts = {direction: _empty_counts() for direction in DIRECTIONS}
+    for row in queryset.values("direction", "status").annotate(total=Sum("count")):
+        side = counts[row["direction"]]
+        side[row["status"]] = row["total"]
+        side["total"] += row["total"]
+    return counts
+
+
+def connection_counts(user, locker_id=None):
+    """
+    {"incoming": {...}, "outgoing": {...}, "connection_types": n} of the user,
+    or of one of their lockers. Each side has "total" and a count per
+    connection status.
+    """
+    key = _cache_key(user.user_id, locker_id)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    if connection_stats_counters_enabled():
+        counts = _counter_counts(user, locker_id)
+    else:
+        counts = _aggregate_counts(user, locker_id)
+    connection_types = ConnectionType.objects.filter(owner_user=user)
+    if locker_id:
+        connection_types = connection_types.filter(owner_locker_id=locker_id)
+    counts["connection_types"] = connection_types.count()
+
+    cache.set(key, counts, CONNECTION_STATS_TTL)
+    return counts
+
+
+def invalidate_connection_stats(user_lockers):
+    """Drops the cached counts of the given (user_id, locker_id) pairs once the transaction commits."""
+    keys = set()
+    for user_id, locker_id in user_lockers:
+        keys.add(_cache_key(user_id))
+        keys.add(_cache_key(user_id, locker_id))
+    transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+
+def connection_stats_keys(host_user_id, host_locker_id, guest_user_id, guest_locker_id, status):
+    """The (user_id, locker_id, direction, status) counters a connection is counted in."""
+    return [
+        (host_user_id, host_locker_id, ConnectionStatsCounter.INCOMING, status),
+        (guest_user_id, guest_locker_id, ConnectionStatsCounter.OUTGOING, status),
+    ]
+
+
+def add_to_connection_stats(keys, delta):
+    for user_id, locker_id, direction, status in keys:
+        counter = ConnectionStatsCounter.objects.filter(
+            user_id=user_id, locker_id=locker_id, direction=direction, status=status
+        )
+        if counter.update(count=F("count") + delta) or delta < 0:
+            continue  # a missing counter is not decremented (its locker/user is being deleted)
+        try:
+            with transaction.atomic():
+                ConnectionStatsCounter.objects.create(
+                    user_id=user_id, locker_id=locker_id, direction=direction, status=status, count=delta
+                )
+        except IntegrityError:
+            # Created by a concurrent transition in the meantime
+            counter.update(count=F("count") + delta)
+
+
+def apply_connection_stats_change(old_key, new_key):
+    """
+    Moves a connection from the counters of old_key to those of new_key
+    (keys as in api.signals._connection_stats_key, None when it did not /
+    no longer exists) and drops the cached counts of both.
+    """
+    user_lockers = set()
+    for key, delta in ((old_key, -1), (new_key, 1)):
+        if key is None:
+            continue
+        host_user_id, host_locker_id, guest_user_id, guest_locker_id, status = key
+        user_lockers.update([(host_user_id, host_locker_id), (guest_user_id, guest_locker_id)])
+        if connection_stats_counters_enabled():
+            add_to_connection_stats(
+                connection_stats_keys(host_user_id, host_locker_id, guest_user_id, guest_locker_id, status), delta
+            )
+    invalidate_connection_stats(user_lockers)
+
+
+def rebuild_connection_stats():
+    """Recounts ConnectionStatsCounter from Connection; returns the number of counters written."""
+    counters = []
+    for direction, (user_field, locker_field) in DIRECTIONS.items():
+        rows = Connection.objects.values(user_field, locker_field, "connection_status").annotate(total=Count("pk"))
+        for row in rows.order_by():
+            counters.append(
+                ConnectionStatsCounter(
+                    user_id=row[user_field],
+                    locker_id=row[locker_field],
+                    direction=direction,
+                    status=row["connection_status"],
+                    count=row["total"],
+                )
+            )
+    with transaction.atomic():
+        stale = set(ConnectionStatsCounter.objects.values_list("user_id", "locker_id"))
+        ConnectionStatsCounter.objects.all().delete()
+        ConnectionStatsCounter.objects.bulk_create(counters, batch_size=1000)
+    invalidate_connection_stats(stale | {(counter.user_id, counter.locker_id) for counter in counters})
+    return len(counters)
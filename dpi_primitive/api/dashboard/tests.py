@@ -1,3 +1,57 @@
+from django.conf import settings
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
 
-# Create your tests here.
+from api.dashboard.services.connection_stats import connection_counts
+from api.dashboard.views.google_token_stats import get_google_token_stats
+from api.models import Connection, ConnectionType, CustomUser, Locker
+
+
+class GoogleTokenStatsViewTests(TestCase):
+    def get(self, user_type):
+        user = CustomUser.objects.create(username=user_type, email=f"{user_type}@example.com", user_type=user_type)
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=user)
+        return get_google_token_stats(request)
+
+    def test_system_admin_gets_the_counters(self):
+        response = self.get(CustomUser.SYS_ADMIN)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"refreshes"', response.content)
+
+    def test_other_users_are_refused(self):
+        for user_type in (CustomUser.MODERATOR, CustomUser.USER):
+            with self.subTest(user_type=user_type):
+                self.assertEqual(self.get(user_type).status_code, 403)
+
+
+class ConnectionStatsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = CustomUser.objects.create(username="host", email="host@example.com")
+        cls.guest = CustomUser.objects.create(username="guest", email="guest@example.com")
+        cls.host_locker = Locker.objects.create(name="host locker", user=cls.host)
+        cls.guest_locker = Locker.objects.create(name="guest locker", user=cls.guest)
+        cls.connection_type = ConnectionType.objects.create(
+            connection_type_name="type", owner_user=cls.host, owner_locker=cls.host_locker
+        )
+
+    def test_cache_is_shared_between_processes(self):
+        self.assertNotEqual(settings.CACHES["default"]["BACKEND"], "django.core.cache.backends.locmem.LocMemCache")
+
+    def test_new_connection_drops_the_cached_counts(self):
+        self.assertEqual(connection_counts(self.host)["incoming"]["total"], 0)
+        with self.assertNumQueries(1):  # the cache read
+            connection_counts(self.host)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Connection.objects.create(
+                connection_name="conn",
+                connection_type=self.connection_type,
+                host_user=self.host,
+                host_locker=self.host_locker,
+                guest_user=self.guest,
+                guest_locker=self.guest_locker,
+            )
+        self.assertEqual(connection_counts(self.host)["incoming"]["total"], 1)
+        self.assertEqual(connection_counts(self.guest, self.guest_locker.locker_id)["outgoing"]["total"], 1)
@@ -3,8 +3,10 @@ from django.urls import path
 # dashboard
 from .views.get_stats import get_stats
 from .views.user_directory import user_directory
+from .views.google_token_stats import get_google_token_stats
 
 urlpatterns = [
     path("user-directory/", user_directory, name="user_directory"),
     path("stats/", get_stats, name="get_stats"),
+    path("google-token-stats/", get_google_token_stats, name="get_google_token_stats"),
 ]
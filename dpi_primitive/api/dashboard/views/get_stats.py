@@ -5,14 +5,8 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from api.serializers import (
-    ConnectionTypeSerializer
-)
-from api.models import (
-    Connection,
-    ConnectionType
-)
 from django.http import JsonResponse
+from api.dashboard.services.connection_stats import connection_counts
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -62,36 +56,26 @@ def get_stats(request):
     live connections, and closed connections
     """
     user = request.user
+    counts = connection_counts(user)
 
     #Incoming: Where the user is the host
-    incoming = Connection.objects.filter(host_user=user)
-    incoming_total = incoming.count()
-    incoming_live = incoming.filter(connection_status="live").count()
-    incoming_established = incoming.filter(connection_status="established").count()
-    incoming_closed = incoming.filter(connection_status="closed").count()
-    total_connection_types = ConnectionType.objects.filter(owner_user=user).count()
-
+    incoming = counts["incoming"]
     #Outgoing: Where the user is the guest
-    outgoing = Connection.objects.filter(guest_user=user)
-    outgoing_total=outgoing.count()
-    outgoing_live=outgoing.filter(connection_status="live").count()
-    outgoing_established=outgoing.filter(connection_status="established").count()
-    outgoing_closed=outgoing.filter(connection_status="closed").count()
+    outgoing = counts["outgoing"]
 
     stats = {
         "incoming":{
-            "total_Users": incoming_total,
-            "live": incoming_live,
-            "established": incoming_established,
-            "closed": incoming_closed,
-            "total_connections_type": total_connection_types,
+            "total_Users": incoming["total"],
+            "live": incoming["live"],
+            "established": incoming["established"],
+            "closed": incoming["closed"],
+            "total_connections_type": counts["connection_types"],
         },
         "outgoing":{
-            "total_Connections": outgoing_total,
-            "live": outgoing_live,
-            "established": outgoing_established,
-            "closed": outgoing_closed,
+            "total_Connections": outgoing["total"],
+            "live": outgoing["live"],
+            "established": outgoing["established"],
+            "closed": outgoing["closed"],
         }
     }
     return JsonResponse(stats, status=200)
-
@@ -0,0 +1,55 @@
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    authentication_classes,
+)
+from rest_framework.permissions import IsAuthenticated
+from django.http import JsonResponse
+from api.models import CustomUser
+from api.utils.google_drive_helper.token_broker import google_token_stats
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+
+@extend_schema(
+    summary="Get Google token broker counters",
+    description=(
+        "System admins only. Returns the hit/miss/refresh counters of the Google access "
+        "token broker in the worker process that answers the request; each process "
+        "counts on its own since it started."
+    ),
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "hits": {"type": "integer"},
+                "cache_hits": {"type": "integer"},
+                "misses": {"type": "integer"},
+                "refreshes": {"type": "integer"},
+                "refresh_failures": {"type": "integer"},
+                "waits": {"type": "integer"},
+                "cached_users": {"type": "integer"},
+            }
+        },
+        401: OpenApiResponse(description="Authentication credentials were not provided or invalid"),
+        403: OpenApiResponse(description="User is not a system admin"),
+    },
+)
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_google_token_stats(request):
+    """
+    Fetches the Google token broker counters of this process
+    """
+    requesting_user: CustomUser = request.user
+    if requesting_user.user_type != CustomUser.SYS_ADMIN:
+        return JsonResponse(
+            {
+                "message": f"User must be a system admin to access this API endpoint. Current user has {requesting_user.user_type} type."
+            },
+            status=403,
+        )
+    return JsonResponse(google_token_stats(), status=200)
@@ -19,6 +19,7 @@ from django.http import HttpRequest, JsonResponse, FileResponse, HttpResponse
 
 #google
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.resource_helper.access_resource_helper import delete_clearing_root_inode
 
 
 
@@ -114,7 +115,7 @@ def delete_Update_Locker(request: HttpRequest):
 
         if locker_to_be_deleted.exists():
             delete_locker = locker_to_be_deleted.first()
-            delete_locker.delete()
+            delete_clearing_root_inode(delete_locker)
             return JsonResponse(
                 {
                     "message": f"Locker(ID = {delete_locker.locker_id}) with name = {locker_name} of user with username = {user.username} was successfully deleted."
@@ -7,7 +7,7 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.permissions import IsAuthenticated
 
 
-from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
+from api.dashboard.services.connection_stats import connection_counts
 
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -71,41 +71,29 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
 def get_locker_status(request):
     user = request.user
     locker_id = request.GET.get("locker_id")
-
-    incoming_filter = {"host_user": user}
-    outgoing_filter = {"guest_user": user}
-
-    if locker_id:
-        incoming_filter["host_locker_id"] = locker_id
-        outgoing_filter["guest_locker_id"] = locker_id
-
-    incoming = Connection.objects.filter(**incoming_filter)
-    outgoing = Connection.objects.filter(**outgoing_filter)
-
-    incoming_active = incoming.exclude(connection_status="revoked")
-    outgoing_active = outgoing.exclude(connection_status="revoked")
-
-    connection_type_filter = {"owner_user": user}
     if locker_id:
-        connection_type_filter["owner_locker_id"] = locker_id
+        try:
+            locker_id = int(locker_id)
+        except ValueError:
+            return JsonResponse({"success": False, "error": "locker_id must be an integer"}, status=400)
 
-    total_connection_types = ConnectionType.objects.filter(
-        **connection_type_filter
-    ).count()
+    counts = connection_counts(user, locker_id)
+    incoming = counts["incoming"]
+    outgoing = counts["outgoing"]
 
     stats = {
         "incoming": {
-            "total_users": incoming_active.count(),
-            "live": incoming.filter(connection_status="live").count(),
-            "established": incoming.filter(connection_status="established").count(),
-            "closed": incoming.filter(connection_status="closed").count(),
-            "total_connections_type": total_connection_types,
+            "total_users": incoming["total"] - incoming["revoked"],
+            "live": incoming["live"],
+            "established": incoming["established"],
+            "closed": incoming["closed"],
+            "total_connections_type": counts["connection_types"],
         },
         "outgoing": {
-            "total_connections": outgoing_active.count(),
-            "live": outgoing_active.filter(connection_status="live").count(),
-            "established": outgoing_active.filter(connection_status="established").count(),
-            "closed": outgoing_active.filter(connection_status="closed").count(),
+            "total_connections": outgoing["total"] - outgoing["revoked"],
+            "live": outgoing["live"],
+            "established": outgoing["established"],
+            "closed": outgoing["closed"],
         }
     }
 
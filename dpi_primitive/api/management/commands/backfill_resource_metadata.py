@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.models import Resource
+from api.utils.google_drive_helper.drive_client import get_drive_service
+from api.utils.google_drive_helper.drive_helper import get_or_refresh_google_token
+from api.utils.resource_helper.document_metadata import store_drive_metadata, store_local_metadata
+
+
+class Command(BaseCommand):
+    help = "Fill Resource.page_count/file_size/content_hash for resources registered before the fields existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--all", action="store_true", help="Recompute resources that already have metadata too.")
+        parser.add_argument("--drive", action="store_true", help="Also ask Drive for size/checksum of Drive backed resources.")
+
+    def handle(self, *args, **options):
+        queryset = Resource.objects.select_related("owner").order_by("resource_id")
+        if not options["all"]:
+            queryset = queryset.filter(Q(content_hash__isnull=True) | Q(file_size__isnull=True))
+
+        local = drive = skipped = 0
+        tokens = {}  # owner id -> access token
+        for resource in queryset.iterator(chunk_size=options["batch_size"]):
+            try:
+                if store_local_metadata(resource):
+                    local += 1
+                    continue
+                if not options["drive"]:
+                    skipped += 1
+                    continue
+                if resource.owner_id not in tokens:
+                    tokens[resource.owner_id] = get_or_refresh_google_token(resource.owner)
+                token = tokens[resource.owner_id]
+                if not token:
+                    skipped += 1
+                    continue
+                store_drive_metadata(resource, get_drive_service(token))
+                drive += 1
+            except Exception as e:
+                skipped += 1
+                self.stdout.write(self.style.WARNING(f"Resource {resource.resource_id}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled metadata for {local} local and {drive} Drive resources ({skipped} skipped)."
+        ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from api.model.xnode_model import Xnode_V2
+
+
+class Command(BaseCommand):
+    help = "Fill Xnode_V2.root_inode and depth for VNODEs/SNODEs created before the fields existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--all", action="store_true", help="Recompute nodes that already have a root_inode too.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # One pass over the (small) parent graph instead of a query per hop
+        nodes = {
+            row["id"]: row
+            for row in Xnode_V2.objects.values("id", "xnode_Type", "node_information")
+        }
+        resolved = {}  # xnode_id -> (root_inode_id, depth)
+
+        def resolve(xnode_id):
+            path = []
+            current = xnode_id
+            while current not in resolved:
+                row = nodes.get(current)
+                if row is None or current in path:
+                    # Broken or cyclic chain: leave the pointer empty
+                    result = (None, 0)
+                    break
+                if row["xnode_Type"] == Xnode_V2.XnodeType.INODE:
+                    result = (current, 0)
+                    break
+                path.append(current)
+                info = row["node_information"] or {}
+                if row["xnode_Type"] == Xnode_V2.XnodeType.VNODE:
+                    parent = info.get("link")
+                else:
+                    parent = info.get("inode_or_snode_id")
+                current = int(parent) if parent is not None else None
+            else:
+                result = resolved[current]
+
+            root_id, depth = result
+            for node_id in reversed(path):
+                depth = depth + 1 if root_id is not None else 0
+                resolved[node_id] = (root_id, depth)
+            return resolved.get(xnode_id, result)
+
+        queryset = Xnode_V2.objects.exclude(xnode_Type=Xnode_V2.XnodeType.INODE)
+        if not options["all"]:
+            queryset = queryset.filter(root_inode__isnull=True)
+
+        updated = 0
+        batch = []
+        for xnode in queryset.only("id", "root_inode", "depth").iterator(chunk_size=batch_size):
+            root_id, depth = resolve(xnode.id)
+            if root_id is None:
+                continue
+            xnode.root_inode_id = root_id
+            xnode.depth = depth
+            batch.append(xnode)
+            if len(batch) >= batch_size:
+                Xnode_V2.objects.bulk_update(batch, ["root_inode", "depth"])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Xnode_V2.objects.bulk_update(batch, ["root_inode", "depth"])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled root_inode for {updated} xnodes."))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+
+from api.connections.services.term_values import (
+    TERMS_STATUS_COLUMNS,
+    set_terms_status,
+    sync_term_values,
+    term_value_rows,
+)
+from api.models import Connection, ConnectionTermValue
+
+ROW_FIELDS = ("direction", "extra", "term", "value", "xnode_id", "status", "share_type")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored terms status counts of every connection, and its ConnectionTermValue "
+        "rows, with its terms_value / terms_value_reverse JSON. With --fix, rebuild what differs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--fix", action="store_true", help="Rewrite the counts and rows that differ.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fix = options["fix"]
+        checked = stale_counts = stale_rows = 0
+
+        queryset = Connection.objects.only("connection_id", "terms_value", "terms_value_reverse", *TERMS_STATUS_COLUMNS)
+        batch = []
+        for connection in queryset.order_by("connection_id").iterator(chunk_size=batch_size):
+            batch.append(connection)
+            if len(batch) >= batch_size:
+                counts, rows = self.check_batch(batch, fix)
+                checked, stale_counts, stale_rows = checked + len(batch), stale_counts + counts, stale_rows + rows
+                batch = []
+        if batch:
+            counts, rows = self.check_batch(batch, fix)
+            checked, stale_counts, stale_rows = checked + len(batch), stale_counts + counts, stale_rows + rows
+
+        summary = (
+            f"Checked {checked} connections: {stale_counts} with stale status counts, "
+            f"{stale_rows} with stale term rows."
+        )
+        if (stale_counts or stale_rows) and not fix:
+            self.stdout.write(self.style.WARNING(summary + " Run with --fix to rebuild them."))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary + (" Rebuilt." if fix and (stale_counts or stale_rows) else "")))
+
+    def check_batch(self, connections, fix):
+        stored_rows = {connection.connection_id: set() for connection in connections}
+        for connection_id, *row in ConnectionTermValue.objects.filter(
+            connection_id__in=stored_rows
+        ).values_list("connection_id", *ROW_FIELDS):
+            stored_rows[connection_id].add(tuple(row))
+
+        stale_counts = []
+        stale_rows = []
+        for connection in connections:
+            stored = {column: getattr(connection, column) for column in TERMS_STATUS_COLUMNS}
+            set_terms_status(connection)
+            expected = {column: getattr(connection, column) for column in TERMS_STATUS_COLUMNS}
+            if stored != expected:
+                stale_counts.append(connection)
+                self.stdout.write(f"Connection {connection.connection_id}: stored counts {stored}, terms give {expected}")
+
+            expected_rows = {tuple(getattr(row, field) for field in ROW_FIELDS) for row in term_value_rows(connection)}
+            if stored_rows[connection.connection_id] != expected_rows:
+                stale_rows.append(connection)
+                self.stdout.write(f"Connection {connection.connection_id}: term rows differ from its terms JSON")
+
+        if fix:
+            if stale_counts:
+                Connection.objects.bulk_update(stale_counts, TERMS_STATUS_COLUMNS)
+            for connection in stale_rows:
+                sync_term_values(connection)
+        return len(stale_counts), len(stale_rows)
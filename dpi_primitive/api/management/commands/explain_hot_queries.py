@@ -0,0 +1,234 @@
+import random
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.model.xnode_model import Xnode_V2
+from api.models import Connection, ConnectionType, CustomUser, Locker, Notification, Resource
+from api.utils.resource_helper.access_resource_helper import parent_pointer_q
+
+# Indexes of migration 0062, dropped (inside the rolled back transaction) by --compare
+HOT_QUERY_INDEXES = [
+    "connection_host_status_idx",
+    "connection_host_locker_idx",
+    "connection_guest_locker_idx",
+    "connection_name_lookup_idx",
+    "connection_open_guest_idx",
+    "resource_inode_pointer_idx",
+    "xnode_connection_locker_idx",
+    "xnode_locker_validity_idx",
+    "xnode_connection_snode_idx",
+    "xnode_node_info_gin",
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a dataset inside a transaction, EXPLAIN ANALYZE the hot query shapes of the views "
+        "and roll everything back. With --compare the plans are repeated without the indexes of "
+        "migration 0062. PostgreSQL only; use a development database, the seeding and DROP INDEX "
+        "lock the tables until the rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--connections-per-user", type=int, default=20)
+        parser.add_argument("--notifications-per-user", type=int, default=50)
+        parser.add_argument("--compare", action="store_true", help="Also EXPLAIN with the new indexes dropped.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the full plans, not just the index used.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("explain_hot_queries needs PostgreSQL.")
+
+        try:
+            with transaction.atomic():
+                probe = self.seed(options)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                with_indexes = self.explain_all(probe, options["verbose_plans"])
+                if options["compare"]:
+                    with connection.cursor() as cursor:
+                        for name in HOT_QUERY_INDEXES:
+                            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                    self.stdout.write("\nWithout the 0062 indexes:")
+                    without_indexes = self.explain_all(probe, options["verbose_plans"])
+                    self.stdout.write("\nSummary (execution ms, with -> without):")
+                    for label, (ms, _) in with_indexes.items():
+                        self.stdout.write(f"  {label}: {ms:.3f} -> {without_indexes[label][0]:.3f}")
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS("Seeded rows rolled back."))
+
+    def seed(self, options):
+        rng = random.Random(0)
+        now = timezone.now()
+        suffix = format(int(now.timestamp() * 1000), "x")  # usernames are unique
+        n_users = options["users"]
+        self.stdout.write(f"Seeding {n_users} users ...")
+
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"x{suffix}-{i}", email=f"explain-{suffix}-{i}@example.com")
+            for i in range(n_users)
+        )
+        lockers = Locker.objects.bulk_create(Locker(name=f"explain-{i}", user=user) for i, user in enumerate(users))
+        types = ConnectionType.objects.bulk_create(
+            ConnectionType(connection_type_name=f"explain-{i}", owner_user=user, owner_locker=locker)
+            for i, (user, locker) in enumerate(zip(users, lockers))
+        )
+
+        statuses = [status for status, _ in Connection.CONNECTION_STATUS_CHOICES]
+        connections = []
+        for guest in range(n_users):
+            for _ in range(options["connections_per_user"]):
+                host = rng.randrange(n_users)
+                connections.append(
+                    Connection(
+                        connection_name=f"explain-{host}-{guest}",
+                        connection_type=types[host],
+                        host_user=users[host],
+                        host_locker=lockers[host],
+                        guest_user=users[guest],
+                        guest_locker=lockers[guest],
+                        connection_status=rng.choice(statuses),
+                    )
+                )
+        connections = Connection.objects.bulk_create(connections, batch_size=2000)
+
+        # An INODE + Resource in the host locker and a VNODE (and sometimes an
+        # SNODE) of it in the guest locker, per connection
+        resources = Resource.objects.bulk_create(
+            (
+                Resource(
+                    document_name=f"explain-{i}",
+                    locker=conn.host_locker,
+                    owner=conn.host_user,
+                    i_node_pointer=f"explain-{suffix}-{i}",
+                )
+                for i, conn in enumerate(connections)
+            ),
+            batch_size=2000,
+        )
+        validity = lambda: now + timedelta(days=rng.randrange(-30, 30))
+        inodes = Xnode_V2.objects.bulk_create(
+            (
+                Xnode_V2(
+                    locker=conn.host_locker,
+                    creator=conn.host_user_id,
+                    created_at=now,
+                    validity_until=validity(),
+                    node_information={"resource_id": resource.resource_id, "current_owner": conn.host_user_id},
+                )
+                for conn, resource in zip(connections, resources)
+            ),
+            batch_size=2000,
+        )
+        children = []
+        for conn, inode in zip(connections, inodes):
+            children.append(
+                Xnode_V2(
+                    locker=conn.guest_locker,
+                    connection=conn,
+                    creator=conn.guest_user_id,
+                    created_at=now,
+                    validity_until=validity(),
+                    xnode_Type=Xnode_V2.XnodeType.VNODE,
+                    node_information={"link": inode.id, "current_owner": conn.guest_user_id},
+                )
+            )
+            if rng.random() < 0.2:
+                children.append(
+                    Xnode_V2(
+                        locker=conn.guest_locker,
+                        connection=conn,
+                        creator=conn.guest_user_id,
+                        created_at=now,
+                        validity_until=validity(),
+                        xnode_Type=Xnode_V2.XnodeType.SNODE,
+                        node_information={"inode_or_snode_id": inode.id, "current_owner": conn.guest_user_id},
+                    )
+                )
+        Xnode_V2.objects.bulk_create(children, batch_size=2000)
+
+        notifications = []
+        for i, user in enumerate(users):
+            for _ in range(options["notifications_per_user"]):
+                conn = connections[rng.randrange(len(connections))]
+                notifications.append(
+                    Notification(
+                        connection=conn,
+                        host_user=user,
+                        guest_user=conn.guest_user,
+                        host_locker=lockers[i],
+                        guest_locker=conn.guest_locker,
+                        message="explain",
+                    )
+                )
+        Notification.objects.bulk_create(notifications, batch_size=2000)
+
+        self.stdout.write(
+            f"Seeded {len(connections)} connections, {len(inodes) + len(children)} xnodes, "
+            f"{len(notifications)} notifications."
+        )
+        conn = connections[len(connections) // 2]
+        return {"connection": conn, "inode": inodes[len(inodes) // 2], "now": now}
+
+    def hot_queries(self, probe):
+        conn, inode, now = probe["connection"], probe["inode"], probe["now"]
+        return {
+            "Connection (host_user, connection_status)": Connection.objects.filter(
+                host_user_id=conn.host_user_id, connection_status="established"
+            ),
+            "Connection (host_user, host_locker)": Connection.objects.filter(
+                host_user_id=conn.host_user_id, host_locker_id=conn.host_locker_id
+            ),
+            "Connection (guest_user, guest_locker)": Connection.objects.filter(
+                guest_user_id=conn.guest_user_id, guest_locker_id=conn.guest_locker_id
+            ),
+            "Connection (connection_name, guest_locker, guest_user)": Connection.objects.filter(
+                connection_name=conn.connection_name, guest_locker_id=conn.guest_locker_id, guest_user_id=conn.guest_user_id
+            ),
+            "Connection guest_user, not closed": Connection.objects.filter(guest_user_id=conn.guest_user_id).exclude(
+                connection_status="closed"
+            ),
+            "Connection (connection_type)": Connection.objects.filter(connection_type_id=conn.connection_type_id),
+            "Xnode_V2 (connection, locker)": Xnode_V2.objects.filter(
+                connection_id=conn.connection_id, locker_id=conn.guest_locker_id
+            ),
+            "Xnode_V2 (locker, validity_until, status)": Xnode_V2.objects.filter(
+                locker_id=conn.guest_locker_id, validity_until__lt=now, status="active"
+            ),
+            "Xnode_V2 SNODEs of a connection": Xnode_V2.objects.filter(
+                connection_id=conn.connection_id, xnode_Type=Xnode_V2.XnodeType.SNODE
+            ),
+            "Xnode_V2 children by node_information.link": Xnode_V2.objects.filter(parent_pointer_q("link", [inode.id])),
+            "Xnode_V2 children by node_information.inode_or_snode_id": Xnode_V2.objects.filter(
+                parent_pointer_q("inode_or_snode_id", [inode.id])
+            ),
+            "Notification feed (host_user, created_at)": Notification.objects.filter(
+                host_user_id=conn.host_user_id
+            ).order_by("-created_at", "-id")[:20],
+            "Resource i_node_pointer exists": Resource.objects.filter(i_node_pointer=f"missing-{inode.id}"),
+        }
+
+    def explain_all(self, probe, verbose):
+        results = {}
+        for label, queryset in self.hot_queries(probe).items():
+            plan = queryset.explain(analyze=True)
+            indexes = sorted(set(re.findall(r"(?:Index|Index Only|Bitmap Index) Scan (?:Backward )?(?:using|on) (\w+)", plan)))
+            match = re.search(r"Execution Time: ([\d.]+) ms", plan)
+            ms = float(match.group(1)) if match else 0.0
+            results[label] = (ms, indexes)
+            scan = ", ".join(indexes) if indexes else "sequential scan"
+            self.stdout.write(f"  {label}: {scan} ({ms:.3f} ms)")
+            if verbose:
+                self.stdout.write("    " + plan.replace("\n", "\n    "))
+        return results
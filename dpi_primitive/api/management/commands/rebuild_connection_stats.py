@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard.services.connection_stats import connection_stats_counters_enabled, rebuild_connection_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount ConnectionStatsCounter from the connections table. Run it before turning "
+        "CONNECTION_STATS_COUNTERS on, and whenever the counters may have drifted."
+    )
+
+    def handle(self, *args, **options):
+        written = rebuild_connection_stats()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} connection stats counters."))
+        if not connection_stats_counters_enabled():
+            self.stdout.write(self.style.WARNING(
+                "CONNECTION_STATS_COUNTERS is off: the counters are not kept up to date until it is turned on."
+            ))
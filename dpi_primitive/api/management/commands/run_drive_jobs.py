@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.utils.google_drive_helper.drive_jobs import (
+    claim_next_drive_job,
+    default_worker_id,
+    fail_stale_drive_jobs,
+    run_drive_job,
+)
+
+
+class Command(BaseCommand):
+    help = "Run queued DriveJobs (Drive copies of transfer/collateral approvals). Start one or more per host."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit instead of polling.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after this many jobs (0 = no limit).")
+        parser.add_argument("--worker-id", default=None)
+
+    def handle(self, *args, **options):
+        worker = options["worker_id"] or default_worker_id()
+        processed = 0
+        stale = fail_stale_drive_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"Marked {stale} stale running jobs as failed."))
+        self.stdout.write(f"Drive job worker {worker} started.")
+
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_drive_job(worker)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                run_drive_job(job, worker=worker)
+                processed += 1
+                self.stdout.write(f"Job {job.job_id} ({job.kind}): {job.status}")
+                if options["max_jobs"] and processed >= options["max_jobs"]:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping drive job worker.")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} drive jobs."))
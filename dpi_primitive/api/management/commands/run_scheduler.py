@@ -0,0 +1,58 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.scheduler import PeriodicTask, Scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the periodic tasks in SCHEDULED_TASKS (api/tasks.py) in this process. Replaces the django-crontab CRONJOBS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every task once, print the timings and exit.")
+        parser.add_argument("--task", action="append", default=[], help="Only run this task (dotted path or function name); can be repeated.")
+        parser.add_argument("--list", action="store_true", help="List the scheduled tasks and exit.")
+
+    def handle(self, *args, **options):
+        jitter = getattr(settings, "SCHEDULER_JITTER", 0.1)
+        tasks = [
+            PeriodicTask(path, interval, jitter=jitter)
+            for path, interval in getattr(settings, "SCHEDULED_TASKS", [])
+        ]
+        if options["task"]:
+            tasks = [task for task in tasks if task.path in options["task"] or task.name in options["task"]]
+        if not tasks:
+            raise CommandError("No scheduled tasks (check SCHEDULED_TASKS / --task).")
+
+        if options["list"]:
+            for task in tasks:
+                self.stdout.write(f"{task.path}: every {task.interval}s (±{int(task.jitter * 100)}%)")
+            return
+
+        scheduler = Scheduler(tasks)
+        if options["once"]:
+            for task in tasks:
+                task.start()
+            scheduler.wait_idle()
+            self._write_stats(scheduler)
+            return
+
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        self.stdout.write(f"Scheduler started with {len(tasks)} tasks.")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        self.stdout.write("Stopping scheduler, waiting for running tasks.")
+        scheduler.wait_idle(timeout=60)
+        self._write_stats(scheduler)
+
+    def _write_stats(self, scheduler):
+        for path, stats in scheduler.stats().items():
+            avg = f"{stats['avg_duration']:.2f}s" if stats["avg_duration"] is not None else "-"
+            self.stdout.write(
+                f"{path}: runs={stats['runs']} failures={stats['failures']} skipped={stats['skipped']} "
+                f"avg={avg} max={stats['max_duration']:.2f}s"
+                + (f" last_error={stats['last_error']}" if stats["last_error"] else "")
+            )
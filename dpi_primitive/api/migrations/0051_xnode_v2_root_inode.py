@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0050_alter_connection_validity_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xnode_v2',
+            name='depth',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='xnode_v2',
+            name='root_inode',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='descendant_xnodes', to='api.xnode_v2'),
+        ),
+    ]
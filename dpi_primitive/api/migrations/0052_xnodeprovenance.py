@@ -0,0 +1,118 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_datetime(value):
+    # Entries written by transfer_approve carry an isoformat "timestamp"; the others get the migration time
+    try:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        return timezone.now()
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def copy_provenance_stack_to_table(apps, schema_editor):
+    Xnode_V2 = apps.get_model('api', 'Xnode_V2')
+    XnodeProvenance = apps.get_model('api', 'XnodeProvenance')
+
+    batch = []
+    for xnode_id, stack in Xnode_V2.objects.exclude(provenance_stack=[]).values_list('id', 'provenance_stack').iterator():
+        if not isinstance(stack, list):
+            continue
+        for position, entry in enumerate(stack):
+            if not isinstance(entry, dict):
+                continue
+            batch.append(XnodeProvenance(
+                xnode_id=xnode_id,
+                position=position,
+                connection=_as_int(entry.get('connection')),
+                from_locker=_as_int(entry.get('from_locker')),
+                to_locker=_as_int(entry.get('to_locker')),
+                from_user=_as_int(entry.get('from_user')),
+                to_user=_as_int(entry.get('to_user')),
+                type_of_share=entry.get('type_of_share') or '',
+                shared_xnode_id=_as_int(entry.get('xnode_id')),
+                xnode_post_conditions=entry.get('xnode_post_conditions'),
+                reverse=bool(entry.get('reverse', False)),
+                created_at=_as_datetime(entry.get('timestamp')),
+            ))
+        if len(batch) >= 1000:
+            XnodeProvenance.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        XnodeProvenance.objects.bulk_create(batch)
+
+
+def copy_table_to_provenance_stack(apps, schema_editor):
+    Xnode_V2 = apps.get_model('api', 'Xnode_V2')
+    XnodeProvenance = apps.get_model('api', 'XnodeProvenance')
+
+    stacks = {}
+    for entry in XnodeProvenance.objects.order_by('xnode_id', 'position', 'id').iterator():
+        stacks.setdefault(entry.xnode_id, []).append({
+            'connection': entry.connection,
+            'from_locker': entry.from_locker,
+            'to_locker': entry.to_locker,
+            'from_user': entry.from_user,
+            'to_user': entry.to_user,
+            'type_of_share': entry.type_of_share,
+            'xnode_id': entry.shared_xnode_id,
+            'xnode_post_conditions': entry.xnode_post_conditions,
+            'reverse': entry.reverse,
+            'timestamp': entry.created_at.isoformat(),
+        })
+    for xnode_id, stack in stacks.items():
+        Xnode_V2.objects.filter(id=xnode_id).update(provenance_stack=stack)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0051_xnode_v2_root_inode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XnodeProvenance',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('position', models.IntegerField(default=0)),
+                ('connection', models.IntegerField(blank=True, null=True)),
+                ('from_locker', models.IntegerField(blank=True, null=True)),
+                ('to_locker', models.IntegerField(blank=True, null=True)),
+                ('from_user', models.IntegerField(blank=True, null=True)),
+                ('to_user', models.IntegerField(blank=True, null=True)),
+                ('type_of_share', models.CharField(max_length=20)),
+                ('shared_xnode_id', models.IntegerField(blank=True, null=True)),
+                ('xnode_post_conditions', models.JSONField(blank=True, default=dict, null=True)),
+                ('reverse', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('xnode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provenance_entries', to='api.xnode_v2')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'indexes': [models.Index(fields=['xnode', 'shared_xnode_id', 'type_of_share', 'connection'], name='xnode_prov_lookup_idx')],
+            },
+        ),
+        migrations.RunPython(copy_provenance_stack_to_table, copy_table_to_provenance_stack),
+        migrations.RemoveField(
+            model_name='xnode_v2',
+            name='provenance_stack',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0052_xnodeprovenance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('transfer', 'Transfer'), ('transfer_reverse', 'Transfer (reverse)'), ('collateral', 'Collateral'), ('collateral_reverse', 'Collateral (reverse)')], max_length=30)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='drive_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='drive_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0053_drivejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=80, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0054_resource_document_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubsetJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('source_hash', models.CharField(blank=True, max_length=80, null=True)),
+                ('xnode_id', models.IntegerField()),
+                ('from_page', models.PositiveIntegerField()),
+                ('to_page', models.PositiveIntegerField()),
+                ('resource_name', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('output_path', models.CharField(blank=True, max_length=255, null=True)),
+                ('reused', models.BooleanField(default=False)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subset_jobs', to=settings.AUTH_USER_MODEL)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subset_jobs', to='api.resource')),
+                ('subset_resource', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.resource')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'from_page', 'to_page', 'status'], name='subset_job_range_idx')],
+            },
+        ),
+    ]
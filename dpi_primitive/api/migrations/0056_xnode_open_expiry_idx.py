@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0055_subsetjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=models.Index(condition=models.Q(('status', 'closed'), _negated=True), fields=['validity_until', 'id'], name='xnode_open_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0056_xnode_open_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['validity_time', 'connection_id'], name='connection_validity_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0057_connection_validity_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['host_user', '-created_at', '-id'], name='notification_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['host_user'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0058_notification_feed_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadWatermark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_read_watermark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_until', models.DateTimeField()),
+                ('read_until_id', models.IntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0059_notificationreadwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConnectionStatsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direction', models.CharField(choices=[('incoming', 'Incoming'), ('outgoing', 'Outgoing')], max_length=8)),
+                ('status', models.CharField(choices=[('established', 'Established'), ('live', 'Live'), ('closed', 'Closed'), ('revoked', 'Revoked')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('locker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='connection_stats_counters', to='api.locker')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='connection_stats_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='connectionstatscounter',
+            constraint=models.UniqueConstraint(fields=('user', 'locker', 'direction', 'status'), name='connection_stats_counter_key'),
+        ),
+    ]
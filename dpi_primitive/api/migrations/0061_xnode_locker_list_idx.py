@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0060_connectionstatscounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=models.Index(fields=['locker', 'id'], name='xnode_locker_list_idx'),
+        ),
+    ]
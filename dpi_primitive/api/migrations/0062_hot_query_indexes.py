@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0061_xnode_locker_list_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['host_user', 'connection_status'], name='connection_host_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['host_user', 'host_locker'], name='connection_host_locker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['guest_user', 'guest_locker'], name='connection_guest_locker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['connection_name', 'guest_locker', 'guest_user'], name='connection_name_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(condition=models.Q(('connection_status', 'closed'), _negated=True), fields=['guest_user'], name='connection_open_guest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['i_node_pointer'], name='resource_inode_pointer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=models.Index(fields=['connection', 'locker'], name='xnode_connection_locker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=models.Index(fields=['locker', 'validity_until', 'status'], name='xnode_locker_validity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=models.Index(condition=models.Q(('xnode_Type', 'SNODE')), fields=['connection'], name='xnode_connection_snode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xnode_v2',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['node_information'], name='xnode_node_info_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
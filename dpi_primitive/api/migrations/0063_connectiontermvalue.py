@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api.connections.services.term_values import term_value_rows
+
+
+def copy_terms_to_table(apps, schema_editor):
+    Connection = apps.get_model('api', 'Connection')
+    ConnectionTermValue = apps.get_model('api', 'ConnectionTermValue')
+
+    batch = []
+    for connection in Connection.objects.only('connection_id', 'terms_value', 'terms_value_reverse').iterator():
+        batch.extend(term_value_rows(connection, model=ConnectionTermValue))
+        if len(batch) >= 1000:
+            ConnectionTermValue.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ConnectionTermValue.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0062_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConnectionTermValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('direction', models.CharField(choices=[('guest_to_host', 'Guest to host'), ('host_to_guest', 'Host to guest')], max_length=13)),
+                ('extra', models.BooleanField(default=False)),
+                ('share_type', models.CharField(blank=True, default='', max_length=20)),
+                ('value', models.TextField(blank=True, default='')),
+                ('xnode_id', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, choices=[('T', 'Approved'), ('F', 'Pending'), ('R', 'Rejected'), ('', 'None')], default='', max_length=1)),
+                ('connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_values', to='api.connection')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['connection', 'xnode_id'], name='term_value_xnode_idx'), models.Index(fields=['connection', 'status'], name='term_value_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='connectiontermvalue',
+            constraint=models.UniqueConstraint(fields=('connection', 'direction', 'extra', 'term'), name='connection_term_value_key'),
+        ),
+        migrations.RunPython(copy_terms_to_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+from api.connections.services.term_values import TERMS_STATUS_COLUMNS, set_terms_status
+
+
+def fill_terms_status(apps, schema_editor):
+    Connection = apps.get_model('api', 'Connection')
+    ConnectionTermValue = apps.get_model('api', 'ConnectionTermValue')
+    batch = []
+    for connection in Connection.objects.only('connection_id', 'terms_value', 'terms_value_reverse').iterator():
+        set_terms_status(connection, model=ConnectionTermValue)
+        batch.append(connection)
+        if len(batch) >= 1000:
+            Connection.objects.bulk_update(batch, TERMS_STATUS_COLUMNS)
+            batch = []
+    if batch:
+        Connection.objects.bulk_update(batch, TERMS_STATUS_COLUMNS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0063_connectiontermvalue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connection',
+            name='terms_count_F',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_count_R',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_count_T',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_empty',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_filled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_reverse_count_F',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_reverse_count_R',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_reverse_count_T',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_reverse_empty',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='terms_reverse_filled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_terms_status, migrations.RunPython.noop),
+    ]
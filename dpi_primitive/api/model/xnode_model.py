@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
@@ -50,7 +51,6 @@ class Xnode_V2(models.Model):
     validity_until = models.DateTimeField()
     xnode_Type = models.CharField(_("Xnode Type"), max_length=50, choices=XnodeType.choices, default=XnodeType.INODE)
     node_information = models.JSONField(default=dict)
-    provenance_stack = models.JSONField(default=list)
     post_conditions = models.JSONField(default=get_default_post_conditions)
     snode_list = models.JSONField(default=list)
     vnode_list = models.JSONField(default=list)
@@ -65,10 +65,48 @@ class Xnode_V2(models.Model):
     guest_revert_status = models.IntegerField(default=0)  # 0: none, 1: approved, 2: rejected
     reverted = models.BooleanField(default=False)         # True after both approved
     #revert_reason = models.TextField(null=True, blank=True)
+    # Materialized pointer to the INODE at the end of the VNODE/SNODE chain (null for INODEs)
+    root_inode = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        default=None,
+        on_delete=models.SET_NULL,
+        related_name='descendant_xnodes'
+    )
+    depth = models.IntegerField(default=0)  # number of hops to root_inode, 0 for INODE
+
+    class Meta:
+        indexes = [
+            # Open xnodes by expiry, for the close_expired_xnodes sweeper
+            models.Index(
+                fields=['validity_until', 'id'],
+                name='xnode_open_expiry_idx',
+                condition=~models.Q(status='closed'),
+            ),
+            # Keyset pages of a locker's xnodes (resource/get-all-xnodes-for-locker/)
+            models.Index(fields=['locker', 'id'], name='xnode_locker_list_idx'),
+            # Xnodes of a connection in one locker (connection resource listings)
+            models.Index(fields=['connection', 'locker'], name='xnode_connection_locker_idx'),
+            # Expired xnodes of a locker (xnode_v2_status)
+            models.Index(fields=['locker', 'validity_until', 'status'], name='xnode_locker_validity_idx'),
+            # SNODEs made from a connection (revert / revocation)
+            models.Index(
+                fields=['connection'],
+                name='xnode_connection_snode_idx',
+                condition=models.Q(xnode_Type='SNODE'),
+            ),
+            # Children of a node by parent pointer: node_information @> {"link": id} / {"inode_or_snode_id": id}
+            GinIndex(fields=['node_information'], name='xnode_node_info_gin', opclasses=['jsonb_path_ops']),
+        ]
 
-        
     def __str__(self) -> str:
         return str(self.id)
+
+    @property
+    def provenance_stack(self):
+        """Read-only view of the XnodeProvenance rows in the old JSON list shape."""
+        return [entry.as_dict() for entry in self.provenance_entries.all()]
     """
     post_conditions: {
         "creator_conditions" : {
@@ -86,7 +124,7 @@ class Xnode_V2(models.Model):
         "collateral": True,
         "subset": True
     }
-    provenance_stack : {
+    provenance_stack : (XnodeProvenance rows, xnode_id stored as shared_xnode_id) {
         connection:
         from_user:
         to_user:
@@ -121,12 +159,62 @@ class Xnode_V2(models.Model):
         reverse,
         remarks,->purpose
     }
+    root_inode / depth:
+        Set when a VNODE/SNODE is created (see link_root_inode) so that
+        access_Resource resolves the INODE with one lookup instead of
+        walking link / inode_or_snode_id hop by hop.
 
     Confer => I have the inode/vnode and the other person has the snode with the pointer to the inode/vnode.
     Collateral => I have the snode, with the pointer to the inode/vnode, and the other person has the inode/vnode.
     """
 
 
+class XnodeProvenance(models.Model):
+    """
+    One entry of an xnode's provenance stack (formerly the Xnode_V2.provenance_stack JSON list).
+    Ids are stored as plain integers since they are a historical record of the share.
+    """
+    id = models.AutoField(primary_key=True)
+    xnode = models.ForeignKey(to=Xnode_V2, on_delete=models.CASCADE, related_name='provenance_entries')
+    position = models.IntegerField(default=0)  # order within the stack, lowest first
+    connection = models.IntegerField(null=True, blank=True)
+    from_locker = models.IntegerField(null=True, blank=True)
+    to_locker = models.IntegerField(null=True, blank=True)
+    from_user = models.IntegerField(null=True, blank=True)
+    to_user = models.IntegerField(null=True, blank=True)
+    type_of_share = models.CharField(max_length=20)
+    shared_xnode_id = models.IntegerField(null=True, blank=True)  # "xnode_id" of the entry
+    xnode_post_conditions = models.JSONField(default=dict, null=True, blank=True)
+    reverse = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(
+                fields=['xnode', 'shared_xnode_id', 'type_of_share', 'connection'],
+                name='xnode_prov_lookup_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.type_of_share} {self.from_user}->{self.to_user} ({self.xnode_id})"
+
+    def as_dict(self):
+        return {
+            "connection": self.connection,
+            "from_locker": self.from_locker,
+            "to_locker": self.to_locker,
+            "from_user": self.from_user,
+            "to_user": self.to_user,
+            "type_of_share": self.type_of_share,
+            "xnode_id": self.shared_xnode_id,
+            "xnode_post_conditions": self.xnode_post_conditions,
+            "reverse": self.reverse,
+            "timestamp": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
 # class CollateralRevertRequest(models.Model):
 #     xnode = models.ForeignKey(
 #         Xnode_V2,
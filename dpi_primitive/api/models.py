@@ -218,10 +218,143 @@ class Connection(models.Model):
     close_host = models.BooleanField(default=False)  # Host approval for closure
     close_guest = models.BooleanField(default=False)  # Guest approval for closure 
 
+    # Status counts of terms_value / terms_value_reverse (api.connections.services.term_values),
+    # written by save() together with the terms
+    terms_count_T = models.IntegerField(default=0)
+    terms_count_F = models.IntegerField(default=0)
+    terms_count_R = models.IntegerField(default=0)
+    terms_filled = models.IntegerField(default=0)
+    terms_empty = models.IntegerField(default=0)
+    terms_reverse_count_T = models.IntegerField(default=0)
+    terms_reverse_count_F = models.IntegerField(default=0)
+    terms_reverse_count_R = models.IntegerField(default=0)
+    terms_reverse_filled = models.IntegerField(default=0)
+    terms_reverse_empty = models.IntegerField(default=0)
+
+    # Summary key -> column, per terms field
+    TERMS_STATUS_FIELDS = {
+        'terms_value': {
+            'count_T': 'terms_count_T', 'count_F': 'terms_count_F', 'count_R': 'terms_count_R',
+            'empty': 'terms_empty', 'filled': 'terms_filled',
+        },
+        'terms_value_reverse': {
+            'count_T': 'terms_reverse_count_T', 'count_F': 'terms_reverse_count_F', 'count_R': 'terms_reverse_count_R',
+            'empty': 'terms_reverse_empty', 'filled': 'terms_reverse_filled',
+        },
+    }
+
+    class Meta:
+        indexes = [
+            # Expired connections, for api.tasks.check_connections_valid_until
+            models.Index(fields=['validity_time', 'connection_id'], name='connection_validity_idx'),
+            # Lookups of the connection views (see `manage.py explain_hot_queries`);
+            # connection_type alone is served by its foreign key index
+            models.Index(fields=['host_user', 'connection_status'], name='connection_host_status_idx'),
+            models.Index(fields=['host_user', 'host_locker'], name='connection_host_locker_idx'),
+            models.Index(fields=['guest_user', 'guest_locker'], name='connection_guest_locker_idx'),
+            models.Index(fields=['connection_name', 'guest_locker', 'guest_user'], name='connection_name_lookup_idx'),
+            # Not closed connections per guest (host side: connection_host_status_idx)
+            models.Index(
+                fields=['guest_user'],
+                name='connection_open_guest_idx',
+                condition=~models.Q(connection_status='closed'),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the terms status counts in the same write as the terms; the
+        # post_save receivers (term rows, connection stats) commit with it
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        saved_terms = [
+            field for field in self.TERMS_STATUS_FIELDS
+            if (update_fields is None or field in update_fields) and field not in deferred
+        ]
+        if saved_terms:
+            from api.connections.services.term_values import set_terms_status
+            set_terms_status(self, fields=saved_terms)
+            if update_fields is not None:
+                # Only the counts of the terms fields this save writes
+                kwargs['update_fields'] = {
+                    *update_fields,
+                    *(column for field in saved_terms for column in self.TERMS_STATUS_FIELDS[field].values()),
+                }
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    def terms_status(self):
+        """(summary of terms_value, summary of terms_value_reverse) from the stored counts."""
+        return tuple(
+            {key: getattr(self, column) for key, column in self.TERMS_STATUS_FIELDS[field].items()}
+            for field in ('terms_value', 'terms_value_reverse')
+        )
+
     def __str__(self):
         return self.connection_name
     
 
+class ConnectionStatsCounter(models.Model):
+    """
+    Number of connections of a user's locker per direction and status,
+    kept up to date from Connection saves/deletes when
+    CONNECTION_STATS_COUNTERS is on (rebuild_connection_stats fills it).
+    """
+    INCOMING = 'incoming'  # user is the host
+    OUTGOING = 'outgoing'  # user is the guest
+    DIRECTION_CHOICES = [(INCOMING, 'Incoming'), (OUTGOING, 'Outgoing')]
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='connection_stats_counters')
+    locker = models.ForeignKey(Locker, on_delete=models.CASCADE, related_name='connection_stats_counters')
+    direction = models.CharField(max_length=8, choices=DIRECTION_CHOICES)
+    status = models.CharField(max_length=20, choices=Connection.CONNECTION_STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'locker', 'direction', 'status'], name='connection_stats_counter_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.locker_id} {self.direction} {self.status}: {self.count}"
+
+
+class ConnectionTermValue(models.Model):
+    """
+    One term of Connection.terms_value / terms_value_reverse ("label|xnode_id; T")
+    in columns, so approval checks and status counts are indexed queries. The
+    JSON fields stay what views write and return; rows follow them on every
+    save (api.connections.services.term_values.sync_term_values).
+    """
+    GUEST_TO_HOST = 'guest_to_host'  # terms_value
+    HOST_TO_GUEST = 'host_to_guest'  # terms_value_reverse
+    DIRECTION_CHOICES = [(GUEST_TO_HOST, 'Guest to host'), (HOST_TO_GUEST, 'Host to guest')]
+    TERMS_FIELDS = {GUEST_TO_HOST: 'terms_value', HOST_TO_GUEST: 'terms_value_reverse'}
+    APPROVED = 'T'
+    PENDING = 'F'
+    REJECTED = 'R'
+    STATUS_CHOICES = [(APPROVED, 'Approved'), (PENDING, 'Pending'), (REJECTED, 'Rejected'), ('', 'None')]
+    connection = models.ForeignKey(Connection, on_delete=models.CASCADE, related_name='term_values')
+    term = models.CharField(max_length=255)
+    direction = models.CharField(max_length=13, choices=DIRECTION_CHOICES)
+    # Entry of "canShareMoreData" (extra data shared on top of the connection terms)
+    extra = models.BooleanField(default=False)
+    share_type = models.CharField(max_length=20, blank=True, default='')  # typeOfShare of an extra entry
+    value = models.TextField(blank=True, default='')  # what comes before the status, e.g. "label|42"
+    xnode_id = models.IntegerField(null=True, blank=True)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['connection', 'direction', 'extra', 'term'], name='connection_term_value_key'),
+        ]
+        indexes = [
+            models.Index(fields=['connection', 'xnode_id'], name='term_value_xnode_idx'),
+            models.Index(fields=['connection', 'status'], name='term_value_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.connection_id} {self.direction} {self.term}: {self.value}; {self.status}"
+
+
 
 class Resource(models.Model):
     PUBLIC = 'public'
@@ -241,10 +374,97 @@ class Resource(models.Model):
     drive_file_name = models.CharField(max_length=255, null=True, blank=True)
     drive_mime_type = models.CharField(max_length=100, null=True, blank=True)
     drive_owner_email = models.EmailField(null=True, blank=True)
+    #document metadata, filled when the resource is registered/subsetted (backfill_resource_metadata for older rows)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=80, null=True, blank=True)  # "<algorithm>:<hex digest>"
+
+    class Meta:
+        indexes = [
+            # Duplicate check of every upload (upload_resource)
+            models.Index(fields=['i_node_pointer'], name='resource_inode_pointer_idx'),
+        ]
 
     def __str__(self):
         return self.document_name
 
+class DriveJob(models.Model):
+    """
+    A queued Google Drive copy/transfer (transfer and collateral approvals).
+    Run inside the request, or with DRIVE_JOBS_ASYNC by `manage.py run_drive_jobs`;
+    clients then poll sharing/drive-jobs/<job_id>/.
+    """
+    class Kind(models.TextChoices):
+        TRANSFER = 'transfer', 'Transfer'
+        TRANSFER_REVERSE = 'transfer_reverse', 'Transfer (reverse)'
+        COLLATERAL = 'collateral', 'Collateral'
+        COLLATERAL_REVERSE = 'collateral_reverse', 'Collateral (reverse)'
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    job_id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    payload = models.JSONField(default=dict)  # request body of the approve endpoint
+    result = models.JSONField(default=dict, blank=True)  # JSON response the endpoint would have returned
+    status_code = models.IntegerField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    requested_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='drive_jobs')
+    worker = models.CharField(max_length=100, null=True, blank=True)  # worker that claimed the job
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='drive_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.job_id} ({self.status})"
+
+class SubsetJob(models.Model):
+    """
+    Generation of a subset PDF (create_subset_resource), run in a process pool.
+    Jobs for the same source file and page range share one generated file.
+    Clients poll resource/subset-jobs/<job_id>/.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    job_id = models.AutoField(primary_key=True)
+    source = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='subset_jobs')
+    source_hash = models.CharField(max_length=80, null=True, blank=True)  # Resource.content_hash when queued
+    xnode_id = models.IntegerField()  # xnode the subset was requested from
+    from_page = models.PositiveIntegerField()
+    to_page = models.PositiveIntegerField()
+    resource_name = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    output_path = models.CharField(max_length=255, null=True, blank=True)  # relative to MEDIA_ROOT
+    reused = models.BooleanField(default=False)  # output generated by an earlier job
+    subset_resource = models.ForeignKey(Resource, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    result = models.JSONField(default=dict, blank=True)  # JSON create_subset_resource used to return
+    error = models.TextField(null=True, blank=True)
+    requested_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='subset_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', 'from_page', 'to_page', 'status'], name='subset_job_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"subset job {self.job_id} ({self.status})"
+
 class GlobalConnectionTypeTemplate(models.Model):
     global_connection_type_template_id = models.AutoField(primary_key=True)
     global_connection_type_name = models.CharField(max_length=200, unique=True)
@@ -305,9 +525,29 @@ class Notification(models.Model):
     target_id = models.CharField(max_length=100, blank=True, null=True)         # e.g., locker_id, user_id, etc.
     extra_data = models.JSONField(default=dict, blank=True)                     # e.g., {"locker_name": "...", "locker_description": "..."}
 
+    class Meta:
+        indexes = [
+            # Inbox feed, keyset paginated on (created_at, id)
+            models.Index(fields=['host_user', '-created_at', '-id'], name='notification_feed_idx'),
+            models.Index(fields=['host_user'], name='notification_unread_idx', condition=models.Q(is_read=False)),
+        ]
+
     def __str__(self):
         return f"Notification from {self.guest_user.username} to {self.host_user.username} for connection {self.connection.connection_name}"
 
+class NotificationReadWatermark(models.Model):
+    """
+    "Mark all read" of a user: every notification at or before
+    (read_until, read_until_id) counts as read, whatever its is_read.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='notification_read_watermark')
+    read_until = models.DateTimeField()
+    read_until_id = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} read until {self.read_until_id}"
+
 class ConnectionTerms(models.Model):
     class TermFromTo(models.TextChoices):
         HOST = 'HOST', 'Host'
@@ -0,0 +1,138 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+from api.models import Connection, ConnectionType, Notification, NotificationReadWatermark
+from api.serializers import ConnectionSerializer, ConnectionTypeSerializer
+from api.utils.pagination import as_id, decode_cursor, encode_cursor, keyset_page
+
+# Notification inbox, newest first, paginated with a keyset cursor on
+# (created_at, id) so a page costs the same however deep the user scrolls.
+# A notification is read if its is_read is set or it is at or before the
+# user's NotificationReadWatermark ("mark all read" only moves the watermark).
+
+FEED_DEFAULT_LIMIT = 50
+FEED_MAX_LIMIT = 200
+
+
+def notification_cursor(notification):
+    return encode_cursor(notification.created_at, notification.id)
+
+
+def decode_notification_cursor(cursor):
+    return decode_cursor(cursor, datetime.fromisoformat, int)
+
+
+def user_notifications(user):
+    return Notification.objects.filter(host_user=user).order_by("-created_at", "-id")
+
+
+def _at_or_before(created_at, notification_id):
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=notification_id)
+
+
+def notification_page(user, cursor=None, limit=FEED_DEFAULT_LIMIT):
+    """(notifications, next_cursor) of the page after cursor; next_cursor is None on the last page."""
+    queryset = user_notifications(user)
+    if cursor:
+        created_at, notification_id = decode_notification_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+        )
+    return keyset_page(queryset, limit, notification_cursor)
+
+
+def read_watermark(user):
+    """(created_at, id) of the user's read watermark, None if there is none."""
+    row = NotificationReadWatermark.objects.filter(user=user).values_list("read_until", "read_until_id").first()
+    return tuple(row) if row else None
+
+
+def unread_notifications(user, watermark=None):
+    queryset = Notification.objects.filter(host_user=user, is_read=False)
+    if watermark:
+        queryset = queryset.exclude(_at_or_before(*watermark))
+    return queryset
+
+
+def unread_count(user):
+    return unread_notifications(user, read_watermark(user)).count()
+
+
+def mark_read_by_ids(user, notification_ids):
+    """Marks the user's notifications in notification_ids as read with one UPDATE; returns the number changed."""
+    return Notification.objects.filter(host_user=user, id__in=notification_ids, is_read=False).update(is_read=True)
+
+
+def mark_read_up_to(user, cursor):
+    """Marks the cursor's notification and everything older as read with one UPDATE."""
+    created_at, notification_id = decode_notification_cursor(cursor)
+    return Notification.objects.filter(host_user=user, is_read=False).filter(
+        _at_or_before(created_at, notification_id)
+    ).update(is_read=True)
+
+
+def mark_all_read(user):
+    """
+    Moves the user's read watermark to their newest notification; no
+    notification rows are written. Returns the watermark, None if the user
+    has no notifications.
+    """
+    newest = user_notifications(user).values_list("created_at", "id").first()
+    if newest is None:
+        return None
+    NotificationReadWatermark.objects.update_or_create(
+        user=user,
+        defaults={"read_until": newest[0], "read_until_id": newest[1]},
+    )
+    return tuple(newest)
+
+
+def serialize_notifications(notifications, watermark=None):
+    """
+    Notification dicts with the latest connection / connection type data of
+    the ids in extra_data, loaded in two queries for the whole page.
+    watermark is the user's read_watermark().
+    """
+    connection_ids = set()
+    connection_type_ids = set()
+    for notification in notifications:
+        extra_data = notification.extra_data or {}
+        connection_ids.add(as_id(extra_data.get("connection_id")))
+        connection_type_ids.add(as_id(extra_data.get("connection_type_id")))
+    connection_ids.discard(None)
+    connection_type_ids.discard(None)
+
+    connections = Connection.objects.select_related(
+        "connection_type", "host_locker", "guest_locker", "host_user", "guest_user"
+    ).in_bulk(connection_ids) if connection_ids else {}
+    connection_types = ConnectionType.objects.in_bulk(connection_type_ids) if connection_type_ids else {}
+    connection_data = {pk: ConnectionSerializer(obj).data for pk, obj in connections.items()}
+    connection_type_data = {pk: ConnectionTypeSerializer(obj).data for pk, obj in connection_types.items()}
+
+    notifications_data = []
+    for notification in notifications:
+        extra_data = notification.extra_data or {}
+        connection_info = connection_data.get(as_id(extra_data.get("connection_id")))
+        connection_type_info = connection_type_data.get(as_id(extra_data.get("connection_type_id")))
+        notifications_data.append(
+            {
+                "id": notification.id,
+                "is_read": notification.is_read or (
+                    watermark is not None and (notification.created_at, notification.id) <= watermark
+                ),
+                "message": notification.message,
+                "created_at": notification.created_at,
+                "notification_type": notification.notification_type,
+                "target_type": notification.target_type,
+                "target_id": notification.target_id,
+                "extra_data": {
+                    **extra_data,
+                    "connection_info": connection_info,
+                    "connection_type_info": connection_type_info,
+                },
+                "connection_info": connection_info,
+                "connection_type_info": connection_type_info,
+            }
+        )
+    return notifications_data
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import queue
+import select
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+# Pub/sub for new notifications, used by the notification/stream/ SSE view.
+# Messages only say which notification is new ({"id": ...}); subscribers load
+# the rows themselves. NOTIFICATION_BROKER picks the backend:
+#   InProcessBroker  - publisher and subscribers in the same process (runserver)
+#   PostgresBroker   - NOTIFY on commit, one LISTEN thread per process fans out
+#   RecordingBroker  - in-process, keeps everything published (tests)
+
+
+class Subscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=1000)
+
+    def get(self, timeout=None):
+        """Next message, None if nothing arrived within timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            pass  # subscriber is not reading; it re-reads the table on its next wake-up anyway
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncSubscription(Subscription):
+    """Subscription awaited on an event loop (the ASGI stream), so waiting holds no thread."""
+
+    def __init__(self, broker, user_id):
+        super().__init__(broker, user_id)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=1000)
+
+    async def get(self, timeout=None):
+        """Next message, None if nothing arrived within timeout."""
+        try:
+            if timeout == 0:
+                return self.queue.get_nowait()
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            return None
+
+    def put(self, message):
+        # Called from the publishing or listener thread
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)  # user_id -> {Subscription}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, asynchronous=False):
+        # asynchronous=True must be called on the event loop that awaits the subscription
+        subscription = (AsyncSubscription if asynchronous else Subscription)(self, user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, message):
+        self.deliver(user_id, message)
+
+    def publish_many(self, messages):
+        for user_id, message in messages:
+            self.publish(user_id, message)
+
+    def deliver(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+class RecordingBroker(InProcessBroker):
+    """In-process broker that also keeps every published (user_id, message), for tests."""
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, user_id, message):
+        self.published.append((user_id, message))
+        super().publish(user_id, message)
+
+
+class PostgresBroker(InProcessBroker):
+    channel = "dpi_notifications"
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, user_id, message):
+        self.publish_many([(user_id, message)])
+
+    def publish_many(self, messages):
+        # Delivered to every process's listener thread, this one included
+        payloads = [json.dumps({"user_id": user_id, "message": message}) for user_id, message in messages]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                [self.channel, payloads],
+            )
+
+    def subscribe(self, user_id, asynchronous=False):
+        self._ensure_listener()
+        return super().subscribe(user_id, asynchronous)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="notification-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2.extensions
+
+        while True:
+            raw = None
+            try:
+                params = connections["default"].get_connection_params()
+                raw = connections["default"].get_new_connection(params)
+                raw.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                while True:
+                    if select.select([raw], [], [], 30) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        notify = raw.notifies.pop(0)
+                        try:
+                            data = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        self.deliver(data["user_id"], data["message"])
+            except Exception:
+                traceback.print_exc()
+                time.sleep(1)  # database went away: reconnect
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_notification_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            default = (
+                "api.notifications.services.pubsub.PostgresBroker"
+                if connection.vendor == "postgresql"
+                else "api.notifications.services.pubsub.InProcessBroker"
+            )
+            _broker = import_string(getattr(settings, "NOTIFICATION_BROKER", default))()
+        return _broker
+
+
+def set_notification_broker(broker):
+    # Swaps the process broker (e.g. a RecordingBroker in tests); returns the previous one
+    global _broker
+    with _broker_lock:
+        previous, _broker = _broker, broker
+    return previous
+
+
+def publish_new_notifications(notifications):
+    """Announces saved notifications to their host_user once the transaction commits."""
+    messages = [(n.host_user_id, {"id": n.id}) for n in notifications if n.id is not None]
+    if not messages:
+        return
+
+    def publish():
+        try:
+            get_notification_broker().publish_many(messages)
+        except Exception:
+            traceback.print_exc()
+
+    transaction.on_commit(publish)
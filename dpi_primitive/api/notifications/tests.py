@@ -1,3 +1,118 @@
-from django.test import TestCase
+import asyncio
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Connection, ConnectionType, CustomUser, Locker, Notification
+from api.notifications.services.pubsub import InProcessBroker, set_notification_broker
+from api.notifications.views import notification_stream as stream
+
+
+class NotificationStreamTests(TransactionTestCase):
+    # Committed rows: the stream closes its database connection while it waits
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="host", email="host@example.com")
+        guest = CustomUser.objects.create(username="guest", email="guest@example.com")
+        self.locker = Locker.objects.create(name="locker", user=self.user)
+        guest_locker = Locker.objects.create(name="guest locker", user=guest)
+        connection_type = ConnectionType.objects.create(
+            connection_type_name="type", owner_user=self.user, owner_locker=self.locker
+        )
+        self.connection = Connection.objects.create(
+            connection_name="conn",
+            connection_type=connection_type,
+            host_user=self.user,
+            host_locker=self.locker,
+            guest_user=guest,
+            guest_locker=guest_locker,
+        )
+        previous = set_notification_broker(InProcessBroker())
+        self.addCleanup(set_notification_broker, previous)
+
+    def notify(self, message="hello"):
+        return Notification.objects.create(
+            connection=self.connection,
+            host_user=self.user,
+            guest_user=self.connection.guest_user,
+            host_locker=self.locker,
+            guest_locker=self.connection.guest_locker,
+            message=message,
+        )
+
+    def get(self, **kwargs):
+        return stream.notification_stream(APIRequestFactory().get("/", **kwargs))
+
+    def test_token_from_header_cookie_or_query(self):
+        token = str(AccessToken.for_user(self.user))
+        factory = APIRequestFactory()
+        with_cookie = factory.get("/")
+        with_cookie.COOKIES["access_token"] = token
+        requests = {
+            "header": factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}"),
+            "cookie": with_cookie,
+            "query": factory.get("/", {"access_token": token}),
+        }
+        for name, request in requests.items():
+            with self.subTest(name):
+                response = stream.notification_stream(request)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Type"], "text/event-stream")
+                response.close()
+
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(data={"access_token": "invalid"}).status_code, 401)
+
+    def test_wsgi_stream_is_a_short_long_poll(self):
+        first = self.notify("first")
+        events = stream._event_stream(self.user, 0)
+        self.assertTrue(next(events).startswith("retry: 1000"))
+        self.assertIn(f"id: {first.id}\n", next(events))
+
+        # Nothing new: the stream ends at STREAM_WSGI_MAX_DURATION, not at STREAM_MAX_DURATION
+        started = time.monotonic()
+        with mock.patch.object(stream, "STREAM_WSGI_MAX_DURATION", 0.2):
+            self.assertEqual([event for event in events if not event.startswith(":")], [])
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_asgi_stream_wakes_up_on_a_new_notification(self):
+        newest = self.notify("before").id
+
+        async def receive():
+            events = stream._async_event_stream(self.user, newest)
+            try:
+                self.assertTrue((await events.__anext__()).startswith("retry: 3000"))
+                waiting = asyncio.ensure_future(events.__anext__())
+                await asyncio.sleep(0.3)  # read the table and wait on the broker
+                self.assertFalse(waiting.done())
+                created = await sync_to_async(self.notify)("after")
+                # well before the heartbeat: woken by the broker, not by a timeout
+                event = await asyncio.wait_for(waiting, timeout=3)
+                return created, event
+            finally:
+                await events.aclose()
+
+        created, event = async_to_sync(receive)()
+        self.assertIn(f"id: {created.id}\n", event)
+        self.assertIn('"message": "after"', event)
+
+    def test_asgi_request_gets_the_async_stream(self):
+        token = str(AccessToken.for_user(self.user))
+
+        async def first_chunk():
+            response = await self.async_client.get(reverse("notification-stream"), {"access_token": token})
+            chunks = aiter(response.streaming_content)
+            try:
+                return response, await anext(chunks)
+            finally:
+                await chunks.aclose()
+
+        response, chunk = async_to_sync(first_chunk)()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertTrue(chunk.startswith(b"retry: 3000"))
@@ -2,13 +2,17 @@
 from django.urls import path
 
 # notifications
-from .views.get_and_read_notifications import get_notifications, mark_notifications_read
+from .views.get_and_read_notifications import get_notifications, get_unread_notification_count, mark_notifications_read, mark_notifications_read_bulk
+from .views.notification_stream import notification_stream
 from .views.reject_resource_notification import reject_resource_notification
 from .views.reject_revert_consent import reject_revert_consent
 
 urlpatterns = [
     path('list/', get_notifications, name='get-notifications'),
+    path('stream/', notification_stream, name='notification-stream'),
+    path('unread-count/', get_unread_notification_count, name='get-unread-notification-count'),
     path("mark-as-read/", mark_notifications_read, name="mark-notification-read"),
+    path("mark-as-read/bulk/", mark_notifications_read_bulk, name="mark-notifications-read-bulk"),
     path("reject-resource/", reject_resource_notification, name="reject_resource_notification"),
     path("reject_revert_consent/", reject_revert_consent,name="reject_revert_consent"),
 ]
@@ -5,13 +5,7 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from api.serializers import (
-    ConnectionTypeSerializer,
-    ConnectionSerializer
-)
 from api.models import (
-    Connection,
-    ConnectionType,
     Notification
 )
 from django.http import JsonResponse
@@ -20,11 +14,29 @@ from django.http import JsonResponse
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db.models import Q
 
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from api.notifications.services.feed import (
+    FEED_DEFAULT_LIMIT,
+    FEED_MAX_LIMIT,
+    mark_all_read,
+    mark_read_by_ids,
+    mark_read_up_to,
+    notification_page,
+    read_watermark,
+    serialize_notifications,
+    unread_count,
+    user_notifications,
+)
+from api.utils.pagination import InvalidCursor
 
 # =======================Get Notifications===============================
 @extend_schema(
-    description="Get all notifications for the authenticated user, with latest connection data.",
+    description="Get notifications for the authenticated user (newest first), with latest connection data. "
+    "Pass `limit` (and the returned `next_cursor` as `cursor`) to page through them; without either, all notifications are returned.",
+    parameters=[
+        OpenApiParameter(name="limit", description=f"Page size (max {FEED_MAX_LIMIT})", required=False, type=int),
+        OpenApiParameter(name="cursor", description="next_cursor of the previous page", required=False, type=str),
+    ],
     responses={
         200: OpenApiResponse(
             description="Notifications retrieved successfully",
@@ -43,7 +55,8 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
                                 "notification_type": {"type": "string"}
                             }
                         }
-                    }
+                    },
+                    "next_cursor": {"type": "string", "nullable": True},
                 },
                 "example": {
                     "success": True,
@@ -54,7 +67,8 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
                             "message": "New connection request",
                             "notification_type": "request"
                         }
-                    ]
+                    ],
+                    "next_cursor": None
                 }
             }
         ),
@@ -66,68 +80,61 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
     """
-    Get all notifications for the authenticated user, with latest connection data.
+    Get notifications for the authenticated user, with latest connection data.
+    ?limit=<n>&cursor=<next_cursor> returns one page at a time.
     """
     try:
         curr_user = request.user
-        notifications = Notification.objects.filter(host_user=curr_user).order_by(
-            "-created_at"
-        )
-
-        notifications_data = []
-
-        for notification in notifications:
-            connection_data = None
-            connection_type_data = None
-
-            # Safely get the connection info from extra_data
-            extra_data = notification.extra_data or {}
-
-            connection_id = extra_data.get("connection_id")
-            connection_type_id = extra_data.get("connection_type_id")
-
-            # Fetch current connection and connection type info
-            if connection_id:
-                try:
-                    connection = Connection.objects.get(connection_id=connection_id)
-                    connection_data = ConnectionSerializer(connection).data
-                except Connection.DoesNotExist:
-                    connection_data = None
-
-            if connection_type_id:
-                try:
-                    connection_type = ConnectionType.objects.get(connection_type_id=connection_type_id)
-                    connection_type_data = ConnectionTypeSerializer(connection_type).data
-                except ConnectionType.DoesNotExist:
-                    connection_type_data = None
-
-            extra_data_info = {
-                **extra_data,
-                "connection_info": connection_data,
-                "connection_type_info": connection_type_data,
-            }
+        limit = request.GET.get("limit")
+        cursor = request.GET.get("cursor")
 
-            notifications_data.append(
-                {
-                    "id": notification.id,
-                    "is_read": notification.is_read,
-                    "message": notification.message,
-                    "created_at": notification.created_at,
-                    "notification_type": notification.notification_type,
-                    "target_type": notification.target_type,
-                    "target_id": notification.target_id,
-                    "extra_data": extra_data_info,
-                    "connection_info": connection_data,  
-                    "connection_type_info": connection_type_data,
-                }
-            )
+        if limit is None and cursor is None:
+            notifications = list(user_notifications(curr_user))
+            next_cursor = None
+        else:
+            try:
+                limit = min(max(int(limit or FEED_DEFAULT_LIMIT), 1), FEED_MAX_LIMIT)
+            except ValueError:
+                return JsonResponse({"success": False, "error": "limit must be an integer"}, status=400)
+            notifications, next_cursor = notification_page(curr_user, cursor=cursor, limit=limit)
 
         return JsonResponse(
-            {"success": True, "notifications": notifications_data}, status=200
+            {
+                "success": True,
+                "notifications": serialize_notifications(notifications, read_watermark(curr_user)),
+                "next_cursor": next_cursor,
+            },
+            status=200,
         )
 
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+
+# =======================Unread Notification Count===============================
+@extend_schema(
+    description="Number of unread notifications of the authenticated user.",
+    responses={
+        200: OpenApiResponse(
+            description="Unread count",
+            response={
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean"},
+                    "unread_count": {"type": "integer"}
+                },
+                "example": {"success": True, "unread_count": 3}
+            }
+        ),
+    }
+)
+@api_view(["GET"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_unread_notification_count(request):
+    return JsonResponse({"success": True, "unread_count": unread_count(request.user)}, status=200)
     
     
 # ===================Mark Notifications as Read=======================
@@ -187,3 +194,66 @@ def mark_notifications_read(request):
         return JsonResponse({"success": False, "error": "Notification not found."}, status=404)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+
+# ===================Bulk Mark Notifications as Read=======================
+@extend_schema(
+    description="Mark many notifications as read in one update. Body (one of): "
+    "{'notification_ids': [ids]}, {'up_to_cursor': next_cursor/cursor of the feed} (that notification and everything older), "
+    "or {'all': true} (moves the user's read watermark, no rows are rewritten).",
+    request={
+        'application/json': {
+            'type': 'object',
+            'properties': {
+                'notification_ids': {'type': 'array', 'items': {'type': 'integer'}},
+                'up_to_cursor': {'type': 'string'},
+                'all': {'type': 'boolean'}
+            }
+        }
+    },
+    responses={
+        200: OpenApiResponse(
+            description="Notifications marked as read",
+            response={
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean"},
+                    "updated": {"type": "integer"},
+                    "unread_count": {"type": "integer"}
+                },
+                "example": {"success": True, "updated": 12, "unread_count": 0}
+            }
+        ),
+        400: OpenApiResponse(description="Invalid request"),
+    }
+)
+@api_view(["POST"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def mark_notifications_read_bulk(request):
+    try:
+        curr_user = request.user
+        notification_ids = request.data.get("notification_ids")
+        up_to_cursor = request.data.get("up_to_cursor")
+        mark_all = request.data.get("all")
+
+        if mark_all:
+            mark_all_read(curr_user)
+            updated = None
+        elif up_to_cursor:
+            updated = mark_read_up_to(curr_user, up_to_cursor)
+        elif notification_ids:
+            if not isinstance(notification_ids, list) or not all(isinstance(i, int) for i in notification_ids):
+                return JsonResponse({"success": False, "error": "notification_ids must be a list of integers."}, status=400)
+            updated = mark_read_by_ids(curr_user, notification_ids)
+        else:
+            return JsonResponse(
+                {"success": False, "error": "notification_ids, up_to_cursor or all is required."}, status=400
+            )
+
+        return JsonResponse({"success": True, "updated": updated, "unread_count": unread_count(curr_user)}, status=200)
+
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
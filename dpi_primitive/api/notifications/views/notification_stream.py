@@ -0,0 +1,174 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    authentication_classes,
+    renderer_classes,
+)
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+
+from api.authentication.services.jwt_token_manager import QueryOrCookieJWTAuthentication
+from api.models import Notification
+from api.notifications.services.feed import read_watermark, serialize_notifications
+from api.notifications.services.pubsub import get_notification_broker
+
+# Server-sent events replacement for polling notification/list/: the
+# connection waits on the notification broker and sends each new notification
+# (same fields as list/) as an event whose id is the notification id.
+# Reconnecting with Last-Event-ID (or ?since_id) resumes after that notification.
+# Served by an ASGI server the stream waits on the event loop; under WSGI every
+# open stream holds a worker thread, so it ends after STREAM_WSGI_MAX_DURATION
+# (a long-poll the EventSource reconnects from by itself).
+
+STREAM_HEARTBEAT = 15  # seconds between keepalive comments
+STREAM_RECHECK = 30  # re-read the table even without a message (missed NOTIFY, other broker)
+STREAM_MAX_DURATION = 300  # ASGI: the client reconnects after this
+STREAM_WSGI_MAX_DURATION = 25  # WSGI: the client reconnects after this, freeing the worker thread
+STREAM_BATCH = 50
+
+
+class EventStreamRenderer(BaseRenderer):
+    # Lets DRF accept "Accept: text/event-stream"; errors are still sent as JSON
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def _event(notification_data):
+    data = json.dumps(notification_data, cls=DjangoJSONEncoder)
+    return f"id: {notification_data['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+def _new_notifications(user, last_id):
+    notifications = list(
+        Notification.objects.filter(host_user=user, id__gt=last_id).order_by("id")[:STREAM_BATCH]
+    )
+    if not notifications:
+        return []
+    return serialize_notifications(notifications, read_watermark(user))
+
+
+def _read_batch(user, last_id):
+    notifications_data = _new_notifications(user, last_id)
+    if len(notifications_data) < STREAM_BATCH:
+        # Don't hold a database connection while waiting
+        connection.close()
+    return notifications_data
+
+
+def _event_stream(user, last_id):
+    # WSGI: runs in the worker thread, for at most STREAM_WSGI_MAX_DURATION
+    # Subscribed before the first read so nothing created in between is missed
+    subscription = get_notification_broker().subscribe(user.user_id)
+    try:
+        yield f"retry: 1000\n: connected, last id {last_id}\n\n"
+        started = time.monotonic()
+        check = True  # read once right away: catches up after a reconnect
+        while time.monotonic() - started < STREAM_WSGI_MAX_DURATION:
+            if check:
+                # Drain what else arrived meanwhile; one query covers all of it
+                while subscription.get(timeout=0) is not None:
+                    pass
+                last_check = time.monotonic()
+                while True:
+                    notifications_data = _read_batch(user, last_id)
+                    for notification_data in notifications_data:
+                        last_id = notification_data["id"]
+                        yield _event(notification_data)
+                    if len(notifications_data) < STREAM_BATCH:
+                        break
+            remaining = STREAM_WSGI_MAX_DURATION - (time.monotonic() - started)
+            message = subscription.get(timeout=max(0, min(STREAM_HEARTBEAT, remaining)))
+            check = message is not None or time.monotonic() - last_check >= STREAM_RECHECK
+            if not check:
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+async def _async_event_stream(user, last_id):
+    # ASGI: same as _event_stream, but waits on the event loop instead of a thread
+    subscription = get_notification_broker().subscribe(user.user_id, asynchronous=True)
+    read_batch = sync_to_async(_read_batch)
+    try:
+        yield f"retry: 3000\n: connected, last id {last_id}\n\n"
+        started = time.monotonic()
+        check = True
+        while time.monotonic() - started < STREAM_MAX_DURATION:
+            if check:
+                while await subscription.get(timeout=0) is not None:
+                    pass
+                last_check = time.monotonic()
+                while True:
+                    notifications_data = await read_batch(user, last_id)
+                    for notification_data in notifications_data:
+                        last_id = notification_data["id"]
+                        yield _event(notification_data)
+                    if len(notifications_data) < STREAM_BATCH:
+                        break
+            message = await subscription.get(timeout=STREAM_HEARTBEAT)
+            check = message is not None or time.monotonic() - last_check >= STREAM_RECHECK
+            if not check:
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+# =======================Notification Stream===============================
+@extend_schema(
+    description="Server-sent events stream of the authenticated user's new notifications. "
+    "Each event is `event: notification` with the notification (as in list/) as data and its id as the event id. "
+    "The stream ends after a few minutes (25 seconds when served over WSGI); reconnect with the Last-Event-ID header (or `since_id`) to resume. "
+    "EventSource cannot set the Authorization header, so the access token may also come from the `access_token` cookie or query parameter.",
+    parameters=[
+        OpenApiParameter(name="since_id", description="Send notifications with an id above this (default: only new ones)", required=False, type=int),
+        OpenApiParameter(name="access_token", description="JWT access token, when neither the Authorization header nor the access_token cookie is sent", required=False, type=str),
+    ],
+    responses={
+        200: OpenApiResponse(description="text/event-stream of notifications"),
+        400: OpenApiResponse(description="Invalid since_id"),
+        401: OpenApiResponse(description="User not authenticated"),
+        405: OpenApiResponse(description="Invalid request method"),
+    },
+)
+@csrf_exempt
+@api_view(["GET"])
+@authentication_classes([QueryOrCookieJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def notification_stream(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "error": "Invalid request method"}, status=405)
+
+    user = request.user
+    since_id = request.headers.get("Last-Event-ID") or request.GET.get("since_id")
+    if since_id:
+        try:
+            last_id = int(since_id)
+        except ValueError:
+            return JsonResponse({"success": False, "error": "since_id must be an integer"}, status=400)
+    else:
+        newest = Notification.objects.filter(host_user=user).order_by("-id").values_list("id", flat=True).first()
+        last_id = newest or 0
+
+    if isinstance(request._request, ASGIRequest):
+        events = _async_event_stream(user, last_id)
+    else:
+        events = _event_stream(user, last_id)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: send events as they are written
+    return response
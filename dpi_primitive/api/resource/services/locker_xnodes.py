@@ -0,0 +1,71 @@
+from django.db.models import prefetch_related_objects
+
+from api.model.xnode_model import Xnode_V2
+from api.serializers import XNODE_SERIALIZER_RELATED, XnodeV2Serializer, xnode_serializer_users
+from api.utils.pagination import decode_cursor, encode_cursor, keyset_page
+from api.utils.resource_helper.access_resource_helper import access_Resource, access_Resource_documents
+
+# Xnodes of a locker for resource/get-all-xnodes-for-locker/, in id order and
+# paginated with a keyset cursor on the id, so a page costs the same however
+# many nodes the locker holds. The INODEs, Resources, users and provenance of
+# a page are loaded together.
+
+LOCKER_XNODES_DEFAULT_LIMIT = 100
+LOCKER_XNODES_MAX_LIMIT = 500
+
+
+class UnresolvedXnode(Exception):
+    """An xnode of the page whose INODE or Resource does not exist; carries the view's error body."""
+
+    def __init__(self, body):
+        super().__init__(body)
+        self.body = body
+
+
+def locker_xnodes(locker, xnode_type=None, status=None, connection_id=None):
+    queryset = Xnode_V2.objects.filter(locker=locker)
+    if xnode_type:
+        queryset = queryset.filter(xnode_Type=xnode_type)
+    if status:
+        queryset = queryset.filter(status=status)
+    if connection_id:
+        queryset = queryset.filter(connection_id=connection_id)
+    return queryset.select_related(*XNODE_SERIALIZER_RELATED).order_by("id")
+
+
+def locker_xnode_page(queryset, cursor=None, limit=LOCKER_XNODES_DEFAULT_LIMIT):
+    """(xnodes, next_cursor) of the page after cursor; next_cursor is None on the last page."""
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        queryset = queryset.filter(id__gt=last_id)
+    return keyset_page(queryset, limit, lambda xnode: encode_cursor(xnode.id))
+
+
+def serialize_locker_xnodes(xnodes, include_private):
+    """
+    Serialized xnodes with their resource_name. Without include_private only
+    xnodes of public resources are returned (so a page can hold fewer items
+    than its limit). Raises UnresolvedXnode for an xnode whose INODE or
+    Resource is missing.
+    """
+    documents = access_Resource_documents(xnodes)
+
+    visible = []
+    for xnode in xnodes:
+        if xnode.id not in documents:
+            if access_Resource(xnode.id) is None:
+                raise UnresolvedXnode({"message": f"Starting Inode for Xnode with ID = {xnode.id} does not exist."})
+            raise UnresolvedXnode({"error": f"Resource not found for Xnode ID = {xnode.id}"})
+        _, resource = documents[xnode.id]
+        # Check visibility based on whether the user is the owner or not
+        if include_private or resource.type == "public":
+            visible.append((xnode, resource))
+
+    prefetch_related_objects([xnode for xnode, _ in visible], "provenance_entries")
+    context = {"users": xnode_serializer_users([xnode for xnode, _ in visible])}
+    xnode_data_with_resources = []
+    for xnode, resource in visible:
+        xnode_data = XnodeV2Serializer(xnode, context=context).data
+        xnode_data["resource_name"] = resource.document_name
+        xnode_data_with_resources.append(xnode_data)
+    return xnode_data_with_resources
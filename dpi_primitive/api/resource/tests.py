@@ -1,3 +1,106 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from pypdf import PdfWriter
+
+from api.model.xnode_model import Xnode_V2
+from api.models import CustomUser, Locker, Resource, SubsetJob
+from api.utils.resource_helper import subset_jobs
+from api.utils.resource_helper.document_metadata import extract_pdf_metadata
+
+
+class SubsetJobDedupeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username="owner", email="owner@example.com")
+        cls.locker = Locker.objects.create(name="locker", user=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, SUBSET_JOBS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.source, self.inode = self.pdf_resource("source", pages=5)
+        self.written = mock.patch.object(subset_jobs, "write_pdf_subset", wraps=subset_jobs.write_pdf_subset)
+        self.write_pdf_subset = self.written.start()
+        self.addCleanup(self.written.stop)
+
+    def pdf_resource(self, name, pages):
+        path = os.path.join("documents", f"{name}.pdf")
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, "documents"), exist_ok=True)
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=200, height=200)
+        writer.add_metadata({"/Title": name})
+        with open(os.path.join(settings.MEDIA_ROOT, path), "wb") as f:
+            writer.write(f)
+        resource = Resource.objects.create(
+            document_name=name,
+            i_node_pointer=path,
+            locker=self.locker,
+            owner=self.user,
+            validity_time=timezone.now() + timedelta(days=10),
+            **extract_pdf_metadata(os.path.join(settings.MEDIA_ROOT, path)),
+        )
+        inode = Xnode_V2.objects.create(
+            locker=self.locker,
+            creator=self.user.user_id,
+            created_at=timezone.now(),
+            validity_until=timezone.now() + timedelta(days=10),
+            xnode_Type=Xnode_V2.XnodeType.INODE,
+            node_information={"resource_id": resource.resource_id, "current_owner": self.user.user_id},
+        )
+        return resource, inode
+
+    def subset(self, name, from_page, to_page, source=None, inode=None):
+        return subset_jobs.enqueue_subset_job(
+            source or self.source, (inode or self.inode).id, from_page, to_page, name, requested_by=self.user
+        )
+
+    def test_same_range_is_written_once(self):
+        first = self.subset("first", 2, 3)
+        second = self.subset("second", 2, 3)
+
+        self.assertEqual((first.status, first.reused), (SubsetJob.Status.SUCCEEDED, False))
+        self.assertEqual((second.status, second.reused), (SubsetJob.Status.SUCCEEDED, True))
+        self.assertEqual(self.write_pdf_subset.call_count, 1)
+        self.assertEqual(first.output_path, second.output_path)
+        self.assertEqual(first.subset_resource.content_hash, second.subset_resource.content_hash)
+        self.assertNotEqual(first.subset_resource_id, second.subset_resource_id)
+        self.assertEqual(second.subset_resource.page_count, 2)
+
+    def test_other_range_or_source_is_written_again(self):
+        self.subset("first", 2, 3)
+        self.subset("other range", 2, 4)
+        other_source, other_inode = self.pdf_resource("other", pages=5)
+        self.subset("other source", 2, 3, other_source, other_inode)
+        self.assertEqual(self.write_pdf_subset.call_count, 3)
+
+    def test_changed_source_file_is_written_again(self):
+        first = self.subset("first", 2, 3)
+        Resource.objects.filter(pk=self.source.pk).update(content_hash="sha256:changed")
+        self.source.refresh_from_db()
+        second = self.subset("second", 2, 3)
+        self.assertFalse(second.reused)
+        self.assertNotEqual(first.output_path, second.output_path)
+        self.assertEqual(self.write_pdf_subset.call_count, 2)
+
+    @override_settings(SUBSET_JOBS_ASYNC=True)
+    def test_range_being_written_is_shared(self):
+        pool = mock.Mock()
+        pool.submit.return_value = Future()
+        with mock.patch.object(subset_jobs, "_subset_pool", return_value=pool), \
+                mock.patch.dict(subset_jobs._inflight, clear=True):
+            first = self.subset("first", 2, 3)
+            second = self.subset("second", 2, 3)
+        self.assertEqual(pool.submit.call_count, 1)
+        self.assertEqual((first.status, first.reused), (SubsetJob.Status.RUNNING, False))
+        self.assertEqual((second.status, second.reused), (SubsetJob.Status.RUNNING, True))
@@ -3,6 +3,7 @@ from django.urls import path
 # #resource
 from .views.get_resource import get_resource_by_user_by_locker,get_public_resources
 from .views.upload import upload_resource,create_subset_resource
+from .views.subset_jobs import subset_job_status
 from .views.Resource_CURD import delete_Update_Resource
 from .views.consent_artefact_CURD import consent_artifact_view_update
 from .views.access import access_Resource_API,access_res_submitted
@@ -17,6 +18,7 @@ urlpatterns = [
     path("get-by-user-locker/", get_resource_by_user_by_locker,name="get-resources-user-locker",),
     path("upload/", upload_resource, name="upload_resource"),
     path("create-subset/", create_subset_resource, name="create_subset_resource"),
+    path("subset-jobs/<int:job_id>/", subset_job_status, name="subset_job_status"),
     path('edit-delete/', delete_Update_Resource, name='edit_delete_resource'),
 
     path('consent-artefact-view-edit/',consent_artifact_view_update,name='consent_artefact_view_update'),
@@ -17,6 +17,7 @@ from drf_spectacular.utils import (
 from drf_spectacular.types import OpenApiTypes
 
 from api.utils.resource_helper.resource_CURD import delete_descendants, update_parents, send_deletion_notification
+from api.utils.resource_helper.access_resource_helper import clear_root_inode_through
 
 
 @extend_schema(
@@ -138,6 +139,7 @@ def delete_Update_Resource(request: HttpRequest) -> JsonResponse:
 
         delete_xnode_list.append(xnode.id)
         print(f"Deleting parent Xnode: {xnode.id} ({xnode_type})")
+        clear_root_inode_through([xnode.id])
         xnode.delete()
 
         message = f"Successfully deleted {xnode_type} {xnode_id} and all descendants: {delete_xnode_list}"
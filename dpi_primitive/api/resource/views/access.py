@@ -7,7 +7,7 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.conf import settings
-from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
+from api.models import Resource, Connection ,Notification
 from api.model.xnode_model import Xnode_V2
 from api.serializers import ResourceSerializer, XnodeV2Serializer
 from api.serializers import ConnectionSerializer
@@ -157,17 +157,12 @@ def access_Resource_API(request: HttpRequest) -> JsonResponse:
 
                 rich_access_path = []
                 for step in access_path:
-                    from_user_obj = CustomUser.objects.filter(username=step['from_user']).first()
-                    to_user_obj = CustomUser.objects.filter(username=step['to_user']).first()
-                    from_locker_obj = Locker.objects.filter(name=step['from_locker']).first()
-                    to_locker_obj = Locker.objects.filter(name=step['to_locker']).first()
-                    conn_obj = ConnectionType.objects.filter(connection_type_name=step['connection_type']).first() if step['connection_type'] != 'Direct' else None
                     rich_access_path.append({
-                        'from_user': step['from_user'], 'from_user_id': from_user_obj.user_id if from_user_obj else None,
-                        'from_locker': step['from_locker'], 'from_locker_id': from_locker_obj.locker_id if from_locker_obj else None,
-                        'to_user': step['to_user'], 'to_user_id': to_user_obj.user_id if to_user_obj else None,
-                        'to_locker': step['to_locker'], 'to_locker_id': to_locker_obj.locker_id if to_locker_obj else None,
-                        'connection_type': step['connection_type'], 'connection_type_id': conn_obj.connection_type_id if conn_obj else None,
+                        'from_user': step['from_user'], 'from_user_id': step['from_user_id'],
+                        'from_locker': step['from_locker'], 'from_locker_id': step['from_locker_id'],
+                        'to_user': step['to_user'], 'to_user_id': step['to_user_id'],
+                        'to_locker': step['to_locker'], 'to_locker_id': step['to_locker_id'],
+                        'connection_type': step['connection_type'], 'connection_type_id': step['connection_type_id'],
                         'via_node_type': step['via_node_type'],
                     })
 
@@ -365,17 +360,12 @@ def access_res_submitted(request: HttpRequest) -> JsonResponse:
                 # --- Build rich access path and extra data for Notification  ---
                 rich_access_path = []
                 for step in access_path:
-                    from_user_obj = CustomUser.objects.filter(username=step['from_user']).first()
-                    to_user_obj = CustomUser.objects.filter(username=step['to_user']).first()
-                    from_locker_obj = Locker.objects.filter(name=step['from_locker']).first()
-                    to_locker_obj = Locker.objects.filter(name=step['to_locker']).first()
-                    conn_obj = ConnectionType.objects.filter(connection_type_name=step['connection_type']).first() if step['connection_type'] != 'Direct' else None
                     rich_access_path.append({
-                        'from_user': step['from_user'], 'from_user_id': from_user_obj.user_id if from_user_obj else None,
-                        'from_locker': step['from_locker'], 'from_locker_id': from_locker_obj.locker_id if from_locker_obj else None,
-                        'to_user': step['to_user'], 'to_user_id': to_user_obj.user_id if to_user_obj else None,
-                        'to_locker': step['to_locker'], 'to_locker_id': to_locker_obj.locker_id if to_locker_obj else None,
-                        'connection_type': step['connection_type'], 'connection_type_id': conn_obj.connection_type_id if conn_obj else None,
+                        'from_user': step['from_user'], 'from_user_id': step['from_user_id'],
+                        'from_locker': step['from_locker'], 'from_locker_id': step['from_locker_id'],
+                        'to_user': step['to_user'], 'to_user_id': step['to_user_id'],
+                        'to_locker': step['to_locker'], 'to_locker_id': step['to_locker_id'],
+                        'connection_type': step['connection_type'], 'connection_type_id': step['connection_type_id'],
                         'via_node_type': step['via_node_type'],
                     })
                 
@@ -6,6 +6,8 @@ from rest_framework.permissions import IsAuthenticated
 from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from api.utils.google_drive_helper.drive_helper import get_or_refresh_google_token
+from api.utils.google_drive_helper.drive_client import get_drive_http_session
+from api.utils.google_drive_helper.stream_cache import cached_drive_response, cached_export_response
 import requests
 from django.http import StreamingHttpResponse, HttpResponse, JsonResponse
 from api.utils.resource_helper.access_resource_helper import access_Resource
@@ -73,18 +75,6 @@ def stream_resource(request):
     if resource.type == Resource.PRIVATE and not owner_token:
         return JsonResponse({"message": "Owner Google token unavailable. Access denied."}, status=403)
 
-    headers = {}
-    if owner_token:
-        headers["Authorization"] = f"Bearer {owner_token}"
-
-    # Range header for partial streaming
-    range_header = request.META.get("HTTP_RANGE", None)
-    if range_header:
-        headers["Range"] = range_header
-
-    session = requests.Session()
-    session.max_redirects = 3
-
     # Detect Google-native MIME (Docs, Sheets, Slides, Drawing)
     google_mime = resource.drive_mime_type
     is_google_native = google_mime.startswith("application/vnd.google-apps") if google_mime else False
@@ -97,6 +87,25 @@ def stream_resource(request):
         "application/vnd.google-apps.drawing": "image/png",
     }
 
+    headers = {}
+    if owner_token:
+        headers["Authorization"] = f"Bearer {owner_token}"
+
+    # Served from the local chunk / export cache when possible
+    if is_google_native:
+        cached = cached_export_response(request, file_id, owner_token, export_map.get(google_mime, "application/pdf"), filename)
+    else:
+        cached = cached_drive_response(request, file_id, owner_token, mime, filename)
+    if cached is not None:
+        return cached
+
+    # Range header for partial streaming
+    range_header = request.META.get("HTTP_RANGE", None)
+    if range_header:
+        headers["Range"] = range_header
+
+    session = get_drive_http_session()
+
     try:
         if is_google_native:
             # Select appropriate export MIME
@@ -127,6 +136,7 @@ def stream_resource(request):
     if resp.status_code in (401, 403):
         try:
             error_data = resp.json()
+            resp.close()
             error_msg = error_data.get("error", {}).get("message", "")
             if "insufficient authentication scopes" in error_msg.lower():
                 return JsonResponse({
@@ -135,8 +145,10 @@ def stream_resource(request):
                 }, status=403)
         except:
             pass
+        resp.close()
         return JsonResponse({"message": "Access to Drive file denied. Ensure you have granted Google Drive permissions."}, status=403)
     if resp.status_code == 404:
+        resp.close()
         return JsonResponse({"message": "Drive file not found."}, status=404)
 
     # Prepare Django streaming response
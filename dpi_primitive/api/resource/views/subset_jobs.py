@@ -0,0 +1,69 @@
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    authentication_classes,
+)
+from rest_framework.permissions import IsAuthenticated
+from api.models import SubsetJob
+from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpRequest, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.resource_helper.subset_jobs import fail_stale_subset_jobs, is_stale_subset_job, serialize_subset_job
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiResponse,
+)
+
+
+@extend_schema(
+    summary="Subset job status",
+    description="Poll a SubsetJob queued by create-subset. `result` holds the JSON create-subset used to return once the subset resource exists.",
+    parameters=[
+        OpenApiParameter(name="job_id", description="ID returned by create-subset", required=True, type=int, location=OpenApiParameter.PATH),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description="Job status",
+            response={
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean"},
+                    "job": {
+                        "type": "object",
+                        "properties": {
+                            "job_id": {"type": "integer"},
+                            "status": {"type": "string", "enum": ["queued", "running", "succeeded", "failed"]},
+                            "reused": {"type": "boolean"},
+                            "subset_resource_id": {"type": "integer"},
+                            "result": {"type": "object"},
+                            "error": {"type": "string"},
+                        },
+                    },
+                },
+            },
+        ),
+        403: OpenApiResponse(description="Job was requested by another user"),
+        404: OpenApiResponse(description="Job not found"),
+    },
+)
+@csrf_exempt
+@api_view(["GET"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def subset_job_status(request: HttpRequest, job_id: int) -> JsonResponse:
+    try:
+        job = SubsetJob.objects.get(job_id=job_id)
+    except SubsetJob.DoesNotExist:
+        return JsonResponse({"success": False, "error": "Subset job not found"}, status=404)
+
+    if job.requested_by_id not in (None, request.user.user_id) and not request.user.is_staff:
+        return JsonResponse({"success": False, "error": "You are not allowed to view this job"}, status=403)
+
+    # A job whose process was lost (e.g. a worker restart) is failed here too, not only on the next enqueue
+    if is_stale_subset_job(job):
+        fail_stale_subset_jobs()
+        job.refresh_from_db()
+
+    return JsonResponse({"success": True, "job": serialize_subset_job(job)}, status=200)
@@ -13,11 +13,10 @@ from django.utils.timezone import make_aware
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from django.conf import settings
-from pypdf import PdfReader,PdfWriter
 import shutil
 from django.http import FileResponse, Http404
 
-from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
+from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType, SubsetJob
 from api.model.xnode_model import Xnode_V2
 from api.serializers import ResourceSerializer, XnodeV2Serializer
 from django.db import models
@@ -36,6 +35,9 @@ from django.http import StreamingHttpResponse, HttpResponse, JsonResponse
 from django.utils.http import http_date
 from django.utils.decorators import method_decorator
 from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.utils.resource_helper.document_metadata import get_resource_page_count, store_drive_metadata
+from api.utils.resource_helper.subset_jobs import enqueue_subset_job
+from api.utils.google_drive_helper.drive_client import get_drive_service
 
 from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiResponse
 from rest_framework import serializers
@@ -208,6 +210,14 @@ def upload_resource(request):
                 validity_time=parsed_validity_time,
             )
 
+            # Size and checksum from Drive (not fatal, backfill_resource_metadata can fill them later)
+            try:
+                owner_token = get_or_refresh_google_token(user)
+                if owner_token:
+                    store_drive_metadata(resource, get_drive_service(owner_token))
+            except Exception as e:
+                print("Could not read Drive metadata:", e)
+
             # Generate a Google Drive view link
             resource_url = f"https://drive.google.com/file/d/{drive_file_id}/preview"
             # resource_url = drive_file_id
@@ -219,7 +229,6 @@ def upload_resource(request):
                 validity_until=parsed_validity_time.isoformat(),
                 xnode_Type=Xnode_V2.XnodeType.INODE,
                 creator=user.user_id,
-                provenance_stack=[],
                 post_conditions=transformed_post_conditions,
                 snode_list=[],
                 vnode_list=[],
@@ -288,7 +297,7 @@ def upload_resource(request):
     },
     responses={
         201: OpenApiResponse(
-            description="Subset resource created successfully",
+            description="Subset resource created (same page range generated before)",
             response={
                 "type": "object",
                 "properties": {
@@ -323,6 +332,18 @@ def upload_resource(request):
                 }
             }
         ),
+        202: OpenApiResponse(
+            description="Subset job queued; poll resource/subset-jobs/<job_id>/ for the result above",
+            response={
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean"},
+                    "message": {"type": "string"},
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string"},
+                },
+            },
+        ),
         400: OpenApiResponse(description="Invalid request or page range"),
         404: OpenApiResponse(description="Original resource not found")
     }
@@ -343,7 +364,8 @@ def create_subset_resource(request):
     }
 
     Returns:
-    - New Xnode ID for the subset resource.
+    - 202 with a job_id while the subset PDF is generated (see subset_job_status).
+    - 201 with the new Xnode ID right away if the same subset was generated before.
     """
     try:
         data = request.data
@@ -374,9 +396,10 @@ def create_subset_resource(request):
         if not os.path.exists(original_pdf_path):
             return JsonResponse({"error": "Original PDF not found"}, status=404)
 
-        # Read the original PDF
-        reader = PdfReader(original_pdf_path)
-        total_pages = len(reader.pages)
+        # Validate against the stored page count, the PDF is only read to copy the pages
+        total_pages = get_resource_page_count(resource)
+        if total_pages is None:
+            return JsonResponse({"error": "Original file is not a readable PDF"}, status=400)
 
         if to_page > total_pages:
             return JsonResponse({"error": f"Invalid page range. Document has {total_pages} pages."}, status=400)
@@ -388,79 +411,29 @@ def create_subset_resource(request):
             return JsonResponse({"error": "A resource with this name already exists in this locker."}, status=400)
 
 
-        # Create a new PDF with selected pages
-        writer = PdfWriter()
-        for i in range(from_page - 1, to_page):
-            writer.add_page(reader.pages[i])
-
-        
-        # Handle file upload and save it to MEDIA_ROOT/documents/
-    
-
-        # Naming Convention
-        relative_path = os.path.join("documents", f"{resource_name.replace(' ', '_')}.pdf") 
-        print("realtive_path", relative_path)
-        file_path = os.path.join(settings.MEDIA_ROOT, relative_path) 
-        print("file_path", file_path)
-
-        
-
-        # Save the subset PDF
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as output_file:
-            writer.write(output_file)
-
-        # Create a new Resource entry
-        subset_resource = Resource.objects.create(
-            document_name=resource_name,
-            i_node_pointer=relative_path,
-            locker=resource.locker,
-            owner=resource.owner,
-            type=resource.type,
-            validity_time=resource.validity_time,
-        )
-
-        resource_url = os.path.join(settings.MEDIA_URL, relative_path)
-
-        # Create Xnode_V2 (INODE)
-        subset_xnode = Xnode_V2.objects.create(
-            locker=resource.locker,
-            created_at=timezone.now(),
-            validity_until=resource.validity_time.isoformat(),
-            xnode_Type=Xnode_V2.XnodeType.INODE,
-            creator=resource.owner.user_id,
-            provenance_stack=[],
-            post_conditions=original_inode.post_conditions,
-            snode_list=[],
-            vnode_list=[],
-            node_information={
-                "resource_id": subset_resource.resource_id,
-                "method_name": "subset",
-                "method_params": {},
-                "resourse_link": resource_url,
-                "resource_name": subset_resource.document_name,
-                "primary_owner": subset_resource.owner.user_id,
-                "current_owner": subset_resource.owner.user_id
-            },
+        # Page copying runs in the subset process pool
+        job = enqueue_subset_job(
+            resource,
+            xnode_id=original_inode.id,
+            from_page=from_page,
+            to_page=to_page,
+            resource_name=resource_name,
+            requested_by=request.user,
         )
+        if job.status == SubsetJob.Status.SUCCEEDED:
+            # Same subset was generated before (or SUBSET_JOBS_ASYNC is off)
+            return JsonResponse(dict(job.result, job_id=job.job_id), status=201)
+        if job.status == SubsetJob.Status.FAILED:
+            return JsonResponse({"error": job.error, "job_id": job.job_id}, status=400)
 
         return JsonResponse(
             {
                 "success": True,
-                "document_name": resource_name,
-                "resource_url": resource_url,
-                "ID_Of_Xnode_Created": subset_xnode.id,
-                "validity_until": subset_resource.validity_time.isoformat(),
-                "primary_owner": {
-                    "id": subset_resource.owner.user_id,
-                    "username": subset_resource.owner.username
-                },
-                "current_owner": {
-                    "id": subset_resource.owner.user_id,
-                    "username": subset_resource.owner.username,
-                }
+                "message": "Subset job queued",
+                "job_id": job.job_id,
+                "status": job.status,
             },
-            status=201,
+            status=202,
         )
 
     except Resource.DoesNotExist:
@@ -6,13 +6,19 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import IsAuthenticated
 from api.models import (
-    Resource,
     Locker,
 
 )
 from api.model.xnode_model import Xnode_V2
-from api.utils.resource_helper.access_resource_helper import access_Resource
-from api.serializers import XnodeV2Serializer
+from api.resource.services.locker_xnodes import (
+    LOCKER_XNODES_DEFAULT_LIMIT,
+    LOCKER_XNODES_MAX_LIMIT,
+    UnresolvedXnode,
+    locker_xnode_page,
+    locker_xnodes,
+    serialize_locker_xnodes,
+)
+from api.utils.pagination import InvalidCursor
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpRequest, JsonResponse
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -23,9 +29,16 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
 
 @csrf_exempt  # Ensure this is on top
 @extend_schema(
-    description="Get all XNodes for a specific locker. Requires locker_id.",
+    description="Get the XNodes of a locker, in id order. Requires locker_id. "
+    "Pass `limit` (and the returned `next_cursor` as `cursor`) to page through them; without either, all XNodes are returned. "
+    "For a locker that is not yours only XNodes of public resources are listed, so a page can hold fewer than `limit`.",
     parameters=[
         OpenApiParameter(name="locker_id", description="Locker ID to filter XNodes", required=True, type=int),
+        OpenApiParameter(name="limit", description=f"Page size (max {LOCKER_XNODES_MAX_LIMIT})", required=False, type=int),
+        OpenApiParameter(name="cursor", description="next_cursor of the previous page", required=False, type=str),
+        OpenApiParameter(name="xnode_type", description="Only this xnode_Type (INODE, VNODE, SNODE)", required=False, type=str),
+        OpenApiParameter(name="status", description="Only this status (active, closed)", required=False, type=str),
+        OpenApiParameter(name="connection_id", description="Only XNodes of this connection", required=False, type=int),
     ],
     responses={
         200: OpenApiResponse(
@@ -36,7 +49,8 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
                     "xnode_list": {
                         "type": "array",
                         "items": {"type": "object"}
-                    }
+                    },
+                    "next_cursor": {"type": "string", "nullable": True},
                 },
                 "example": {
                     "xnode_list": [
@@ -45,11 +59,12 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
                             "resource_name": "My Document",
                             "xnode_Type": "INODE"
                         }
-                    ]
+                    ],
+                    "next_cursor": None
                 }
             }
         ),
-        400: OpenApiResponse(description="Missing locker ID"),
+        400: OpenApiResponse(description="Missing locker ID or invalid filter/cursor"),
         404: OpenApiResponse(description="Locker or starting Inode not found")
     }
 )
@@ -62,6 +77,7 @@ def get_All_Xnodes(request: HttpRequest) -> JsonResponse:
     """
     Expected query parameter:
     locker_id: value
+    Optional: limit, cursor, xnode_type, status, connection_id
     """
     print(f"Authenticated User: {request.user}, Authenticated: {request.user.is_authenticated}")
 
@@ -79,52 +95,40 @@ def get_All_Xnodes(request: HttpRequest) -> JsonResponse:
         print(f"Locker Owner: {locker.user}, Request User: {request.user}, Is Owner: {is_owner}")
 
 
-        xnode_list = Xnode_V2.objects.filter(locker=locker)
-        xnode_data_with_resources = []
-        print(len(xnode_list))
-
-        for xnode in xnode_list:
-            start_inode = access_Resource(xnode_id=xnode.id)
-            if start_inode is None:
-                return JsonResponse(
-                    {
-                        "message": f"Starting Inode for Xnode with ID = {xnode.id} does not exist."
-                    },
-                    status=404,
-                )
-
-            try:
-                # Fetch the corresponding resource for the inode
-                resource = Resource.objects.get(
-                    resource_id=start_inode.node_information.get("resource_id")
-                )
-
-                
-
-                # Check visibility based on whether the user is the owner or not
-                if is_owner or resource.type == "public":
-
-
-                    resource_name = resource.document_name  # Get the document name
-
-                    # Serialize the Xnode and attach the corresponding resource name
-                    xnode_serializer = XnodeV2Serializer(xnode)
-                    xnode_data = xnode_serializer.data
-                    xnode_data["resource_name"] = (
-                        resource_name  # Add the resource name to the Xnode data
-                    )
-
-                    xnode_data_with_resources.append(xnode_data)
-
-            except Resource.DoesNotExist:
-                return JsonResponse(
-                    {"error": f"Resource not found for Xnode ID = {xnode.id}"},
-                    status=404,
-                )
-            except Exception as e:
-                return JsonResponse({"error": str(e)}, status=500)
-
-        return JsonResponse({"xnode_list": xnode_data_with_resources}, status=200)
+        xnode_type = request.GET.get("xnode_type")
+        if xnode_type and xnode_type not in Xnode_V2.XnodeType.values:
+            return JsonResponse({"message": f"Invalid xnode_type: {xnode_type}"}, status=400)
+        status = request.GET.get("status")
+        if status and status not in dict(Xnode_V2.Xnode_V2_STATUS_CHOICES):
+            return JsonResponse({"message": f"Invalid status: {status}"}, status=400)
+        connection_id = request.GET.get("connection_id")
+        if connection_id and not connection_id.isdigit():
+            return JsonResponse({"message": "connection_id must be an integer"}, status=400)
+        xnode_list = locker_xnodes(locker, xnode_type=xnode_type, status=status, connection_id=connection_id)
+
+        limit = request.GET.get("limit")
+        cursor = request.GET.get("cursor")
+        try:
+            if limit is None and cursor is None:
+                xnodes = list(xnode_list)
+                next_cursor = None
+            else:
+                try:
+                    limit = min(max(int(limit or LOCKER_XNODES_DEFAULT_LIMIT), 1), LOCKER_XNODES_MAX_LIMIT)
+                except ValueError:
+                    return JsonResponse({"message": "limit must be an integer"}, status=400)
+                xnodes, next_cursor = locker_xnode_page(xnode_list, cursor=cursor, limit=limit)
+            print(len(xnodes))
+
+            xnode_data_with_resources = serialize_locker_xnodes(xnodes, include_private=is_owner)
+        except InvalidCursor as e:
+            return JsonResponse({"message": str(e)}, status=400)
+        except UnresolvedXnode as e:
+            return JsonResponse(e.body, status=404)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+        return JsonResponse({"xnode_list": xnode_data_with_resources, "next_cursor": next_cursor}, status=200)
     else:
         return JsonResponse(
             {"message": f"Locker with ID = {locker_id} does not exist."}, status=404
@@ -1,5 +1,4 @@
 
-import os
 import json
 from django.http import JsonResponse, HttpRequest
 from django.utils import timezone
@@ -8,13 +7,12 @@ from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.conf import settings
-from pypdf import PdfReader,PdfWriter
 from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
 from api.model.xnode_model import Xnode_V2
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.http import StreamingHttpResponse, HttpResponse, JsonResponse
 from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.utils.resource_helper.document_metadata import get_resource_page_count
 
 
 
@@ -128,21 +126,15 @@ def get_total_pages_in_document(request):
 
             # Fetch the resource
             resource = Resource.objects.get(resource_id=resource_id)
-            pdf_file_path = os.path.join(settings.MEDIA_ROOT, resource.i_node_pointer)
-            pdf_file_path = pdf_file_path.replace("\\", "/")
 
-            # Check if the file exists
-            if not os.path.exists(pdf_file_path):
+            # Page count stored when the resource was registered
+            total_pages = get_resource_page_count(resource)
+            if total_pages is None:
                 return JsonResponse(
                     {"error": f"File not found for resource_id: {resource_id}"},
                     status=404,
                 )
 
-            # Read the PDF and get the number of pages
-            with open(pdf_file_path, "rb") as file:
-                reader = PdfReader(file)
-                total_pages = len(reader.pages)
-
             return JsonResponse(
                 {
                     "success": True,
@@ -200,20 +192,15 @@ def get_total_pages_in_document(request):
 
             # Fetch the resource
             resource = Resource.objects.get(resource_id=resource_id)
-            pdf_file_path = os.path.join(settings.MEDIA_ROOT, resource.i_node_pointer).replace("\\", "/")
 
-            # Check if the file exists
-            if not os.path.exists(pdf_file_path):
+            # Page count stored when the resource was registered
+            total_pages = get_resource_page_count(resource)
+            if total_pages is None:
                 return JsonResponse(
                     {"error": f"File not found for resource_id: {resource_id}"},
                     status=404,
                 )
 
-            # Read the PDF and get the number of pages
-            with open(pdf_file_path, "rb") as file:
-                reader = PdfReader(file)
-                total_pages = len(reader.pages)
-
             # Validate the provided page range
             if from_page < 1 or to_page > total_pages or from_page > to_page:
                 return JsonResponse(
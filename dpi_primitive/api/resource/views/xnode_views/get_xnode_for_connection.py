@@ -6,7 +6,6 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import IsAuthenticated
 from api.models import (
-    Resource,
     Locker,
     CustomUser,
     Connection,
@@ -14,8 +13,9 @@ from api.models import (
 
 
 from api.model.xnode_model import Xnode_V2
-from api.utils.resource_helper.access_resource_helper import access_Resource
-from api.serializers import XnodeV2Serializer
+from api.utils.resource_helper.access_resource_helper import access_Resource_documents
+from api.serializers import XNODE_SERIALIZER_RELATED, XnodeV2Serializer, xnode_serializer_users
+from django.db.models import prefetch_related_objects
 from django.http import HttpRequest, JsonResponse
 
 
@@ -26,6 +26,24 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
+# Serialized xnodes with the name of the resource each one gives access to, as
+# [(xnode, xnode_data)]; xnodes whose INODE or Resource is gone are skipped.
+# The INODEs, Resources, users and provenance of all xnodes are loaded together.
+def serialize_xnodes_with_resources(xnodes):
+    xnodes = list(xnodes)
+    documents = access_Resource_documents(xnodes)
+    xnodes = [xnode for xnode in xnodes if xnode.id in documents]
+    prefetch_related_objects(xnodes, "provenance_entries")
+    context = {"users": xnode_serializer_users(xnodes)}
+
+    serialized = []
+    for xnode in xnodes:
+        _, resource = documents[xnode.id]
+        xnode_data = XnodeV2Serializer(xnode, context=context).data
+        xnode_data["resource_name"] = resource.document_name  # Add resource name
+        serialized.append((xnode, xnode_data))
+    return serialized
+
 @extend_schema(
     description="Fetch resource names and XNode details for a specific connection type and user.",
     parameters=[
@@ -122,34 +140,14 @@ def get_user_resources_by_connection_type(request):
         # Prepare response with all XNode details and resource names
         xnode_data_with_resources = []
 
-        for connection in connections:
-            # Fetch XNode details related to the connection
-            xnodes = Xnode_V2.objects.filter(connection=connection, locker = locker).select_related("connection")
-
-            for xnode in xnodes:
-                try:
-                    # Get inode information for the XNode
-                    start_inode = access_Resource(xnode_id=xnode.id)
-                    if start_inode is None:
-                        continue  # Skip this XNode if no inode is found
-
-                    # Fetch resource associated with the inode
-                    resource = Resource.objects.get(
-                        resource_id=start_inode.node_information.get("resource_id")
-                    )
-
-                    # Serialize XNode data
-                    xnode_serializer = XnodeV2Serializer(xnode)
-                    xnode_data = xnode_serializer.data
-                    xnode_data["resource_name"] = resource.document_name  # Add resource name
-                    xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
-
-                    xnode_data_with_resources.append(xnode_data)
+        # XNodes of all the connections, with their inodes and resources resolved together
+        xnodes = Xnode_V2.objects.filter(connection__in=connections, locker=locker).select_related(
+            *XNODE_SERIALIZER_RELATED
+        ).order_by("connection_id", "id")
 
-                except Resource.DoesNotExist:
-                    continue  # Skip this XNode if the resource does not exist
-                except Exception as e:
-                    return JsonResponse({"success": False, "error": str(e)}, status=500)
+        for xnode, xnode_data in serialize_xnodes_with_resources(xnodes):
+            xnode_data["connection_type_name"] = xnode.connection.connection_type.connection_type_name
+            xnode_data_with_resources.append(xnode_data)
 
         return JsonResponse(
             {
@@ -240,33 +238,13 @@ def get_outgoing_connection_xnode_details(request):
         
 
         # Fetch XNodes related to this connection
-        xnodes = Xnode_V2.objects.filter(connection=connection, locker = locker).select_related("connection")
+        xnodes = Xnode_V2.objects.filter(connection=connection, locker = locker).select_related(*XNODE_SERIALIZER_RELATED)
         xnode_data_with_resources = []
         print("xnode data with resources",xnode_data_with_resources)
 
-        for xnode in xnodes:
-            try:
-                # Get inode information for the XNode
-                start_inode = access_Resource(xnode_id=xnode.id)
-                if start_inode is None:
-                    continue  # Skip if no inode is found
-
-                # Fetch resource associated with the inode
-                resource = Resource.objects.get(
-                    resource_id=start_inode.node_information.get("resource_id")
-                )
-
-                # Serialize XNode data
-                xnode_serializer = XnodeV2Serializer(xnode)
-                xnode_data = xnode_serializer.data
-                xnode_data["resource_name"] = resource.document_name  # Add resource name
-                xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
-                xnode_data_with_resources.append(xnode_data)
-
-            except Resource.DoesNotExist:
-                continue  # Skip this XNode if the resource does not exist
-            except Exception as e:
-                return JsonResponse({"success": False, "error": str(e)}, status=500)
+        for xnode, xnode_data in serialize_xnodes_with_resources(xnodes):
+            xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
+            xnode_data_with_resources.append(xnode_data)
 
         return JsonResponse(
             {
@@ -388,24 +366,10 @@ def get_incoming_connection_resource_shared_by_host_to_guest(request):
 
         xnode_data_with_resources = []
 
-        for xnode in xnodes:
-            try:
-                inode = access_Resource(xnode_id=xnode.id)
-                if not inode:
-                    continue
-                resource = Resource.objects.get(resource_id=inode.node_information.get("resource_id"))
-
-                xnode_serializer = XnodeV2Serializer(xnode)
-                xnode_data = xnode_serializer.data
-                xnode_data["resource_name"] = resource.document_name
-                xnode_data["shared_to_user"] = connection.guest_user.username
-                xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
-
-                xnode_data_with_resources.append(xnode_data)
-            except Resource.DoesNotExist:
-                continue
-            except Exception as e:
-                return JsonResponse({"success": False, "error": str(e)}, status=500)
+        for xnode, xnode_data in serialize_xnodes_with_resources(xnodes.select_related(*XNODE_SERIALIZER_RELATED)):
+            xnode_data["shared_to_user"] = connection.guest_user.username
+            xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
+            xnode_data_with_resources.append(xnode_data)
 
         return JsonResponse({
             "success": True,
@@ -513,24 +477,10 @@ def get_outgoing_connection_resource_shared_by_guest_to_host(request):
         xnodes = Xnode_V2.objects.filter(connection=connection, locker=connection.host_locker).exclude(creator=connection.host_user.user_id)
         xnode_data_with_resources = []
 
-        for xnode in xnodes:
-            try:
-                inode = access_Resource(xnode_id=xnode.id)
-                if not inode:
-                    continue
-                resource = Resource.objects.get(resource_id=inode.node_information.get("resource_id"))
-
-                xnode_serializer = XnodeV2Serializer(xnode)
-                xnode_data = xnode_serializer.data
-                xnode_data["resource_name"] = resource.document_name
-                xnode_data["shared_to_user"] = connection.host_user.username
-                xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
-
-                xnode_data_with_resources.append(xnode_data)
-            except Resource.DoesNotExist:
-                continue
-            except Exception as e:
-                return JsonResponse({"success": False, "error": str(e)}, status=500)
+        for xnode, xnode_data in serialize_xnodes_with_resources(xnodes.select_related(*XNODE_SERIALIZER_RELATED)):
+            xnode_data["shared_to_user"] = connection.host_user.username
+            xnode_data["connection_type_name"] = connection.connection_type.connection_type_name
+            xnode_data_with_resources.append(xnode_data)
 
         return JsonResponse({
             "success": True,
@@ -1,25 +1,24 @@
 import os
 import json
 from django.http import JsonResponse, HttpRequest
-from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 from django.conf import settings
 from pypdf import PdfReader,PdfWriter
-from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
+from api.models import Resource, CustomUser, Connection ,Notification , ConnectionType
 from api.model.xnode_model import Xnode_V2
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.http import StreamingHttpResponse, HttpResponse, JsonResponse
 from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.tasks import close_user_expired_xnodes
 
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
 @csrf_exempt
 @extend_schema(
-    description="Check and update status of all XNodes for the user's lockers.",
+    description="Closes the expired XNodes of the user's lockers that the close_expired_xnodes cron job has not closed yet, and returns their ids.",
     request=None,
     responses={
         200: OpenApiResponse(
@@ -60,22 +59,14 @@ def xnode_v2_status(request):
         if not user_id :
             return JsonResponse({"success": False, "error": "Missing user_id"}, status=400)
         
-        now=timezone.now()
-        lockers=Locker.objects.filter(user_id=user_id)
-        updated_xnodes=[]
-        for locker in lockers:
-            locker_id=locker.locker_id
-            xnodes=Xnode_V2.objects.filter(locker_id=locker_id)
-            for xnode in xnodes:
-                if xnode.validity_until and now>xnode.validity_until and xnode.status!="closed":
-                    xnode.status="closed"
-                    xnode.save()
-                    updated_xnodes.append(xnode.id)
+        # Most expired xnodes are already closed by the close_expired_xnodes cron job;
+        # the ones that expired since its last run are closed here in one update
+        updated_xnodes=close_user_expired_xnodes(user_id)
 
         return JsonResponse({
             "success": True,
             "updated_xnode_ids": updated_xnodes,
-            "total_checked": xnodes.count()
+            "total_checked": Xnode_V2.objects.filter(locker__user_id=user_id).count()
         })
     except CustomUser.DoesNotExist:
         return JsonResponse({"success": False, "error": "User not found"}, status=404)
@@ -242,60 +242,80 @@ class XnodeV2Serializer(serializers.ModelSerializer):
                 )
         return value
 
+    def _get_user(self, user_id):
+        # context["users"] ({user_id: CustomUser}, see xnode_serializer_users) saves
+        # these lookups when many xnodes are serialized
+        users = self.context.get("users")
+        if users is not None:
+            return users.get(user_id)
+        return CustomUser.objects.filter(user_id=user_id).first()
+
     def get_primary_owner_username(self, obj):
         primary_owner_id = obj.node_information.get("primary_owner")
         if primary_owner_id and isinstance(primary_owner_id, int):
-            try:
-                user = CustomUser.objects.get(user_id=primary_owner_id)
-                return user.username
-            except CustomUser.DoesNotExist:
-                return None
+            user = self._get_user(primary_owner_id)
+            return user.username if user else None
         return None
 
     def get_current_owner_username(self, obj):
         current_owner_id = obj.node_information.get("current_owner")
         if current_owner_id and isinstance(current_owner_id, int):
-            try:
-                user = CustomUser.objects.get(user_id=current_owner_id)
-                return user.username
-            except CustomUser.DoesNotExist:
-                return None
+            user = self._get_user(current_owner_id)
+            return user.username if user else None
         return None
 
     def get_creator_username(self, obj):
-        try:
-            user = CustomUser.objects.get(user_id=obj.creator)
-            return user.username
-        except CustomUser.DoesNotExist:
-            return None
+        user = self._get_user(obj.creator)
+        return user.username if user else None
         
     def get_creator_details(self, obj):
-        try:
-            user = CustomUser.objects.get(user_id=obj.creator)
-            return {
+        user = self._get_user(obj.creator)
+        if user is None:
+            return None
+        return {
             "user_id": user.user_id,
             "username": user.username,
             "description": user.description,
             "user_type": user.user_type
         }
-        except CustomUser.DoesNotExist:
-            return None
         
     def get_current_owner_details(self, obj):
         current_owner_id = obj.node_information.get("current_owner")
         if current_owner_id and isinstance(current_owner_id, int):
-            try:
-                user = CustomUser.objects.get(user_id=current_owner_id)
-                return {
-                    "user_id": user.user_id,
-                    "username": user.username,
-                    "description": user.description,
-                    "user_type": user.user_type
-                }
-            except CustomUser.DoesNotExist:
+            user = self._get_user(current_owner_id)
+            if user is None:
                 return None
+            return {
+                "user_id": user.user_id,
+                "username": user.username,
+                "description": user.description,
+                "user_type": user.user_type
+            }
         return None
 
+
+# Relations XnodeV2Serializer reads, to select_related with the xnodes
+XNODE_SERIALIZER_RELATED = (
+    "locker",
+    "connection__connection_type",
+    "connection__host_user",
+    "connection__guest_user",
+    "connection__host_locker",
+    "connection__guest_locker",
+)
+
+
+def xnode_serializer_users(xnodes):
+    """The users XnodeV2Serializer looks up for xnodes, for its "users" context, in one query."""
+    user_ids = set()
+    for xnode in xnodes:
+        user_ids.add(xnode.creator)
+        for key in ("primary_owner", "current_owner"):
+            user_id = (xnode.node_information or {}).get(key)
+            if isinstance(user_id, int):
+                user_ids.add(user_id)
+    return CustomUser.objects.in_bulk(user_ids)
+
 #google
 # api/serializers.py
 
@@ -0,0 +1,380 @@
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+
+from api.models import Locker, CustomUser, Connection, Resource, Notification
+from api.model.xnode_model import Xnode_V2, XnodeProvenance
+from api.notifications.services.pubsub import publish_new_notifications
+from api.utils.resource_helper.access_resource_helper import access_Resources, clear_root_inode_through, parent_pointer_q
+from api.utils.xnode.xnode_helper import (
+    build_node_deleted_notifications,
+    load_xnode_chains,
+    strip_xnode_list,
+    subtree_post_order,
+)
+
+# Bulk versions of revoke_share / revoke_confer / revoke_collateral.
+# Everything the revocation touches is fetched up front (a fixed number of queries
+# however many resources the connection carries), the changes are computed in memory
+# and written with bulk_create / bulk_update / a single delete per table.
+
+
+class RevocationError(Exception):
+    pass
+
+
+class RevocationParties:
+    """Connection plus host/guest user and locker of the connection being revoked."""
+
+    def __init__(self, connection_id, host_user, host_locker, guest_user, guest_locker):
+        self.connection = Connection.objects.select_related("connection_type").get(connection_id=connection_id)
+        self.host_locker = Locker.objects.get(locker_id=host_locker)
+        self.guest_locker = Locker.objects.get(locker_id=guest_locker)
+        self.host_user = CustomUser.objects.get(user_id=host_user)
+        self.guest_user = CustomUser.objects.get(user_id=guest_user)
+
+    # The party who gave the resource and gets it back on revocation
+    def giver(self, reverse):
+        if reverse:
+            return self.host_user, self.host_locker
+        return self.guest_user, self.guest_locker
+
+    # The party holding the shared/conferred/collateral node, who is notified
+    def receiver(self, reverse):
+        if reverse:
+            return self.guest_user, self.guest_locker
+        return self.host_user, self.host_locker
+
+    def provenance_filter(self, linked_id, target_id, share_type, reverse):
+        # Same match as remove_xnode_provenance_entry
+        from_user, from_locker = self.giver(reverse)
+        to_user, to_locker = self.receiver(reverse)
+        return Q(
+            xnode_id=linked_id,
+            shared_xnode_id=target_id,
+            type_of_share=share_type,
+            connection=self.connection.connection_id,
+            from_user=from_user.user_id,
+            to_user=to_user.user_id,
+            from_locker=from_locker.locker_id,
+            to_locker=to_locker.locker_id,
+        )
+
+    def revoked_notification(self, reverse, message, **extra):
+        user, locker = self.receiver(reverse)
+        return Notification(
+            connection=self.connection,
+            guest_user=user,
+            host_user=user,
+            guest_locker=locker,
+            host_locker=locker,
+            connection_type=self.connection.connection_type,
+            created_at=timezone.now(),
+            message=message,
+            **extra
+        )
+
+
+def _unique_ids(xnode_ids):
+    return list(dict.fromkeys(int(xnode_id) for xnode_id in xnode_ids))
+
+
+def _load_targets(xnode_ids):
+    targets = Xnode_V2.objects.in_bulk(xnode_ids)
+    missing = [xnode_id for xnode_id in xnode_ids if xnode_id not in targets]
+    if missing:
+        raise RevocationError(f"Xnode_V2 {missing} does not exist")
+    return [targets[xnode_id] for xnode_id in xnode_ids]
+
+
+def _load_provenance(pairs, share_type):
+    # {(linked_id, target_id): provenance dict}, first match like get_provenance_stack
+    provenance = {}
+    for entry in XnodeProvenance.objects.filter(
+        xnode_id__in={linked_id for linked_id, _ in pairs},
+        shared_xnode_id__in={target_id for _, target_id in pairs},
+        type_of_share=share_type,
+    ):
+        provenance.setdefault((entry.xnode_id, entry.shared_xnode_id), entry.as_dict())
+    missing = [target_id for linked_id, target_id in pairs if (linked_id, target_id) not in provenance]
+    if missing:
+        raise RevocationError(f"provenance is returning null for {missing}")
+    return provenance
+
+
+def _load_resources(targets):
+    # {target.id: (INODE found, Resource or None)}
+    inodes = access_Resources(targets)
+    resources = Resource.objects.in_bulk({
+        inode.node_information.get("resource_id") for inode in inodes.values() if inode is not None
+    } - {None})
+    loaded = {}
+    for target in targets:
+        inode = inodes[target.id]
+        if inode is None:
+            loaded[target.id] = (False, None)
+        else:
+            loaded[target.id] = (True, resources.get(inode.node_information.get("resource_id")))
+    return loaded
+
+
+def _notification_message(found_inode, resource, is_revert):
+    document_name = None
+    if found_inode:
+        document_name = resource.document_name if resource else "Unknown Resource"
+    action = "reverted" if is_revert else "revoked"
+    return f"Resource '{document_name}' is no longer accessible. It has been deleted because the owner has {action} access to the resource."
+
+
+def _load_subtrees(targets):
+    """
+    Descendants of every target that has a vnode_list, deepest first.
+    Returns [(child_id, parent_id, xnode_type, target_id)] with one query for all targets.
+    """
+    vnode_ids = {int(v) for target in targets for v in target.vnode_list}
+    vnodes = Xnode_V2.objects.only("id", "xnode_Type", "node_information").in_bulk(vnode_ids)
+    child_to_parent = {}
+    parent_to_children = {}
+    for vnode in vnodes.values():
+        link = vnode.node_information.get("link")
+        if link is None:
+            continue
+        child_to_parent[vnode.id] = int(link)
+        parent_to_children.setdefault(int(link), []).append(vnode.id)
+
+    deletions = []
+    for target in targets:
+        if not target.vnode_list:
+            continue
+        for child in subtree_post_order(target.id, parent_to_children):
+            deletions.append((child, child_to_parent[child], vnodes[child].xnode_Type, target.id))
+    return deletions
+
+
+def _write_revocation(notifications, changed_xnodes, xnode_fields, provenance_filters, deleted_ids):
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        publish_new_notifications(notifications)
+        if changed_xnodes:
+            Xnode_V2.objects.bulk_update(changed_xnodes, xnode_fields)
+        if provenance_filters:
+            query = Q()
+            for provenance_filter in provenance_filters:
+                query |= provenance_filter
+            XnodeProvenance.objects.filter(query).delete()
+        clear_root_inode_through(deleted_ids)
+        Xnode_V2.objects.filter(id__in=deleted_ids).delete()
+    print(f"Revoked {len(deleted_ids)} xnodes, sent {len(notifications)} notifications")
+
+
+def bulk_revoke_share(connection_id, shared_resources, host_user, host_locker, guest_user, guest_locker, is_revert=False):
+    try:
+        parties = RevocationParties(connection_id, host_user, host_locker, guest_user, guest_locker)
+        vnodes = _load_targets(_unique_ids(shared_resources))
+        linked_ids = {vnode.id: int(vnode.node_information["link"]) for vnode in vnodes}
+        provenance = _load_provenance([(linked_ids[v.id], v.id) for v in vnodes], "Share")
+        resources = _load_resources(vnodes)
+        messages = {v.id: _notification_message(*resources[v.id], is_revert) for v in vnodes}
+
+        subtrees = _load_subtrees(vnodes)
+        notifications = [
+            parties.revoked_notification(provenance[(linked_ids[v.id], v.id)].get("reverse"), messages[v.id])
+            for v in vnodes if not v.vnode_list
+        ]
+        notifications += build_node_deleted_notifications([
+            (child, parent, xnode_type, messages[target_id]) for child, parent, xnode_type, target_id in subtrees
+        ])
+        deleted_ids = [child for child, _, _, _ in subtrees] + [v.id for v in vnodes]
+
+        with transaction.atomic():
+            # The shared vnodes and their subtrees are listed in the vnode_list of
+            # the linked node and every VNODE above it, up to the INODE
+            chain = load_xnode_chains(linked_ids.values(), Xnode_V2.XnodeType.VNODE, "link")
+            strip_xnode_list(chain.values(), "vnode_list", deleted_ids)
+            for vnode in vnodes:
+                linked = chain.get(linked_ids[vnode.id])
+                if linked is None:
+                    raise RevocationError("Inode does not exist")
+                linked.post_conditions = provenance[(linked.id, vnode.id)].get("xnode_post_conditions")
+            _write_revocation(
+                notifications,
+                list(chain.values()),
+                ["vnode_list", "post_conditions"],
+                [
+                    parties.provenance_filter(linked_ids[v.id], v.id, "Share", provenance[(linked_ids[v.id], v.id)].get("reverse"))
+                    for v in vnodes
+                ],
+                deleted_ids,
+            )
+        return JsonResponse({"success": True, "message": "Successfully revoked all shared resources"}, status=200)
+    except Exception as e:
+        print(f"share revoke error: {str(e)}")
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+
+def _deleted_snode_notification(parties, snode, p_stack, message, lockers, users):
+    return parties.revoked_notification(
+        p_stack.get("reverse"),
+        message,
+        notification_type="node_deleted",
+        target_type="xnode",
+        target_id=str(snode.id),
+        extra_data={
+            "xnode_id": snode.id,
+            "xnode_type": snode.xnode_Type,
+            "locker_id": p_stack.get("to_locker"),
+            "locker_name": lockers[p_stack.get("to_locker")].name,
+            "user_id": p_stack.get("to_user"),
+            "username": users[p_stack.get("to_user")].username,
+            "connection_id": parties.connection.connection_id,
+            "connection_name": parties.connection.connection_name,
+        },
+    )
+
+
+def _return_to_giver(parties, linked, p_stack):
+    # Ownership of the conferred/collateralised node goes back to whoever gave it
+    user, locker = parties.giver(p_stack.get("reverse"))
+    linked.locker = locker
+    linked.connection = None
+    linked.node_information["current_owner"] = user.user_id
+    linked.post_conditions = p_stack.get("xnode_post_conditions")
+
+
+def _revoke_snodes(parties, snodes, share_type, chain, provenance, messages, deleted_fields):
+    linked_ids = {snode.id: int(snode.node_information["inode_or_snode_id"]) for snode in snodes}
+    p_stacks = {snode.id: provenance[(linked_ids[snode.id], snode.id)] for snode in snodes}
+    users = CustomUser.objects.in_bulk({p.get("to_user") for p in p_stacks.values()})
+    lockers = Locker.objects.in_bulk({p.get("to_locker") for p in p_stacks.values()})
+
+    subtrees = _load_subtrees(snodes)
+    notifications = [
+        _deleted_snode_notification(parties, snode, p_stacks[snode.id], messages[snode.id], lockers, users)
+        for snode in snodes if not snode.vnode_list
+    ]
+    notifications += build_node_deleted_notifications([
+        (child, parent, xnode_type, messages[target_id]) for child, parent, xnode_type, target_id in subtrees
+    ])
+
+    strip_xnode_list(chain.values(), "snode_list", [snode.id for snode in snodes])
+    for snode in snodes:
+        linked = chain.get(linked_ids[snode.id])
+        if linked is None:
+            raise RevocationError("Inode does not exist")
+        _return_to_giver(parties, linked, p_stacks[snode.id])
+
+    _write_revocation(
+        notifications,
+        list(chain.values()),
+        deleted_fields,
+        [
+            parties.provenance_filter(linked_ids[s.id], s.id, share_type, p_stacks[s.id].get("reverse"))
+            for s in snodes
+        ],
+        [child for child, _, _, _ in subtrees] + [snode.id for snode in snodes],
+    )
+
+
+def bulk_revoke_confer(connection_id, conferred_resources, host_user, host_locker, guest_user, guest_locker, is_revert=False):
+    try:
+        parties = RevocationParties(connection_id, host_user, host_locker, guest_user, guest_locker)
+        snodes = _load_targets(_unique_ids(conferred_resources))
+        provenance = _load_provenance(
+            [(int(s.node_information["inode_or_snode_id"]), s.id) for s in snodes], "Confer"
+        )
+        resources = _load_resources(snodes)
+        messages = {s.id: _notification_message(*resources[s.id], is_revert) for s in snodes}
+
+        with transaction.atomic():
+            # The snode is listed in the snode_list of the conferred node and every SNODE above it
+            chain = load_xnode_chains(
+                [s.node_information["inode_or_snode_id"] for s in snodes],
+                Xnode_V2.XnodeType.SNODE,
+                "inode_or_snode_id",
+            )
+            _revoke_snodes(
+                parties, snodes, "Confer", chain, provenance, messages,
+                ["snode_list", "locker", "connection", "node_information", "post_conditions"],
+            )
+        return JsonResponse({"success": True, "message": "Successfully revoked all shared resources"}, status=200)
+    except Exception as e:
+        print(f"confer error: {str(e)}")
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+
+def bulk_revoke_collateral(connection_id, collateral_resources, host_user, host_locker, guest_user, guest_locker, copy_file, is_revert=False):
+    """
+    copy_file(resource_obj, sender_user, receiver_user, receiver_locker) copies the
+    Drive file back to the original owner and returns {"new_file_id": ...}.
+    """
+    try:
+        print("========== REVOKE COLLATERAL START ==========")
+        parties = RevocationParties(connection_id, host_user, host_locker, guest_user, guest_locker)
+        inode_ids = _unique_ids(collateral_resources)
+
+        # Each collateralised node must have exactly one snode pointing at it
+        snodes_by_inode = {}
+        for snode in Xnode_V2.objects.filter(parent_pointer_q("inode_or_snode_id", inode_ids)):
+            snodes_by_inode.setdefault(int(snode.node_information["inode_or_snode_id"]), []).append(snode)
+        if any(len(snodes_by_inode.get(inode_id, [])) != 1 for inode_id in inode_ids):
+            return JsonResponse({"success": False, "error": "multiple or no snodes found"}, status=400)
+        snodes = [snodes_by_inode[inode_id][0] for inode_id in inode_ids]
+
+        provenance = _load_provenance([(int(s.node_information["inode_or_snode_id"]), s.id) for s in snodes], "Collateral")
+        resources = _load_resources(snodes)
+        messages = {
+            s.id: _notification_message(True, resources[s.id][1], is_revert) for s in snodes
+        }
+
+        # Drive copies happen before the transaction so no rows stay locked during network calls
+        party_ids = [(p["to_user"], p["from_user"], p["from_locker"]) for p in provenance.values()]
+        users = CustomUser.objects.in_bulk({uid for to_user, from_user, _ in party_ids for uid in (to_user, from_user)})
+        lockers = Locker.objects.in_bulk({from_locker for _, _, from_locker in party_ids})
+        new_links = {}
+        changed_resources = []
+        for snode in snodes:
+            resource = resources[snode.id][1]
+            if not (resource and resource.i_node_pointer):
+                continue
+            p_stack = provenance[(int(snode.node_information["inode_or_snode_id"]), snode.id)]
+            try:
+                # ALWAYS download from current owner (to_user)
+                receiver_user = users[p_stack["from_user"]]
+                receiver_locker = lockers[p_stack["from_locker"]]
+                drive_resp = copy_file(
+                    resource_obj=resource,
+                    sender_user=users[p_stack["to_user"]],
+                    receiver_user=receiver_user,
+                    receiver_locker=receiver_locker,
+                )
+                new_file_id = drive_resp["new_file_id"]
+                print(f"[DRIVE] Revert success → new_file_id={new_file_id}")
+                resource.i_node_pointer = new_file_id
+                resource.owner = receiver_user
+                resource.locker = receiver_locker
+                resource.drive_owner_email = receiver_user.email
+                changed_resources.append(resource)
+                new_links[snode.id] = f"https://drive.google.com/file/d/{new_file_id}/preview"
+            except Exception as e:
+                print("[REVOKE COLLATERAL ERROR]", e)
+
+        with transaction.atomic():
+            chain = load_xnode_chains([s.node_information["inode_or_snode_id"] for s in snodes])
+            for snode in snodes:
+                if snode.id in new_links and int(snode.node_information["inode_or_snode_id"]) in chain:
+                    chain[int(snode.node_information["inode_or_snode_id"])].node_information["resourse_link"] = new_links[snode.id]
+            Resource.objects.bulk_update(
+                changed_resources, ["i_node_pointer", "owner", "locker", "drive_owner_email"]
+            )
+            _revoke_snodes(
+                parties, snodes, "Collateral", chain, provenance, messages,
+                ["snode_list", "post_conditions", "node_information", "connection", "locker"],
+            )
+        return JsonResponse(
+            {"success": True, "message": "Successfully revoked all collateral resources"},
+            status=200,
+        )
+    except Exception as e:
+        print("[REVOKE COLLATERAL FATAL ERROR]", e)
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
@@ -1,3 +1,157 @@
+from django.db import connection as db_connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from api.model.xnode_model import Xnode_V2, XnodeProvenance
+from api.models import Notification, Resource
+from api.sharing.services.revocation import bulk_revoke_collateral, bulk_revoke_confer, bulk_revoke_share
+from api.utils.tests import XnodeChainMixin
+from api.utils.xnode.xnode_helper import push_xnode_provenance
+
+ORIGINAL_CONDITIONS = {"download": False, "share": True}
+
+
+class BulkRevocationTests(XnodeChainMixin, TestCase):
+    """
+    Revocations of conn12 (host user1/locker1, guest user2/locker2): the guest gave
+    the resources, the host holds the shared/conferred/collateral nodes.
+    """
+
+    def setUp(self):
+        self.connection = self.connections[0]
+        self.host_user, self.guest_user = self.users[0], self.users[1]
+        self.host_locker, self.guest_locker = self.lockers[0], self.lockers[1]
+
+    def parties(self):
+        return {
+            "host_user": self.host_user.user_id,
+            "host_locker": self.host_locker.locker_id,
+            "guest_user": self.guest_user.user_id,
+            "guest_locker": self.guest_locker.locker_id,
+        }
+
+    def provenance(self, parent, child, share_type, connection=None, from_locker=None, to_locker=None):
+        connection = connection or self.connection
+        from_locker = from_locker or self.guest_locker
+        to_locker = to_locker or self.host_locker
+        push_xnode_provenance(parent, {
+            "connection": connection.connection_id,
+            "from_locker": from_locker.locker_id,
+            "to_locker": to_locker.locker_id,
+            "from_user": from_locker.user_id,
+            "to_user": to_locker.user_id,
+            "type_of_share": share_type,
+            "xnode_id": child.id,
+            "xnode_post_conditions": ORIGINAL_CONDITIONS,
+            "reverse": False,
+        })
+
+    def shared(self):
+        # A guest INODE shared to the host, and re-shared by the host to user3
+        inode = self.inode(self.guest_locker)
+        vnode = self.vnode(inode, self.host_locker, self.connection)
+        self.provenance(inode, vnode, "Share")
+        reshared = self.vnode(vnode, self.lockers[2], self.connections[1])
+        self.provenance(vnode, reshared, "Share", self.connections[1], self.host_locker, self.lockers[2])
+        return inode, vnode, reshared
+
+    def test_revoke_share(self):
+        inode, vnode, reshared = self.shared()
+        leaf_inode = self.inode(self.guest_locker)
+        leaf = self.vnode(leaf_inode, self.host_locker, self.connection)
+        self.provenance(leaf_inode, leaf, "Share")
+
+        response = bulk_revoke_share(self.connection.connection_id, [vnode.id, leaf.id], **self.parties())
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(Xnode_V2.objects.filter(id__in=[vnode.id, reshared.id, leaf.id]).exists())
+        for node in (inode, leaf_inode):
+            node.refresh_from_db()
+            self.assertEqual(node.vnode_list, [])
+            self.assertEqual(node.post_conditions, ORIGINAL_CONDITIONS)
+            self.assertFalse(XnodeProvenance.objects.filter(xnode=node, type_of_share="Share").exists())
+        # user3 is told about the re-shared node, the host about the leaf share
+        self.assertEqual(
+            sorted(Notification.objects.values_list("host_user", "target_id")),
+            sorted([(self.users[2].user_id, str(reshared.id)), (self.host_user.user_id, None)]),
+        )
+
+    def test_revoke_share_missing_provenance_changes_nothing(self):
+        inode, vnode, reshared = self.shared()
+        stray = self.vnode(self.inode(self.guest_locker), self.host_locker, self.connection)
+
+        response = bulk_revoke_share(self.connection.connection_id, [vnode.id, stray.id], **self.parties())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Xnode_V2.objects.filter(id__in=[vnode.id, reshared.id, stray.id]).count(), 3)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_revoke_share_queries_do_not_grow_with_resources(self):
+        def revoke(count):
+            vnodes = []
+            for _ in range(count):
+                inode = self.inode(self.guest_locker)
+                vnode = self.vnode(inode, self.host_locker, self.connection)
+                self.provenance(inode, vnode, "Share")
+                vnodes.append(vnode.id)
+            with CaptureQueriesContext(db_connection) as queries:
+                response = bulk_revoke_share(self.connection.connection_id, vnodes, **self.parties())
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(revoke(2), revoke(6))
+
+    def conferred(self):
+        # A guest INODE conferred to the host: the host holds an SNODE pointing at it
+        inode = self.inode(self.guest_locker)
+        inode.node_information["current_owner"] = self.host_user.user_id
+        inode.save(update_fields=["node_information"])
+        snode = self.snode(inode, self.host_locker, self.connection)
+        return inode, snode
+
+    def test_revoke_confer(self):
+        inode, snode = self.conferred()
+        self.provenance(inode, snode, "Confer")
+
+        response = bulk_revoke_confer(self.connection.connection_id, [snode.id], **self.parties())
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(Xnode_V2.objects.filter(id=snode.id).exists())
+        inode.refresh_from_db()
+        self.assertEqual(inode.snode_list, [])
+        self.assertEqual(inode.locker_id, self.guest_locker.locker_id)
+        self.assertEqual(inode.node_information["current_owner"], self.guest_user.user_id)
+        self.assertEqual(inode.post_conditions, ORIGINAL_CONDITIONS)
+        self.assertEqual(
+            list(Notification.objects.values_list("host_user", "notification_type", "target_id")),
+            [(self.host_user.user_id, "node_deleted", str(snode.id))],
+        )
+
+    def test_revoke_collateral(self):
+        resource = Resource.objects.create(
+            document_name="doc", i_node_pointer="host-copy", locker=self.host_locker, owner=self.host_user
+        )
+        inode, snode = self.conferred()
+        inode.node_information["resource_id"] = resource.resource_id
+        inode.save(update_fields=["node_information"])
+        self.provenance(inode, snode, "Collateral")
+        copies = []
+
+        def copy_file(resource_obj, sender_user, receiver_user, receiver_locker):
+            copies.append((resource_obj.pk, sender_user.pk, receiver_user.pk, receiver_locker.pk))
+            return {"new_file_id": "guest-copy"}
+
+        response = bulk_revoke_collateral(
+            self.connection.connection_id, [inode.id], copy_file=copy_file, **self.parties()
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            copies,
+            [(resource.pk, self.host_user.pk, self.guest_user.pk, self.guest_locker.pk)],
+        )
+        resource.refresh_from_db()
+        self.assertEqual((resource.i_node_pointer, resource.owner, resource.locker), ("guest-copy", self.guest_user, self.guest_locker))
+        self.assertFalse(Xnode_V2.objects.filter(id=snode.id).exists())
+        inode.refresh_from_db()
+        self.assertEqual(inode.locker_id, self.guest_locker.locker_id)
+        self.assertEqual(inode.node_information["resourse_link"], "https://drive.google.com/file/d/guest-copy/preview")
@@ -8,6 +8,7 @@ from .views.transfer_approve import transfer_resource,transfer_resource_reverse
 from .views.condition_check_share import check_conditions,reshare_Allowed_Or_Not
 from .views.collateral_approve import collateral_resource,collateral_resource_reverse
 from .views.revocation import revoke_consent, revert_consent
+from .views.drive_jobs import drive_job_status
 
 
 urlpatterns = [
@@ -27,6 +28,7 @@ urlpatterns = [
     path('collateral-resource-host/', collateral_resource_reverse, name='collateral-resource-host'),
     path("revoke-consent/",revoke_consent,name="revoke_consent"),
     path("revert-consent/",revert_consent,name="revert_consent"),
+    path("drive-jobs/<int:job_id>/",drive_job_status,name="drive_job_status"),
 
 
 ]
@@ -1,5 +1,4 @@
 
-import json
 from http import HTTPStatus
 from django.http import JsonResponse,HttpRequest
 from django.views.decorators.csrf import csrf_exempt
@@ -7,9 +6,9 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from api.models import Locker, CustomUser, Connection, Resource, Notification, ConnectionType, ConnectionTerms
+from api.models import Locker, CustomUser, Connection, Resource, Notification, ConnectionType, ConnectionTerms, DriveJob
 from api.model.xnode_model import Xnode_V2
-from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.utils.resource_helper.access_resource_helper import access_Resource, link_root_inode
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from drf_spectacular.utils import (
@@ -20,9 +19,10 @@ from drf_spectacular.utils import (
 from drf_spectacular.types import OpenApiTypes
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
-from api.utils.xnode.xnode_helper import get_defalut_validity
+from api.utils.xnode.xnode_helper import get_defalut_validity, push_xnode_provenance
 
 from django.db import transaction
+from api.utils.google_drive_helper.drive_jobs import enqueue_drive_job_from_request
 #from api.utils.google_drive_helper.drive_helper import _drive_copy_return_new_file_id
 from api.utils.google_drive_helper.drive_helper import (
     add_drive_permission, get_or_refresh_google_token,
@@ -31,6 +31,15 @@ from api.utils.google_drive_helper.drive_helper import (
     _drive_copy_return_new_file_id # Add this
 )
 
+COLLATERAL_REQUIRED_FIELDS = [
+    "connection_name",
+    "host_locker_name",
+    "guest_locker_name",
+    "host_user_username",
+    "guest_user_username",
+    "validity_until",
+]
+
 
 @extend_schema(
     summary="Approve collateral resource (Guest to Host)",
@@ -50,19 +59,20 @@ from api.utils.google_drive_helper.drive_helper import (
         }
     },
     responses={
-        200: OpenApiResponse(
-            description="Resources pledged successfully",
+        200: OpenApiResponse(description="Collateral done inside the request (DRIVE_JOBS_ASYNC off), with the job_id it ran as"),
+        202: OpenApiResponse(
+            description="Collateral queued as a DriveJob (DRIVE_JOBS_ASYNC on); poll /sharing/drive-jobs/<job_id>/ for the result",
             response={
                 "type": "object",
                 "properties": {
                     "success": {"type": "boolean"},
                     "message": {"type": "string"},
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string"},
                 },
             },
         ),
-        400: OpenApiResponse(description="Invalid request or no eligible resources"),
-        404: OpenApiResponse(description="Connection, user, or locker not found"),
-        500: OpenApiResponse(description="Internal server error"),
+        400: OpenApiResponse(description="Invalid JSON or missing fields"),
     },
 )
 @csrf_exempt
@@ -70,6 +80,14 @@ from api.utils.google_drive_helper.drive_helper import (
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def collateral_resource(request: HttpRequest) -> JsonResponse:
+    """
+    Runs the collateral (run_collateral_resource) as a DriveJob: inside the request, or with
+    DRIVE_JOBS_ASYNC on, under `manage.py run_drive_jobs`, returning 202 with the job id.
+    """
+    return enqueue_drive_job_from_request(request, DriveJob.Kind.COLLATERAL, COLLATERAL_REQUIRED_FIELDS)
+
+
+def run_collateral_resource(body) -> JsonResponse:
     """
     Expected JSON data (form data):
     connection_name,
@@ -79,11 +97,8 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
     guest_user_username,
     validity_until
     """
-    if request.method == "POST":
+    if isinstance(body, dict):
         try:
-            # Parse JSON input
-            body = json.loads(request.body)
-
             connection_name = body.get("connection_name")
             host_locker_name = body.get("host_locker_name")
             guest_locker_name = body.get("guest_locker_name")
@@ -117,8 +132,6 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
 
         except (Connection.DoesNotExist, Locker.DoesNotExist, CustomUser.DoesNotExist) as e:
             return JsonResponse({"success": False, "error": str(e)}, status=404)
-        except json.JSONDecodeError:
-            return JsonResponse({"success": False, "error": "Invalid JSON format"}, status=400)
 
         # Helper function to process sharable entries
         def do_collateral(key, value):
@@ -190,8 +203,6 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
                         xnode = Xnode_V2.objects.select_for_update().get(id=xnode_id)
 
                         # safety
-                        if not isinstance(xnode.provenance_stack, list):
-                            xnode.provenance_stack = []
                         if not isinstance(xnode.snode_list, list):
                             xnode.snode_list = []
 
@@ -215,14 +226,13 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
                             "reverse": False,
                         }
 
-                        xnode.provenance_stack.insert(0, new_entry)
+                        provenance_entry = push_xnode_provenance(xnode, new_entry)
 
                         xnode.locker = host_locker
                         xnode.connection = connection
                         xnode.node_information["current_owner"] = host_user.user_id
 
                         xnode.save(update_fields=[
-                            "provenance_stack",
                             "locker",
                             "connection",
                             "node_information",
@@ -261,14 +271,16 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
                             "current_owner": guest_user.user_id,
                         }
                         xnode_created_Snode.save()
+                        link_root_inode(xnode_created_Snode, xnode)
 
                         # --------------------------------
                         # LINK + BACKFILL
                         # --------------------------------
                         xnode.snode_list.insert(0, xnode_created_Snode.id)
-                        xnode.provenance_stack[0]["xnode_id"] = xnode_created_Snode.id
+                        provenance_entry.shared_xnode_id = xnode_created_Snode.id
+                        provenance_entry.save(update_fields=["shared_xnode_id"])
 
-                        xnode.save(update_fields=["snode_list", "provenance_stack"])
+                        xnode.save(update_fields=["snode_list"])
 
                     # ------------------------------------
                     # LOCK FLAGS (SAFE OUTSIDE TX)
@@ -335,7 +347,7 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
             return JsonResponse({"success": False, "error": "No eligible file resource found for pledging"}, status=400)
 
 
-    return JsonResponse({"success": False, "error": "Invalid request method"}, status=405)
+    return JsonResponse({"success": False, "error": "Invalid job payload"}, status=400)
 
 
 @extend_schema(
@@ -356,19 +368,20 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
         }
     },
     responses={
-        200: OpenApiResponse(
-            description="Resources pledged successfully",
+        200: OpenApiResponse(description="Collateral done inside the request (DRIVE_JOBS_ASYNC off), with the job_id it ran as"),
+        202: OpenApiResponse(
+            description="Collateral queued as a DriveJob (DRIVE_JOBS_ASYNC on); poll /sharing/drive-jobs/<job_id>/ for the result",
             response={
                 "type": "object",
                 "properties": {
                     "success": {"type": "boolean"},
                     "message": {"type": "string"},
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string"},
                 },
             },
         ),
-        400: OpenApiResponse(description="Invalid request or no eligible resources"),
-        404: OpenApiResponse(description="Connection, user, or locker not found"),
-        500: OpenApiResponse(description="Internal server error"),
+        400: OpenApiResponse(description="Invalid JSON or missing fields"),
     },
 )
 @csrf_exempt
@@ -376,6 +389,14 @@ def collateral_resource(request: HttpRequest) -> JsonResponse:
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
+    """
+    Runs the collateral (run_collateral_resource_reverse) as a DriveJob: inside the request, or with
+    DRIVE_JOBS_ASYNC on, under `manage.py run_drive_jobs`, returning 202 with the job id.
+    """
+    return enqueue_drive_job_from_request(request, DriveJob.Kind.COLLATERAL_REVERSE, COLLATERAL_REQUIRED_FIELDS)
+
+
+def run_collateral_resource_reverse(body) -> JsonResponse:
     """
     Expected JSON data (form data):
     connection_name,
@@ -385,11 +406,8 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
     guest_user_username,
     validity_until
     """
-    if request.method == "POST":
+    if isinstance(body, dict):
         try:
-            # Parse JSON input
-            body = json.loads(request.body)
-
             connection_name = body.get("connection_name")
             host_locker_name = body.get("host_locker_name")
             guest_locker_name = body.get("guest_locker_name")
@@ -431,10 +449,6 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
             CustomUser.DoesNotExist,
         ) as e:
             return JsonResponse({"success": False, "error": str(e)}, status=404)
-        except json.JSONDecodeError:
-            return JsonResponse(
-                {"success": False, "error": "Invalid JSON format"}, status=400
-            )
 
         # Debug: Print the connection.terms_value and connection.resources for inspection
         print("terms_value:", connection.terms_value_reverse)
@@ -511,8 +525,6 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
                         xnode = Xnode_V2.objects.select_for_update().get(id=xnode_id)
 
                         # safety
-                        if not isinstance(xnode.provenance_stack, list):
-                            xnode.provenance_stack = []
                         if not isinstance(xnode.snode_list, list):
                             xnode.snode_list = []
 
@@ -536,14 +548,13 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
                             "reverse": True,
                         }
 
-                        xnode.provenance_stack.insert(0, new_entry)
+                        provenance_entry = push_xnode_provenance(xnode, new_entry)
 
                         xnode.locker = guest_locker
                         xnode.connection = connection
                         xnode.node_information["current_owner"] = guest_user.user_id
 
                         xnode.save(update_fields=[
-                            "provenance_stack",
                             "locker",
                             "connection",
                             "node_information",
@@ -580,6 +591,7 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
                                 "current_owner": host_user.user_id,
                             }
                         xnode_created_Snode.save()
+                        link_root_inode(xnode_created_Snode, xnode)
                         xnode.snode_list.insert(0, xnode_created_Snode.id)
                         # xnode.provenance_stack.insert(0, {"locker": host_locker.locker_id, "connection": connection.connection_id, "user": host_user.user_id})
                         xnode.save()
@@ -594,9 +606,9 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
                         xnode_created_Snode.is_locked = is_locked
                         xnode_created_Snode.save(update_fields=["is_locked"])
                         print(f"Updated is_locked for SNODE {xnode_created_Snode.id}: {is_locked}")
-                        xnode.provenance_stack[0]["xnode_id"] = xnode_created_Snode.id
-                        xnode.save(update_fields=["provenance_stack"])
-                        print(f"updated provenance stack of xnode:{xnode.provenance_stack[0]['xnode_id']}")
+                        provenance_entry.shared_xnode_id = xnode_created_Snode.id
+                        provenance_entry.save(update_fields=["shared_xnode_id"])
+                        print(f"updated provenance stack of xnode:{provenance_entry.shared_xnode_id}")
 
                         return True
 
@@ -652,5 +664,5 @@ def collateral_resource_reverse(request: HttpRequest) -> JsonResponse:
 
 
     return JsonResponse(
-        {"success": False, "error": "Invalid request method"}, status=405
+        {"success": False, "error": "Invalid job payload"}, status=400
     )
@@ -5,7 +5,7 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.permissions import IsAuthenticated
 from api.models import Locker, CustomUser, Connection, Resource, Notification, ConnectionType, ConnectionTerms
 from api.model.xnode_model import Xnode_V2
-from api.utils.xnode.xnode_helper import NodeLockChecker  # Import NodeLockChecker
+from api.utils.xnode.xnode_helper import NodeLockChecker, push_xnode_provenance  # Import NodeLockChecker
 from api.utils.resource_helper.access_resource_helper import access_Resource
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -173,12 +173,9 @@ def confer_resource_approve_v2(request):
 
                                     print("new_entry:", new_entry)
 
-                                    if not isinstance(xnode.provenance_stack, list):
-                                        xnode.provenance_stack = []
                                     print("++++++++++++++++++++++++++++++++")
 
-                                    xnode.provenance_stack.insert(0, new_entry)
-                                    xnode.save(update_fields=["provenance_stack"])   
+                                    push_xnode_provenance(xnode, new_entry)
 
 
                                     print(f"Found original INODE {xnode_id}, updating current owner to host user.")
@@ -427,12 +424,9 @@ def confer_resource_approve_reverse_v2(request):
 
                                     print("new_entry:", new_entry)
 
-                                    if not isinstance(xnode.provenance_stack, list):
-                                        xnode.provenance_stack = []
                                     print("++++++++++++++++++++++++++++++++")
 
-                                    xnode.provenance_stack.insert(0, new_entry)
-                                    xnode.save(update_fields=["provenance_stack"])   
+                                    push_xnode_provenance(xnode, new_entry)
 
                                     print(f"Found original INODE {xnode_id}, updating current owner to host user.")
 
@@ -0,0 +1,64 @@
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    authentication_classes,
+)
+from rest_framework.permissions import IsAuthenticated
+from api.models import DriveJob
+from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpRequest, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.google_drive_helper.drive_jobs import serialize_drive_job
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiResponse,
+)
+
+
+@extend_schema(
+    summary="Drive job status",
+    description="Poll a transfer/collateral DriveJob queued by the approve endpoints. `result` holds the JSON the endpoint used to return once the job has finished.",
+    parameters=[
+        OpenApiParameter(name="job_id", description="ID returned by the approve endpoint", required=True, type=int, location=OpenApiParameter.PATH),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description="Job status",
+            response={
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean"},
+                    "job": {
+                        "type": "object",
+                        "properties": {
+                            "job_id": {"type": "integer"},
+                            "kind": {"type": "string"},
+                            "status": {"type": "string", "enum": ["queued", "running", "succeeded", "failed"]},
+                            "status_code": {"type": "integer"},
+                            "result": {"type": "object"},
+                            "error": {"type": "string"},
+                        },
+                    },
+                },
+            },
+        ),
+        403: OpenApiResponse(description="Job was requested by another user"),
+        404: OpenApiResponse(description="Job not found"),
+    },
+)
+@csrf_exempt
+@api_view(["GET"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def drive_job_status(request: HttpRequest, job_id: int) -> JsonResponse:
+    try:
+        job = DriveJob.objects.get(job_id=job_id)
+    except DriveJob.DoesNotExist:
+        return JsonResponse({"success": False, "error": "Drive job not found"}, status=404)
+
+    if job.requested_by_id not in (None, request.user.user_id) and not request.user.is_staff:
+        return JsonResponse({"success": False, "error": "You are not allowed to view this job"}, status=403)
+
+    return JsonResponse({"success": True, "job": serialize_drive_job(job)}, status=200)
@@ -7,7 +7,8 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from api.models import Locker, CustomUser, Connection
 from api.model.xnode_model import Xnode_V2
-from api.utils.xnode.xnode_helper import NodeLockChecker  # Import NodeLockChecker
+from api.utils.xnode.xnode_helper import NodeLockChecker, copy_xnode_provenance  # Import NodeLockChecker
+from api.utils.resource_helper.access_resource_helper import clear_root_inode_through, link_root_inode
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from drf_spectacular.utils import (
@@ -128,6 +129,7 @@ def process_resource_consent_guest(request):
                         old_xnode = Xnode_V2.objects.get(id=old_xnode)
                         print("Deleting old_xnode:", old_xnode.id)
                         # Delete the old VNODE before creating the new one
+                        clear_root_inode_through([old_xnode.id])
                         old_xnode.delete()
                         print("Deleted old_xnode:", old_xnode.id)
                     except Xnode_V2.DoesNotExist:
@@ -152,6 +154,7 @@ def process_resource_consent_guest(request):
                     "reverse": False,
                 }
                 xnode_created.save()
+                link_root_inode(xnode_created, inode_xnode)
 
                 return JsonResponse({
                     "success": True,
@@ -214,6 +217,7 @@ def process_resource_consent_guest(request):
                     try:
                         old_xnode = Xnode_V2.objects.get(id=old_xnode)
                         # Delete the old SNODE before creating the new one
+                        clear_root_inode_through([old_xnode.id])
                         old_xnode.delete()
                     except Xnode_V2.DoesNotExist:
                         pass #Proceed if already deleted
@@ -228,7 +232,6 @@ def process_resource_consent_guest(request):
                     validity_until=timezone.now() + timezone.timedelta(days=10),
                     xnode_Type=Xnode_V2.XnodeType.SNODE,
                     post_conditions=inode_xnode.post_conditions, 
-                    provenance_stack=inode_xnode.provenance_stack,  # Copy provenance stack
                 )
 
                 xnode_created_Snode.node_information = {
@@ -239,6 +242,8 @@ def process_resource_consent_guest(request):
                     "reverse": False,
                 }
                 xnode_created_Snode.save()
+                link_root_inode(xnode_created_Snode, inode_xnode)
+                copy_xnode_provenance(inode_xnode, xnode_created_Snode)  # Copy provenance stack
                 
                 return JsonResponse({
                     "success": True,
@@ -463,6 +468,7 @@ def process_resource_consent_host(request):
                     try:
                         old_xnode = Xnode_V2.objects.get(id=old_xnode)
                         # Delete the old VNODE before creating the new one
+                        clear_root_inode_through([old_xnode.id])
                         old_xnode.delete()
                     except Xnode_V2.DoesNotExist:
                         pass #Proceed if already deleted
@@ -476,7 +482,6 @@ def process_resource_consent_host(request):
                     validity_until=timezone.now() + timezone.timedelta(days=10),
                     xnode_Type=Xnode_V2.XnodeType.VNODE,
                     post_conditions=post_conditions,  # Copy terms from INODE
-                    provenance_stack=inode_xnode.provenance_stack,  # Copy provenance stack
                 )
 
                 xnode_created.node_information = {
@@ -485,6 +490,8 @@ def process_resource_consent_host(request):
                     "reverse": True,
                 }
                 xnode_created.save()
+                link_root_inode(xnode_created, inode_xnode)
+                copy_xnode_provenance(inode_xnode, xnode_created)  # Copy provenance stack
 
                 return JsonResponse({
                     "success": True,
@@ -546,6 +553,7 @@ def process_resource_consent_host(request):
                     try:
                         old_xnode = Xnode_V2.objects.get(id=old_xnode)
                         # Delete the old SNODE before creating the new one
+                        clear_root_inode_through([old_xnode.id])
                         old_xnode.delete()
                     except Xnode_V2.DoesNotExist:
                         pass #Proceed if already deleted
@@ -560,7 +568,6 @@ def process_resource_consent_host(request):
                     validity_until=timezone.now() + timezone.timedelta(days=10),
                     xnode_Type=Xnode_V2.XnodeType.SNODE,
                     post_conditions=inode_xnode.post_conditions,  # Copy terms from INODE
-                    provenance_stack=inode_xnode.provenance_stack,  # Copy provenance stack
                 )
 
                 xnode_created_Snode.node_information = {
@@ -571,6 +578,8 @@ def process_resource_consent_host(request):
                     "reverse": False,
                 }
                 xnode_created_Snode.save()
+                link_root_inode(xnode_created_Snode, inode_xnode)
+                copy_xnode_provenance(inode_xnode, xnode_created_Snode)  # Copy provenance stack
 
               
                 return JsonResponse({
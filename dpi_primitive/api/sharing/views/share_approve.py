@@ -6,7 +6,7 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.permissions import IsAuthenticated
 from api.models import Locker, CustomUser, Connection, Resource, Notification, ConnectionType, ConnectionTerms
 from api.model.xnode_model import Xnode_V2
-from api.utils.xnode.xnode_helper import NodeLockChecker  # Import NodeLockChecker
+from api.utils.xnode.xnode_helper import NodeLockChecker, push_xnode_provenance  # Import NodeLockChecker
 from api.utils.resource_helper.access_resource_helper import access_Resource
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -171,12 +171,9 @@ def share_resource_approve_v2(request):
 
                             print("new_entry:", new_entry)
 
-                            if not isinstance(linked_xnode.provenance_stack, list):
-                                linked_xnode.provenance_stack = []
                             print("++++++++++++++++++++++++++++++++")
 
-                            linked_xnode.provenance_stack.insert(0, new_entry)
-                            linked_xnode.save(update_fields=["provenance_stack"])   
+                            push_xnode_provenance(linked_xnode, new_entry)
                             linked_inode = access_Resource(xnode_id=int(xnode_info))   
 
                             while True:
@@ -398,12 +395,9 @@ def share_resource_approve_reverse_v2(request):
 
                             print("new_entry:", new_entry)
 
-                            if not isinstance(linked_xnode.provenance_stack, list):
-                                linked_xnode.provenance_stack = []
                             print("++++++++++++++++++++++++++++++++")
 
-                            linked_xnode.provenance_stack.insert(0, new_entry)
-                            linked_xnode.save(update_fields=["provenance_stack"])   
+                            push_xnode_provenance(linked_xnode, new_entry)
                             linked_inode = access_Resource(xnode_id=xnode_info)   
  
                            
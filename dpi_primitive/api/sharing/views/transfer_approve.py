@@ -1,8 +1,7 @@
 
 
-import json
 from django.utils import timezone
-from api.utils.xnode.xnode_helper import compute_terms_status  # Import NodeLockChecker
+from api.utils.xnode.xnode_helper import compute_terms_status, push_xnode_provenance  # Import NodeLockChecker
 from api.utils.google_drive_helper.drive_helper import (
     add_drive_permission, get_or_refresh_google_token,
     try_transfer_ownership_via_permission, download_file_to_temp,
@@ -22,6 +21,7 @@ from api.models import (
     Locker,
     CustomUser,
     Connection,
+    DriveJob,
 )
 from api.model.xnode_model import Xnode_V2
 from api.utils.resource_helper.access_resource_helper import access_Resource
@@ -43,6 +43,16 @@ from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 
 from django.db import transaction
+from api.utils.google_drive_helper.drive_jobs import enqueue_drive_job_from_request
+
+TRANSFER_REQUIRED_FIELDS = [
+    "connection_name",
+    "host_locker_name",
+    "guest_locker_name",
+    "host_user_username",
+    "guest_user_username",
+    "validity_until",
+]
 
 @extend_schema(
     summary="Transfer resource (Guest to Host)",
@@ -62,19 +72,20 @@ from django.db import transaction
         }
     },
     responses={
-        200: OpenApiResponse(
-            description="Resources transferred successfully",
+        200: OpenApiResponse(description="Transfer done inside the request (DRIVE_JOBS_ASYNC off), with the job_id it ran as"),
+        202: OpenApiResponse(
+            description="Transfer queued as a DriveJob (DRIVE_JOBS_ASYNC on); poll /sharing/drive-jobs/<job_id>/ for the result",
             response={
                 "type": "object",
                 "properties": {
                     "success": {"type": "boolean"},
                     "message": {"type": "string"},
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string"},
                 },
             },
         ),
-        400: OpenApiResponse(description="Invalid request or no eligible resources"),
-        404: OpenApiResponse(description="Connection, user, or locker not found"),
-        500: OpenApiResponse(description="Drive transfer or resource update failed"),
+        400: OpenApiResponse(description="Invalid JSON or missing fields"),
     },
 )
 @csrf_exempt
@@ -82,27 +93,22 @@ from django.db import transaction
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def transfer_resource(request):
+    """
+    Runs the transfer (run_transfer_resource) as a DriveJob: inside the request, or with
+    DRIVE_JOBS_ASYNC on, under `manage.py run_drive_jobs`, returning 202 with the job id.
+    """
+    return enqueue_drive_job_from_request(request, DriveJob.Kind.TRANSFER, TRANSFER_REQUIRED_FIELDS)
+
+
+def run_transfer_resource(body):
     """
     Transfer resource(s) according to connection terms.
     INODE transfer: download guest file -> upload to host Drive -> update existing Resource & INODE (no new INODE).
     VNODE/SNODE transfer: update node_information owners and locker only.
     """
     print("print(0) -- transfer_resource called")
-    try:
-        body = json.loads(request.body)
-    except json.JSONDecodeError:
-        print("print(0.1) invalid json")
-        return JsonResponse({"success": False, "error": "Invalid JSON format"}, status=400)
-
-    required = [
-        "connection_name",
-        "host_locker_name",
-        "guest_locker_name",
-        "host_user_username",
-        "guest_user_username",
-        "validity_until",
-    ]
-    details = {f: body.get(f) for f in required}
+
+    details = {f: body.get(f) for f in TRANSFER_REQUIRED_FIELDS}
     if None in details.values():
         print("print(0.2) missing fields", details)
         return JsonResponse({"success": False, "error": "All fields are required"}, status=400)
@@ -163,9 +169,6 @@ def transfer_resource(request):
                 "timestamp": timezone.now().isoformat(),
             }
 
-            if not isinstance(xnode.provenance_stack, list):
-                xnode.provenance_stack = []
-
             node_type = xnode.xnode_Type
 
             # resolve inode using existing access_Resource
@@ -179,21 +182,21 @@ def transfer_resource(request):
             # VNODE logic: change current_owner and locker
             if node_type == "VNODE":
                 print("print(3) VNODE transfer")
-                xnode.provenance_stack.insert(0, new_entry)
+                push_xnode_provenance(xnode, new_entry)
                 xnode.node_information["current_owner"] = host_user.user_id
                 xnode.locker = host_locker
-                xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                xnode.save(update_fields=["node_information", "locker"])
                 print("print(3.1) VNODE updated")
                 return True
 
             # SNODE logic: change primary_owner & current_owner and locker
             if node_type == "SNODE":
                 print("print(4) SNODE transfer")
-                xnode.provenance_stack.insert(0, new_entry)
+                push_xnode_provenance(xnode, new_entry)
                 xnode.node_information["primary_owner"] = host_user.user_id
                 xnode.node_information["current_owner"] = host_user.user_id
                 xnode.locker = host_locker
-                xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                xnode.save(update_fields=["node_information", "locker"])
                 print("print(4.1) SNODE updated")
                 return True
 
@@ -253,13 +256,13 @@ def transfer_resource(request):
                 # Update the INODE / xnode node_information and locker & provenance
                 try:
                     print("print(8) updating Xnode (inode) info and provenance")
-                    xnode.provenance_stack.insert(0, new_entry)
+                    push_xnode_provenance(xnode, new_entry)
                     # update ownership fields per your provided logic
                     xnode.node_information["primary_owner"] = host_user.user_id
                     xnode.node_information["current_owner"] = host_user.user_id
                     xnode.node_information["resourse_link"] = f"https://drive.google.com/file/d/{new_file_id}/preview"
                     xnode.locker = host_locker
-                    xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                    xnode.save(update_fields=["node_information", "locker"])
                     print("print(8.1) Xnode updated")
                 except Exception as e:
                     print("print(8.2) Xnode update failed:", e)
@@ -399,19 +402,20 @@ def transfer_resource(request):
         }
     },
     responses={
-        200: OpenApiResponse(
-            description="Resources transferred successfully",
+        200: OpenApiResponse(description="Transfer done inside the request (DRIVE_JOBS_ASYNC off), with the job_id it ran as"),
+        202: OpenApiResponse(
+            description="Transfer queued as a DriveJob (DRIVE_JOBS_ASYNC on); poll /sharing/drive-jobs/<job_id>/ for the result",
             response={
                 "type": "object",
                 "properties": {
                     "success": {"type": "boolean"},
                     "message": {"type": "string"},
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string"},
                 },
             },
         ),
-        400: OpenApiResponse(description="Invalid request or no eligible resources"),
-        404: OpenApiResponse(description="Connection, user, or locker not found"),
-        500: OpenApiResponse(description="Drive transfer or resource update failed"),
+        400: OpenApiResponse(description="Invalid JSON or missing fields"),
     },
 )
 @csrf_exempt
@@ -419,27 +423,22 @@ def transfer_resource(request):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def transfer_resource_reverse(request):
+    """
+    Runs the transfer (run_transfer_resource_reverse) as a DriveJob: inside the request, or with
+    DRIVE_JOBS_ASYNC on, under `manage.py run_drive_jobs`, returning 202 with the job id.
+    """
+    return enqueue_drive_job_from_request(request, DriveJob.Kind.TRANSFER_REVERSE, TRANSFER_REQUIRED_FIELDS)
+
+
+def run_transfer_resource_reverse(body):
     """
     Transfer resource(s) according to connection terms.
     INODE transfer: download host file -> upload to guest Drive -> update existing Resource & INODE (no new INODE).
     VNODE/SNODE transfer: update node_information owners and locker only.
     """
     print("print(0) -- transfer_resource called")
-    try:
-        body = json.loads(request.body)
-    except json.JSONDecodeError:
-        print("print(0.1) invalid json")
-        return JsonResponse({"success": False, "error": "Invalid JSON format"}, status=400)
-
-    required = [
-        "connection_name",
-        "host_locker_name",
-        "guest_locker_name",
-        "host_user_username",
-        "guest_user_username",
-        "validity_until",
-    ]
-    details = {f: body.get(f) for f in required}
+
+    details = {f: body.get(f) for f in TRANSFER_REQUIRED_FIELDS}
     if None in details.values():
         print("print(0.2) missing fields", details)
         return JsonResponse({"success": False, "error": "All fields are required"}, status=400)
@@ -499,9 +498,6 @@ def transfer_resource_reverse(request):
                 "timestamp": timezone.now().isoformat(),
             }
 
-            if not isinstance(xnode.provenance_stack, list):
-                xnode.provenance_stack = []
-
             node_type = xnode.xnode_Type
 
             # resolve inode using existing access_Resource
@@ -515,21 +511,21 @@ def transfer_resource_reverse(request):
             # VNODE logic: change current_owner and locker
             if node_type == "VNODE":
                 print("print(3) VNODE transfer")
-                xnode.provenance_stack.insert(0, new_entry)
+                push_xnode_provenance(xnode, new_entry)
                 xnode.node_information["current_owner"] = guest_user.user_id
                 xnode.locker = guest_locker
-                xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                xnode.save(update_fields=["node_information", "locker"])
                 print("print(3.1) VNODE updated")
                 return True
 
             # SNODE logic: change primary_owner & current_owner and locker
             if node_type == "SNODE":
                 print("print(4) SNODE transfer")
-                xnode.provenance_stack.insert(0, new_entry)
+                push_xnode_provenance(xnode, new_entry)
                 xnode.node_information["primary_owner"] = guest_user.user_id
                 xnode.node_information["current_owner"] = guest_user.user_id
                 xnode.locker = guest_locker
-                xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                xnode.save(update_fields=["node_information", "locker"])
                 print("print(4.1) SNODE updated")
                 return True
 
@@ -589,13 +585,13 @@ def transfer_resource_reverse(request):
                 # Update the INODE / xnode node_information and locker & provenance
                 try:
                     print("print(8) updating Xnode (inode) info and provenance")
-                    xnode.provenance_stack.insert(0, new_entry)
+                    push_xnode_provenance(xnode, new_entry)
                     # update ownership fields per your provided logic
                     xnode.node_information["primary_owner"] = guest_user.user_id
                     xnode.node_information["current_owner"] = guest_user.user_id
                     xnode.node_information["resourse_link"] = f"https://drive.google.com/file/d/{new_file_id}/preview"
                     xnode.locker = guest_locker
-                    xnode.save(update_fields=["provenance_stack", "node_information", "locker"])
+                    xnode.save(update_fields=["node_information", "locker"])
                     print("print(8.1) Xnode updated")
                 except Exception as e:
                     print("print(8.2) Xnode update failed:", e)
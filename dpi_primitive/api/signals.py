@@ -1,5 +1,5 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.db.models.signals import post_init, post_save, pre_save, post_delete
+from django.dispatch import receiver, Signal
 from .models import Connection, CustomUser, ConnectionType, Resource
 from .model.xnode_model import Xnode_V2
 from allauth.socialaccount.models import SocialToken
@@ -7,13 +7,16 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from datetime import timedelta
-from .models import GoogleAuthToken
+from .models import GoogleAuthToken, Notification
 from allauth.socialaccount.signals import pre_social_login
 from allauth.socialaccount.models import SocialToken, SocialAccount
 from django.db.models.signals import post_save
 
 User = get_user_model()
 
+# Sent by api.tasks with xnode_ids=[...] for every batch of expired xnodes it closed
+xnodes_closed = Signal()
+
 # Signal for CustomUser
 @receiver(post_save, sender=CustomUser)
 def update_connection_name_on_user_update(sender, instance, **kwargs):
@@ -31,3 +34,111 @@ def update_connection_name_on_type_update(sender, instance, **kwargs):
     for connection in connections:
         connection.save()  # This will call the save method and update the connection_name
 
+# Signal for GoogleAuthToken
+@receiver(post_save, sender=GoogleAuthToken)
+@receiver(post_delete, sender=GoogleAuthToken)
+def forget_cached_google_token(sender, instance, **kwargs):
+    # New login / revoked token: drop the broker's cached copy
+    from .utils.google_drive_helper.token_broker import google_token_broker
+    google_token_broker.forget(instance.user_id)
+
+# Signal for expired xnodes
+@receiver(xnodes_closed)
+def notify_xnodes_closed(sender, xnode_ids, **kwargs):
+    # Tells the holder of each closed shared node (VNODE/SNODE, which have a connection)
+    closed = Xnode_V2.objects.filter(id__in=xnode_ids, connection__isnull=False).select_related(
+        "connection__connection_type", "locker__user"
+    )
+    notifications = [
+        Notification(
+            connection=xnode.connection,
+            host_user=xnode.locker.user,
+            guest_user=xnode.locker.user,
+            host_locker=xnode.locker,
+            guest_locker=xnode.locker,
+            connection_type=xnode.connection.connection_type,
+            message=f"Access to node {xnode.id} in locker '{xnode.locker.name}' through connection '{xnode.connection.connection_name}' has expired.",
+            notification_type="xnode_closed",
+            target_type="xnode",
+            target_id=str(xnode.id),
+            extra_data={
+                "xnode_id": xnode.id,
+                "xnode_type": xnode.xnode_Type,
+                "locker_id": xnode.locker.locker_id,
+                "locker_name": xnode.locker.name,
+                "connection_id": xnode.connection.connection_id,
+                "connection_name": xnode.connection.connection_name,
+                "validity_until": xnode.validity_until.isoformat() if xnode.validity_until else None,
+            },
+        )
+        for xnode in closed
+    ]
+    Notification.objects.bulk_create(notifications)
+    from .notifications.services.pubsub import publish_new_notifications
+    publish_new_notifications(notifications)
+
+# Signal for Notification
+@receiver(post_save, sender=Notification)
+def publish_created_notification(sender, instance, created, **kwargs):
+    # Wakes the user's notification/stream/ connections (bulk_create callers publish themselves)
+    if created:
+        from .notifications.services.pubsub import publish_new_notifications
+        publish_new_notifications([instance])
+
+# Signals for the dashboard/locker connection stats
+CONNECTION_STATS_FIELDS = ("host_user_id", "host_locker_id", "guest_user_id", "guest_locker_id", "connection_status")
+
+def _connection_stats_key(instance, loaded_key=None, update_fields=None):
+    # Fields that are deferred (or not in update_fields) are taken from loaded_key
+    values = instance.__dict__
+    loaded_key = loaded_key or (None,) * len(CONNECTION_STATS_FIELDS)
+    key = []
+    for field, loaded in zip(CONNECTION_STATS_FIELDS, loaded_key):
+        saved = update_fields is None or field.removesuffix("_id") in update_fields or field in update_fields
+        key.append(values[field] if saved and field in values else loaded)
+    return None if None in key else tuple(key)
+
+@receiver(post_init, sender=Connection)
+def remember_connection_stats_key(sender, instance, **kwargs):
+    # What the row counts as when loaded (ignored for new instances, see created below)
+    instance._stats_key = _connection_stats_key(instance)
+
+@receiver(pre_save, sender=Connection)
+def load_connection_stats_key(sender, instance, **kwargs):
+    # Loaded with deferred fields: read what the row counts as before it is overwritten
+    if not instance._state.adding and instance._stats_key is None:
+        instance._stats_key = Connection.objects.filter(pk=instance.pk).values_list(*CONNECTION_STATS_FIELDS).first()
+
+@receiver(post_save, sender=Connection)
+def update_connection_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    from .dashboard.services.connection_stats import apply_connection_stats_change
+    old_key = None if created else instance._stats_key
+    new_key = _connection_stats_key(instance, old_key, update_fields)
+    instance._stats_key = new_key
+    if old_key != new_key:
+        apply_connection_stats_change(old_key, new_key)
+
+@receiver(post_delete, sender=Connection)
+def update_connection_stats_on_delete(sender, instance, **kwargs):
+    from .dashboard.services.connection_stats import apply_connection_stats_change
+    apply_connection_stats_change(_connection_stats_key(instance, instance._stats_key), None)
+
+@receiver(post_save, sender=ConnectionType)
+@receiver(post_delete, sender=ConnectionType)
+def invalidate_connection_type_stats(sender, instance, created=True, **kwargs):
+    if created:
+        from .dashboard.services.connection_stats import invalidate_connection_stats
+        invalidate_connection_stats([(instance.owner_user_id, instance.owner_locker_id)])
+
+# Signal for the structured copy of the connection terms
+TERMS_FIELDS = ("terms_value", "terms_value_reverse")
+
+@receiver(post_save, sender=Connection)
+def sync_connection_term_values(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(TERMS_FIELDS) & set(update_fields):
+        return
+    fields = [field for field in TERMS_FIELDS if update_fields is None or field in update_fields]
+    if any(field not in instance.__dict__ for field in fields):
+        return  # deferred, so not written by this save
+    from .connections.services.term_values import sync_term_values
+    sync_term_values(instance, fields)
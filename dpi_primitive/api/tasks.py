@@ -1,10 +1,138 @@
 # This file maintains all the cron jobs that have to performed in the project.
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 from api.models import Connection
+from api.model.xnode_model import Xnode_V2
+from api.signals import xnodes_closed
+from api.utils.google_drive_helper import drive_jobs
+from api.utils.resource_helper import subset_jobs
+from api.utils.resource_helper.access_resource_helper import delete_clearing_root_inode
+
+XNODE_EXPIRY_BATCH_SIZE = 1000
 
 # CRON job - Iterate through all the rows in the corresponding database table and check if the validity has expired. If yes, change the ownership of the resource if the host has approved and then delete it (and log it) otherwise, just delete it (and log it).
-def check_connections_valid_until():
+# Deleting a connection cascades to its xnodes, notifications, terms and M2M rows, so expired
+# connections are deleted batch_size at a time, one transaction per batch, with a short pause
+# in between, and the run stops once time_budget seconds are spent (the rest is picked up next run).
+def check_connections_valid_until(batch_size=None, time_budget=None, pause=None):
+    batch_size = batch_size or getattr(settings, "CONNECTION_EXPIRY_BATCH_SIZE", 100)
+    time_budget = time_budget if time_budget is not None else getattr(settings, "CONNECTION_EXPIRY_TIME_BUDGET", 120)
+    pause = pause if pause is not None else getattr(settings, "CONNECTION_EXPIRY_PAUSE", 0.2)
+
+    now = timezone.now()
+    started = time.monotonic()
+    connections = rows = batches = 0
+    while True:
+        ids = list(
+            Connection.objects.filter(validity_time__lt=now)
+            .order_by("validity_time", "connection_id")
+            .values_list("connection_id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            count, _ = delete_clearing_root_inode(
+                Connection.objects.filter(connection_id__in=ids, validity_time__lt=now)
+            )
+        connections += len(ids)
+        rows += count
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        if time.monotonic() - started >= time_budget:
+            print("Connection expiry stopped at its time budget, the rest is left for the next run.")
+            break
+        if pause:
+            time.sleep(pause)
+
+    print(
+        f"Deleted {connections} expired connections ({rows} rows with cascades) "
+        f"in {batches} batches, {time.monotonic() - started:.1f}s."
+    )
+    return connections
+
+
+def _close_xnode_batch(now, batch_size):
+    # One batch of expired, still open xnodes -> closed; returns their ids
+    if connection.vendor == "postgresql":
+        table = connection.ops.quote_name(Xnode_V2._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} SET status = 'closed'
+                WHERE id IN (
+                    SELECT id FROM {table}
+                    WHERE validity_until < %s AND status <> 'closed'
+                    ORDER BY validity_until, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+                """,
+                [now, batch_size],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    ids = list(
+        Xnode_V2.objects.filter(validity_until__lt=now)
+        .exclude(status="closed")
+        .order_by("validity_until", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if ids:
+        Xnode_V2.objects.filter(id__in=ids).update(status="closed")
+    return ids
+
+
+# CRON job - close every xnode whose validity_until has passed, in batches of batch_size
+# (one transaction each), and send xnodes_closed with the ids of each batch.
+def close_expired_xnodes(batch_size=XNODE_EXPIRY_BATCH_SIZE):
     now = timezone.now()
-    expired_connections = Connection.objects.filter(validity_time__lt=now)
-    count, _ = expired_connections.delete()
-    print(f"Deleted {count} expired connections.")
+    closed = []
+    while True:
+        with transaction.atomic():
+            ids = _close_xnode_batch(now, batch_size)
+        if not ids:
+            break
+        closed.extend(ids)
+        xnodes_closed.send(sender=Xnode_V2, xnode_ids=ids)
+        if len(ids) < batch_size:
+            break
+    print(f"Closed {len(closed)} expired xnodes.")
+    return closed
+
+
+# The expired xnodes of one user's lockers (update-xnode-status), closed right away
+# instead of at the next close_expired_xnodes run; returns the ids it closed.
+def close_user_expired_xnodes(user_id):
+    with transaction.atomic():
+        ids = list(
+            Xnode_V2.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(locker__user_id=user_id, validity_until__lt=timezone.now())
+            .exclude(status="closed")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if ids:
+            Xnode_V2.objects.filter(id__in=ids).update(status="closed")
+    if ids:
+        xnodes_closed.send(sender=Xnode_V2, xnode_ids=ids)
+    return ids
+
+
+# CRON job - fail Drive jobs whose run_drive_jobs worker stopped mid-job
+def fail_stale_drive_jobs():
+    failed = drive_jobs.fail_stale_drive_jobs()
+    print(f"Failed {failed} stale drive jobs.")
+    return failed
+
+
+# CRON job - fail subset jobs left queued/running by a web process that stopped
+# (enqueue_subset_job and the job status view also do this on the way).
+def fail_stale_subset_jobs():
+    failed = subset_jobs.fail_stale_subset_jobs()
+    print(f"Failed {failed} stale subset jobs.")
+    return failed
@@ -1,3 +1,125 @@
-from django.test import TestCase
-
-# Create your tests here.
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.model.xnode_model import Xnode_V2
+from api.models import Connection, Notification
+from api.resource.views.xnode_views.xnode_status import xnode_v2_status
+from api import tasks
+from api.signals import xnodes_closed
+from api.tasks import check_connections_valid_until, close_expired_xnodes
+from api.utils.tests import XnodeChainMixin
+
+
+class XnodeExpiryTests(XnodeChainMixin, TestCase):
+    def setUp(self):
+        # Expired: an INODE of locker1 and the VNODEs shared from it to locker2 and locker3
+        self.inode_node = self.inode(self.lockers[0])
+        self.v1 = self.vnode(self.inode_node, self.lockers[1], self.connections[0])
+        self.v2 = self.vnode(self.v1, self.lockers[2], self.connections[1])
+        self.expired = [self.inode_node, self.v1, self.v2]
+        Xnode_V2.objects.filter(id__in=[x.id for x in self.expired]).update(
+            validity_until=timezone.now() - timedelta(days=1)
+        )
+        self.valid = self.inode(self.lockers[1])
+
+    def statuses(self):
+        return dict(Xnode_V2.objects.values_list("id", "status"))
+
+    def test_sweeper_closes_expired_xnodes_in_batches(self):
+        batches = []
+
+        def record(sender, xnode_ids, **kwargs):
+            batches.append(xnode_ids)
+
+        xnodes_closed.connect(record)
+        self.addCleanup(xnodes_closed.disconnect, record)
+        closed = close_expired_xnodes(batch_size=2)
+
+        self.assertEqual(sorted(closed), sorted(x.id for x in self.expired))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        statuses = self.statuses()
+        self.assertTrue(all(statuses[x.id] == "closed" for x in self.expired))
+        self.assertNotEqual(statuses[self.valid.id], "closed")
+        self.assertEqual(close_expired_xnodes(batch_size=2), [])
+
+    def test_holders_of_closed_shared_nodes_are_notified(self):
+        close_expired_xnodes()
+        self.assertEqual(
+            sorted(Notification.objects.values_list("host_user", "notification_type", "target_id")),
+            sorted([
+                (self.users[1].user_id, "xnode_closed", str(self.v1.id)),
+                (self.users[2].user_id, "xnode_closed", str(self.v2.id)),
+            ]),
+        )
+
+    def status(self, user):
+        request = APIRequestFactory().post("/")
+        force_authenticate(request, user=user)
+        return xnode_v2_status(request)
+
+    def test_status_closes_only_the_callers_xnodes(self):
+        response = self.status(self.users[1])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'"updated_xnode_ids": [{self.v1.id}]'.encode(), response.content)
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.v1.id], "closed")
+        self.assertNotEqual(statuses[self.v2.id], "closed")
+        self.assertEqual(Notification.objects.get().target_id, str(self.v1.id))
+
+        # Nothing left to close on the next call
+        self.assertIn(b'"updated_xnode_ids": []', self.status(self.users[1]).content)
+
+
+class ConnectionExpiryTests(XnodeChainMixin, TestCase):
+    def setUp(self):
+        # Five expired connections between locker1 and locker2, each carrying a shared node
+        self.inode_node = self.inode(self.lockers[0])
+        self.expired = []
+        for i in range(5):
+            expired = Connection.objects.create(
+                connection_name=f"expired{i}",
+                connection_type=self.connections[0].connection_type,
+                host_user=self.users[0],
+                host_locker=self.lockers[0],
+                guest_user=self.users[1],
+                guest_locker=self.lockers[1],
+                validity_time=timezone.now() - timedelta(days=1, minutes=i),
+            )
+            self.vnode(self.inode_node, self.lockers[1], expired)
+            self.expired.append(expired)
+        self.deletes = mock.patch.object(tasks, "delete_clearing_root_inode", wraps=tasks.delete_clearing_root_inode)
+        self.delete = self.deletes.start()
+        self.addCleanup(self.deletes.stop)
+
+    def remaining(self):
+        return Connection.objects.filter(connection_id__in=[c.connection_id for c in self.expired]).count()
+
+    def test_deletes_in_batches_with_cascades(self):
+        with mock.patch.object(tasks.time, "sleep") as sleep:
+            deleted = check_connections_valid_until(batch_size=2, time_budget=60, pause=0.5)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(self.delete.call_count, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5), mock.call(0.5)])
+        self.assertEqual(self.remaining(), 0)
+        self.assertEqual(Xnode_V2.objects.filter(connection__isnull=False).count(), 0)
+        # connections that have not expired are left alone
+        self.assertEqual(Connection.objects.count(), len(self.connections))
+
+    def test_oldest_first_and_stops_at_the_time_budget(self):
+        deleted = check_connections_valid_until(batch_size=2, time_budget=0, pause=0)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(self.delete.call_count, 1)
+        self.assertEqual(
+            set(Connection.objects.filter(connection_id__in=[c.connection_id for c in self.expired])
+                .values_list("connection_name", flat=True)),
+            {"expired0", "expired1", "expired2"},
+        )
+
+        # the next run picks up the rest
+        self.assertEqual(check_connections_valid_until(batch_size=2, time_budget=60, pause=0), 3)
+        self.assertEqual(self.remaining(), 0)
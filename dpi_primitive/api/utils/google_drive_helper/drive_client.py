@@ -0,0 +1,92 @@
+import functools
+import json
+import threading
+from collections import OrderedDict
+
+import google_auth_httplib2
+import requests
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.http import build_http
+from requests.adapters import HTTPAdapter
+
+# build('drive', 'v3', ...) parses the discovery document and opens a new HTTP
+# connection on every call. Drive services are kept per thread (httplib2 and the
+# generated service objects are not thread safe) and keyed by access token, so
+# repeated calls for the same user reuse both the parsed API and the connection.
+# Plain HTTP calls to Drive (stream_resource) share one pooled requests.Session.
+
+DRIVE_SERVICE_POOL_SIZE = 32  # services kept per thread
+DRIVE_HTTP_POOL_SIZE = 20  # keep-alive connections per host for the shared session
+
+_local = threading.local()
+_session = None
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _drive_discovery_document():
+    # Static copy shipped with google-api-python-client, None if it is missing
+    document = discovery_cache.get_static_doc("drive", "v3")
+    return json.loads(document) if document else None
+
+
+def _thread_http():
+    # One keep-alive connection per thread, shared by all of its services
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _local.http = build_http()
+    return http
+
+
+def _thread_services():
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = OrderedDict()
+    return services
+
+
+def get_drive_service(access_token):
+    """Drive v3 service for access_token, reused by the calling thread."""
+    services = _thread_services()
+    service = services.get(access_token)
+    if service is not None:
+        services.move_to_end(access_token)
+        return service
+
+    creds = Credentials(token=access_token)
+    document = _drive_discovery_document()
+    if document is None:
+        service = build("drive", "v3", credentials=creds)
+    else:
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=_thread_http())
+        service = build_from_document(document, http=http)
+
+    services[access_token] = service
+    while len(services) > DRIVE_SERVICE_POOL_SIZE:
+        services.popitem(last=False)
+    return service
+
+
+def forget_drive_services():
+    # Drops the calling thread's services and connection
+    _local.services = OrderedDict()
+    http = getattr(_local, "http", None)
+    if http is not None:
+        http.close()
+        _local.http = None
+
+
+def get_drive_http_session():
+    """Process wide requests.Session with a keep-alive pool for Drive downloads."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.max_redirects = 3
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DRIVE_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
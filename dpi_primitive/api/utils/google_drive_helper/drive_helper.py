@@ -1,31 +1,23 @@
 from django.utils import timezone
-from datetime import timedelta
 from api.model.xnode_model import Xnode_V2
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from datetime import timedelta
 from django.utils import timezone
-from allauth.socialaccount.models import SocialApp
 from api.models import GoogleAuthToken
-import requests
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+from api.utils.google_drive_helper.token_broker import google_token_broker
+from api.utils.google_drive_helper.drive_client import get_drive_service
 from allauth.socialaccount.models import SocialToken
 
 from django.http import  Http404, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseServerError
 from googleapiclient.errors import HttpError
 import io
 import tempfile
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload, MediaUpload
 import json
 import os
 import tempfile
-from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials as GoogleCredentials
-from google.oauth2.credentials import Credentials
 from django.db import transaction
 
 
@@ -39,8 +31,7 @@ def add_drive_permission(owner_token, file_id, target_email, role="reader"):
     target_email: The email to share with (string)
     role: "reader" (view only) or "writer" (edit)
     """
-    creds = Credentials(token=owner_token)
-    service = build('drive', 'v3', credentials=creds)
+    service = get_drive_service(owner_token)
     permission = {
         'type': 'user',
         'role': role,
@@ -69,8 +60,7 @@ def make_drive_file_public(owner_user, file_id):
     if not owner_token:
         raise Exception("Could not obtain a valid Google token for the file owner.")
 
-    creds = Credentials(token=owner_token)
-    service = build('drive', 'v3', credentials=creds)
+    service = get_drive_service(owner_token)
 
     # Check if permission already exists
     try:
@@ -118,51 +108,10 @@ def get_google_token(user):
 def get_or_refresh_google_token(user):
     """
     Returns a valid Google access token for a given user.
-    If expired, it refreshes the token and updates the DB.
+    Served from the token broker cache; refreshed (and saved to the DB) shortly
+    before it expires, by one caller per user.
     """
-    now = timezone.now()
-    try:
-        token_obj = GoogleAuthToken.objects.get(user=user)
-    except GoogleAuthToken.DoesNotExist:
-        print("No GoogleAuthToken found for user:", user.email)
-        return None
-
-    #  If token is still valid
-    if token_obj.expires_at and token_obj.expires_at > now:
-        return token_obj.access_token
-
-    #  No refresh token
-    if not token_obj.refresh_token:
-        print("No refresh token found. Re-authentication required.")
-        return None
-
-    #  Refresh the token
-    try:
-        social_app = SocialApp.objects.get(provider='google')
-    except SocialApp.DoesNotExist:
-        print("Google OAuth app not configured in admin.")
-        return None
-
-    refresh_response = requests.post(
-        'https://oauth2.googleapis.com/token',
-        data={
-            'client_id': social_app.client_id,
-            'client_secret': social_app.secret,
-            'refresh_token': token_obj.refresh_token,
-            'grant_type': 'refresh_token',
-        }
-    )
-
-    if refresh_response.status_code != 200:
-        print("Failed to refresh token:", refresh_response.json())
-        return None
-
-    new_tokens = refresh_response.json()
-    token_obj.access_token = new_tokens['access_token']
-    token_obj.expires_at = now + timedelta(seconds=new_tokens.get('expires_in', 3600))
-    token_obj.save()
-
-    return token_obj.access_token
+    return google_token_broker.get_token(user)
 
 #function to check if user has access to a drive file
 def user_has_drive_access(owner_user, file_id, requester_email, requester_user):
@@ -186,8 +135,7 @@ def user_has_drive_access(owner_user, file_id, requester_email, requester_user):
     requester_token = get_or_refresh_google_token(requester_user)
     if requester_token:
         try:
-            creds = Credentials(token=requester_token)
-            drive_service = build('drive', 'v3', credentials=creds)
+            drive_service = get_drive_service(requester_token)
 
             drive_service.files().get(
                 fileId=file_id,
@@ -213,8 +161,7 @@ def user_has_drive_access(owner_user, file_id, requester_email, requester_user):
         return False, "Error fetching valid owner token — access restricted."
 
     try:
-        creds = Credentials(token=owner_token)
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = get_drive_service(owner_token)
 
         drive_service.files().get(
             fileId=file_id,
@@ -289,7 +236,88 @@ def delete_drive_file(drive_service, file_id):
 
 def get_file_metadata(drive_service, file_id):
     """Fetches minimal metadata of a Drive file."""
-    return drive_service.files().get(fileId=file_id, fields="id, name, mimeType, owners").execute()
+    return drive_service.files().get(fileId=file_id, fields="id, name, mimeType, owners, size").execute()
+
+# Chunk size of the streaming copy; the upload side needs a multiple of 256 KB.
+# At most about two chunks are held in memory per transfer.
+DRIVE_STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class DriveDownloadUpload(MediaUpload):
+    """
+    Media body for a resumable upload that is fed by a MediaIoBaseDownload of
+    another Drive file, so the bytes never touch local disk.
+    """
+
+    def __init__(self, drive_service, file_id, size, mimetype=None, chunksize=DRIVE_STREAM_CHUNK_SIZE):
+        self._size = int(size)
+        self._mimetype = mimetype or "application/octet-stream"
+        self._chunksize = chunksize
+        self._sink = io.BytesIO()
+        self._downloader = MediaIoBaseDownload(
+            self._sink, drive_service.files().get_media(fileId=file_id), chunksize=chunksize
+        )
+        self._done = self._size == 0
+        self._offset = 0  # file offset of the first byte in self._pending
+        self._pending = bytearray()
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        # The upload only moves forward, bytes before `begin` are confirmed by Drive
+        if begin < self._offset:
+            raise ValueError(f"Byte {begin} is no longer buffered (buffer starts at {self._offset})")
+        del self._pending[:begin - self._offset]
+        self._offset = begin
+        length = max(0, min(length, self._size - begin))
+
+        while len(self._pending) < length and not self._done:
+            status, self._done = self._downloader.next_chunk()
+            self._pending += self._sink.getvalue()
+            self._sink.seek(0)
+            self._sink.truncate()
+            if status:
+                print(f"Stream progress: {int(status.progress() * 100)}%")
+        return bytes(self._pending[:length])
+
+
+def stream_drive_file(sender_drive, receiver_drive, file_id, dest_folder_id, name, size, mimetype=None):
+    """Copies a file between two Drive accounts chunk by chunk (download piped into a resumable upload)."""
+    metadata = {"name": name}
+    if dest_folder_id:
+        metadata["parents"] = [dest_folder_id]
+    media = DriveDownloadUpload(sender_drive, file_id, size, mimetype)
+    return receiver_drive.files().create(body=metadata, media_body=media, fields="id, mimeType").execute()
+
+
+def copy_drive_file_server_side(receiver_drive, file_id, dest_folder_id, name):
+    """
+    Uses files.copy as the receiver, no bytes pass through this server.
+    Returns None when the receiver cannot see the file.
+    """
+    body = {"name": name}
+    if dest_folder_id:
+        body["parents"] = [dest_folder_id]
+    try:
+        return receiver_drive.files().copy(fileId=file_id, body=body, fields="id, mimeType").execute()
+    except HttpError as e:
+        if e.resp.status in (403, 404):
+            print(f"Receiver cannot copy {file_id} directly ({e.resp.status}), streaming instead")
+            return None
+        raise
 
 #for transfer and collateral helpers
 
@@ -300,8 +328,7 @@ TEMP_DIR = tempfile.gettempdir()
 
 # Helper: build drive service from access token
 def get_drive_service_from_token(access_token):
-    creds = Credentials(token=access_token)
-    return build("drive", "v3", credentials=creds)
+    return get_drive_service(access_token)
 
 
 
@@ -342,44 +369,51 @@ def _drive_copy_return_new_file_id(resource_obj, sender_user, receiver_user, rec
     print("File:", name)
     print("MIME:", mimetype)
 
-    # --------------------------------
-    # Temp file
-    # --------------------------------
-    ext = os.path.splitext(name)[1]
-    temp_path = os.path.join(
-        TEMP_DIR,
-        f"transfer_{resource_obj.resource_id}_{int(timezone.now().timestamp())}{ext}"
-    )
-    print("Temp path:", temp_path)
+    # Resolve destination folder
+    dest_folder_id = None
+    if hasattr(receiver_locker, "drive_folder_id"):
+        dest_folder_id = receiver_locker.drive_folder_id
+    elif hasattr(receiver_locker, "drive_folder"):
+        dest_folder_id = receiver_locker.drive_folder
+    elif hasattr(receiver_locker, "folder_id"):
+        dest_folder_id = receiver_locker.folder_id
+    elif hasattr(receiver_locker, "node_information"):
+        dest_folder_id = receiver_locker.node_information.get("drive_folder_id")
+
+    print("Upload destination:", dest_folder_id or "ROOT")
 
+    temp_path = None
     try:
-        # Download
-        print("Downloading...")
-        download_file_to_temp(sender_drive, old_file_id, temp_path)
-        print("Download done")
-
-        # Resolve destination folder
-        dest_folder_id = None
-        if hasattr(receiver_locker, "drive_folder_id"):
-            dest_folder_id = receiver_locker.drive_folder_id
-        elif hasattr(receiver_locker, "drive_folder"):
-            dest_folder_id = receiver_locker.drive_folder
-        elif hasattr(receiver_locker, "folder_id"):
-            dest_folder_id = receiver_locker.folder_id
-        elif hasattr(receiver_locker, "node_information"):
-            dest_folder_id = receiver_locker.node_information.get("drive_folder_id")
-
-        print("Upload destination:", dest_folder_id or "ROOT")
-
-        # Upload
-        print("Uploading...")
-        upload_resp = upload_file_from_temp(
-            receiver_drive,
-            dest_folder_id,
-            temp_path,
-            name,
-            mimetype
-        )
+        # Server side copy when the receiver can already see the file
+        upload_resp = copy_drive_file_server_side(receiver_drive, old_file_id, dest_folder_id, name)
+
+        if upload_resp is None and meta.get("size") is not None:
+            print("Streaming...")
+            upload_resp = stream_drive_file(
+                sender_drive,
+                receiver_drive,
+                old_file_id,
+                dest_folder_id,
+                name,
+                meta.get("size"),
+                mimetype
+            )
+        elif upload_resp is None:
+            # No size reported: stage through a temp file as before
+            ext = os.path.splitext(name)[1]
+            temp_path = os.path.join(
+                TEMP_DIR,
+                f"transfer_{resource_obj.resource_id}_{int(timezone.now().timestamp())}{ext}"
+            )
+            print("Temp path:", temp_path)
+            download_file_to_temp(sender_drive, old_file_id, temp_path)
+            upload_resp = upload_file_from_temp(
+                receiver_drive,
+                dest_folder_id,
+                temp_path,
+                name,
+                mimetype
+            )
         print("Upload response:", upload_resp)
 
         new_file_id = upload_resp.get("id")
@@ -406,7 +440,7 @@ def _drive_copy_return_new_file_id(resource_obj, sender_user, receiver_user, rec
         raise
 
     finally:
-        if os.path.exists(temp_path):
+        if temp_path and os.path.exists(temp_path):
             try:
                 os.remove(temp_path)
                 print("Temp file removed")
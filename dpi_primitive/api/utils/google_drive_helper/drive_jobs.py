@@ -0,0 +1,147 @@
+import json
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import DriveJob
+
+# DB backed queue for the Drive copy/transfer work of the approve endpoints.
+# The endpoint stores its request body as a DriveJob and returns the job id,
+# `manage.py run_drive_jobs` picks jobs up and runs the original handler.
+
+DRIVE_JOB_HANDLERS = {
+    DriveJob.Kind.TRANSFER: "api.sharing.views.transfer_approve.run_transfer_resource",
+    DriveJob.Kind.TRANSFER_REVERSE: "api.sharing.views.transfer_approve.run_transfer_resource_reverse",
+    DriveJob.Kind.COLLATERAL: "api.sharing.views.collateral_approve.run_collateral_resource",
+    DriveJob.Kind.COLLATERAL_REVERSE: "api.sharing.views.collateral_approve.run_collateral_resource_reverse",
+}
+
+# Running jobs older than this are assumed lost with their worker
+DRIVE_JOB_STALE_AFTER = timedelta(hours=2)
+
+
+def drive_jobs_async():
+    # DRIVE_JOBS_ASYNC = True queues jobs for `manage.py run_drive_jobs`, otherwise they run inside the request
+    return getattr(settings, "DRIVE_JOBS_ASYNC", False)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def serialize_drive_job(job):
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "status_code": job.status_code,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def enqueue_drive_job(kind, payload, requested_by=None):
+    job = DriveJob.objects.create(kind=kind, payload=payload, requested_by=requested_by)
+    print(f"Queued drive job {job.job_id} ({kind})")
+    if not drive_jobs_async():
+        run_drive_job(job, worker="inline")
+    return job
+
+
+def enqueue_drive_job_from_request(request, kind, required_fields):
+    """
+    Validates the approve request body and queues it. Returns 202 with the job id,
+    or the handler's own response when the job ran inside the request.
+    """
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "error": "Invalid JSON format"}, status=400)
+    if not isinstance(body, dict) or not all(body.get(field) for field in required_fields):
+        return JsonResponse({"success": False, "error": "All fields are required"}, status=400)
+
+    user = getattr(request, "user", None)
+    user = user if getattr(user, "is_authenticated", False) else None
+    job = enqueue_drive_job(kind, body, requested_by=user)
+    if job.status != DriveJob.Status.QUEUED:
+        if job.status_code is None:
+            return JsonResponse({"success": False, "error": job.error, "job_id": job.job_id}, status=500)
+        return JsonResponse({**job.result, "job_id": job.job_id}, status=job.status_code)
+    return JsonResponse(
+        {
+            "success": True,
+            "message": "Drive job queued",
+            "job_id": job.job_id,
+            "status": job.status,
+        },
+        status=202,
+    )
+
+
+def claim_next_drive_job(worker):
+    """Atomically marks the oldest queued job as running and returns it (None if the queue is empty)."""
+    with transaction.atomic():
+        job = (
+            DriveJob.objects.select_for_update(skip_locked=True)
+            .filter(status=DriveJob.Status.QUEUED)
+            .order_by("created_at", "job_id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = DriveJob.Status.RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "worker", "attempts", "started_at"])
+    return job
+
+
+def run_drive_job(job, worker=None):
+    """Runs a job's handler and stores the JSON response it returned."""
+    if job.status != DriveJob.Status.RUNNING:
+        job.status = DriveJob.Status.RUNNING
+        job.worker = worker or default_worker_id()
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "worker", "attempts", "started_at"])
+
+    try:
+        handler = import_string(DRIVE_JOB_HANDLERS[job.kind])
+        response = handler(job.payload)
+        job.status_code = response.status_code
+        job.result = json.loads(response.content or b"{}")
+        job.status = DriveJob.Status.SUCCEEDED if response.status_code < 400 else DriveJob.Status.FAILED
+        job.error = None if response.status_code < 400 else job.result.get("error")
+    except Exception as e:
+        traceback.print_exc()
+        job.status = DriveJob.Status.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "status_code", "result", "error", "finished_at"])
+    print(f"Drive job {job.job_id} {job.status} in {(job.finished_at - job.started_at).total_seconds():.1f}s")
+    return job
+
+
+def fail_stale_drive_jobs(stale_after=DRIVE_JOB_STALE_AFTER):
+    # Drive copies are not idempotent (the original is deleted), so lost jobs are
+    # failed rather than retried
+    return DriveJob.objects.filter(
+        status=DriveJob.Status.RUNNING,
+        started_at__lt=timezone.now() - stale_after,
+    ).update(
+        status=DriveJob.Status.FAILED,
+        error="Worker stopped before the job finished",
+        finished_at=timezone.now(),
+    )
@@ -0,0 +1,582 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from api.utils.google_drive_helper.drive_client import get_drive_http_session
+
+# Disk cache of Drive file content for stream_resource. Files are split into
+# fixed size chunks stored under <dir>/<file>/<version>/<index>, where version
+# comes from the Drive revision and modifiedTime, so an edited file is never
+# served from old chunks. Ranges are served from the cached chunks and missing
+# chunks are fetched from Drive (one ranged request per run of missing chunks)
+# while they are streamed, then written to the cache. The chunks after a
+# served range are prefetched in the background. Least recently used chunks
+# (by file mtime) are evicted once the cache grows past its size cap.
+# Google-native files are exported once per version into DriveExportCache.
+
+DRIVE_STREAM_CHUNK = 1024 * 1024
+DRIVE_STREAM_READAHEAD = 2  # chunks prefetched after each served range
+DRIVE_STREAM_METADATA_TTL = 60  # seconds a file's size/version is trusted
+DRIVE_STREAM_EVICT_TO = 0.9  # evict down to this fraction of the cap
+
+DRIVE_FILE_URL = "https://www.googleapis.com/drive/v3/files/{file_id}"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header, size):
+    """
+    (start, end) of a single byte range, None for no/ignored Range headers
+    (multiple ranges are served as a full response) and False if it cannot
+    be satisfied.
+    """
+    if not range_header:
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class DriveChunkCache:
+    def __init__(self, directory, max_bytes, chunk_size=DRIVE_STREAM_CHUNK):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._approx_bytes = None  # unknown until the first scan
+        self.counters = {"hits": 0, "misses": 0, "evicted": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, approx_bytes=self._approx_bytes, max_bytes=self.max_bytes)
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    def _file_dir(self, file_id):
+        digest = self._digest(file_id)
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _version_dir(self, file_id, version):
+        return os.path.join(self._file_dir(file_id), self._digest(version)[:16])
+
+    def chunk_path(self, file_id, version, index):
+        return os.path.join(self._version_dir(file_id, version), str(index))
+
+    def has_chunk(self, file_id, version, index):
+        return os.path.exists(self.chunk_path(file_id, version, index))
+
+    def read_chunk(self, file_id, version, index):
+        path = self.chunk_path(file_id, version, index)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # LRU order is the file mtime
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return data
+
+    def write_chunk(self, file_id, version, index, data):
+        version_dir = self._version_dir(file_id, version)
+        if not os.path.isdir(version_dir):
+            self._drop_other_versions(file_id, version_dir)
+            os.makedirs(version_dir, exist_ok=True)
+        path = os.path.join(version_dir, str(index))
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("Could not write stream cache chunk:", e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._grew(len(data))
+
+    def _drop_other_versions(self, file_id, keep_dir):
+        file_dir = self._file_dir(file_id)
+        if not os.path.isdir(file_dir):
+            return
+        for name in os.listdir(file_dir):
+            path = os.path.join(file_dir, name)
+            if path != keep_dir:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _grew(self, nbytes):
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += nbytes
+            needs_scan = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if needs_scan:
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used chunks until the cache is under its cap."""
+        if not self._evict_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = []
+            total = 0
+            for root, _dirs, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            removed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * DRIVE_STREAM_EVICT_TO
+                entries.sort()
+                for _mtime, nbytes, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= nbytes
+                    removed += 1
+            with self._lock:
+                self._approx_bytes = total
+            if removed:
+                self._count("evicted", removed)
+            return removed
+        finally:
+            self._evict_lock.release()
+
+    def fetch_chunks(self, file_id, version, size, token, first, last):
+        """
+        Downloads chunks first..last with one ranged request and yields
+        (index, bytes) for each, caching them as they complete.
+        """
+        begin = first * self.chunk_size
+        end = min((last + 1) * self.chunk_size, size) - 1
+        resp = get_drive_http_session().get(
+            DRIVE_FILE_URL.format(file_id=file_id),
+            params={"alt": "media"},
+            headers={"Authorization": f"Bearer {token}", "Range": f"bytes={begin}-{end}"},
+            stream=True,
+            timeout=60,
+        )
+        try:
+            if resp.status_code == 200:
+                skip = begin  # Range was ignored, the body starts at byte 0
+            elif resp.status_code == 206:
+                skip = 0
+            else:
+                raise IOError(f"Drive returned {resp.status_code} for a ranged read of {file_id}")
+
+            index = first
+            buffer = bytearray()
+            for piece in resp.iter_content(chunk_size=64 * 1024):
+                if skip:
+                    dropped = min(skip, len(piece))
+                    piece = piece[dropped:]
+                    skip -= dropped
+                buffer += piece
+                while len(buffer) >= self.chunk_size and index <= last:
+                    data = bytes(buffer[:self.chunk_size])
+                    del buffer[:self.chunk_size]
+                    self.write_chunk(file_id, version, index, data)
+                    yield index, data
+                    index += 1
+                if index > last:
+                    break
+            # The file's last chunk is shorter than chunk_size
+            tail = size - index * self.chunk_size
+            if index <= last and 0 < tail <= len(buffer):
+                data = bytes(buffer[:tail])
+                self.write_chunk(file_id, version, index, data)
+                yield index, data
+                index += 1
+            if index <= last:
+                raise IOError(f"Drive response for {file_id} ended early")
+        finally:
+            resp.close()
+
+    def iter_range(self, file_id, version, size, token, start, end):
+        """Yields the bytes start..end (inclusive), from disk where cached."""
+        first = start // self.chunk_size
+        last = end // self.chunk_size
+        index = first
+        while index <= last:
+            data = self.read_chunk(file_id, version, index)
+            if data is not None:
+                yield self._slice(data, index, start, end)
+                index += 1
+                continue
+
+            run_end = index
+            while run_end < last and not self.has_chunk(file_id, version, run_end + 1):
+                run_end += 1
+            for fetched, data in self.fetch_chunks(file_id, version, size, token, index, run_end):
+                yield self._slice(data, fetched, start, end)
+            index = run_end + 1
+
+        prefetch_chunks(self, file_id, version, size, token, last + 1, last + DRIVE_STREAM_READAHEAD)
+
+    def _slice(self, data, index, start, end):
+        offset = index * self.chunk_size
+        lo = max(start - offset, 0)
+        hi = min(end - offset + 1, len(data))
+        return data[lo:hi] if lo or hi < len(data) else data
+
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="drive-prefetch")
+_prefetching = set()
+_prefetching_lock = threading.Lock()
+
+
+def _prefetch(chunk_cache, file_id, version, size, token, first, last):
+    try:
+        for _ in chunk_cache.fetch_chunks(file_id, version, size, token, first, last):
+            pass
+    except Exception as e:
+        print("Stream cache prefetch failed:", e)
+    finally:
+        with _prefetching_lock:
+            _prefetching.discard((file_id, version, first))
+
+
+def prefetch_chunks(chunk_cache, file_id, version, size, token, first, last):
+    # Fills the missing chunks first..last in the background
+    last = min(last, (size - 1) // chunk_cache.chunk_size)
+    while first <= last and chunk_cache.has_chunk(file_id, version, first):
+        first += 1
+    if first > last:
+        return
+    key = (file_id, version, first)
+    with _prefetching_lock:
+        if key in _prefetching:
+            return
+        _prefetching.add(key)
+    _prefetch_pool.submit(_prefetch, chunk_cache, file_id, version, size, token, first, last)
+
+
+drive_stream_cache = DriveChunkCache(
+    getattr(settings, "DRIVE_STREAM_CACHE_DIR", None),
+    getattr(settings, "DRIVE_STREAM_CACHE_MAX_BYTES", 0),
+)
+
+
+def get_drive_file_metadata(file_id, token):
+    """{"size", "version", "modified_time"} of a Drive file (size is None for Google-native files), None if it cannot be read."""
+    key = f"drive_stream_meta:{file_id}"
+    meta = cache.get(key)
+    if meta:
+        return meta
+    try:
+        resp = get_drive_http_session().get(
+            DRIVE_FILE_URL.format(file_id=file_id),
+            params={"fields": "size,version,modifiedTime", "supportsAllDrives": "true"},
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=15,
+        )
+    except Exception as e:
+        print("Could not read Drive metadata:", e)
+        return None
+    if resp.status_code != 200:
+        return None
+    data = resp.json()
+    meta = {
+        "size": int(data["size"]) if data.get("size") else None,
+        "version": f"{data.get('version', '')}:{data.get('modifiedTime', '')}",
+        "modified_time": data.get("modifiedTime"),
+    }
+    cache.set(key, meta, DRIVE_STREAM_METADATA_TTL)
+    return meta
+
+
+def _range_response(request, size, iter_range, content_type, filename, modified_time):
+    # 200/206/416 response for a local copy of size bytes; iter_range(start, end) yields the bytes
+    byte_range = parse_range_header(request.META.get("HTTP_RANGE"), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        iter_range(start, end),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    modified = parse_datetime(modified_time or "")
+    if modified:
+        response["Last-Modified"] = http_date(modified.timestamp())
+    return response
+
+
+def cached_drive_response(request, file_id, token, content_type, filename):
+    """
+    Serves a (range of a) binary Drive file through drive_stream_cache.
+    Returns None when the cache cannot be used, the caller then proxies Drive.
+    """
+    if not drive_stream_cache.enabled or not token:
+        return None
+    meta = get_drive_file_metadata(file_id, token)
+    if meta is None or not meta["size"]:
+        return None
+    size = meta["size"]
+
+    def iter_range(start, end):
+        return drive_stream_cache.iter_range(file_id, meta["version"], size, token, start, end)
+
+    return _range_response(request, size, iter_range, content_type, filename, meta["modified_time"])
+
+
+class DriveExportCache:
+    """
+    Exported copies of Google-native files (Docs, Sheets, Slides, Drawings),
+    keyed by file id, export mime type and the source's modifiedTime. The
+    export endpoint ignores Range, so a document is exported once and its
+    ranges are served from the local copy. Copies not read for max_age
+    seconds are removed, then the least recently used ones past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._export_locks = {}
+        self.counters = {"hits": 0, "exports": 0, "evicted": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, max_bytes=self.max_bytes, max_age=self.max_age)
+
+    def artifact_path(self, file_id, export_mime, version):
+        file_digest = DriveChunkCache._digest(file_id)
+        version_digest = DriveChunkCache._digest(f"{export_mime}:{version}")[:16]
+        return os.path.join(self.directory, file_digest[:2], file_digest, version_digest)
+
+    def _export_lock(self, path):
+        with self._lock:
+            return self._export_locks.setdefault(path, threading.Lock())
+
+    def get(self, file_id, export_mime, version, token):
+        """Path of the exported copy, exporting it first if needed (None if Drive refuses)."""
+        path = self.artifact_path(file_id, export_mime, version)
+        if self._touch(path):
+            self._count("hits")
+            return path
+
+        # One export per document at a time, the others wait for its result
+        lock = self._export_lock(path)
+        with lock:
+            if self._touch(path):
+                self._count("hits")
+                return path
+            try:
+                exported = self._export(file_id, export_mime, token, path)
+            finally:
+                with self._lock:
+                    self._export_locks.pop(path, None)
+        if exported:
+            self.evict()
+        return path if exported else None
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)  # LRU order is the file mtime
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _export(self, file_id, export_mime, token, path):
+        resp = get_drive_http_session().get(
+            f"{DRIVE_FILE_URL.format(file_id=file_id)}/export",
+            params={"mimeType": export_mime},
+            headers={"Authorization": f"Bearer {token}"},
+            stream=True,
+            timeout=60,
+        )
+        try:
+            if resp.status_code != 200:
+                print(f"Drive export of {file_id} returned {resp.status_code}")
+                return False
+
+            file_dir = os.path.dirname(path)
+            if os.path.isdir(file_dir):
+                # Older versions / export types of this document are not needed any more
+                for name in os.listdir(file_dir):
+                    if not name.endswith(".tmp"):
+                        os.remove(os.path.join(file_dir, name))
+            os.makedirs(file_dir, exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    for piece in resp.iter_content(chunk_size=64 * 1024):
+                        f.write(piece)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        finally:
+            resp.close()
+        self._count("exports")
+        return True
+
+    def evict(self):
+        """Removes copies older than max_age, then the least recently used ones past max_bytes."""
+        if not self._evict_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = []
+            total = 0
+            removed = 0
+            expired_before = time.time() - self.max_age if self.max_age else None
+            for root, _dirs, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if name.endswith(".tmp"):
+                        continue
+                    if expired_before is not None and st.st_mtime < expired_before:
+                        try:
+                            os.remove(path)
+                            removed += 1
+                        except FileNotFoundError:
+                            pass
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            if total > self.max_bytes:
+                target = self.max_bytes * DRIVE_STREAM_EVICT_TO
+                entries.sort()
+                for _mtime, nbytes, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= nbytes
+                    removed += 1
+            if removed:
+                self._count("evicted", removed)
+            return removed
+        finally:
+            self._evict_lock.release()
+
+
+drive_export_cache = DriveExportCache(
+    getattr(settings, "DRIVE_EXPORT_CACHE_DIR", None),
+    getattr(settings, "DRIVE_EXPORT_CACHE_MAX_BYTES", 0),
+    getattr(settings, "DRIVE_EXPORT_CACHE_MAX_AGE", 24 * 60 * 60),
+)
+
+
+def _iter_file_range(handle, start, end, chunk_size=64 * 1024):
+    try:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = handle.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        handle.close()
+
+
+def cached_export_response(request, file_id, token, export_mime, filename):
+    """
+    Serves a (range of a) Google-native file's export through drive_export_cache.
+    Returns None when the cache cannot be used, the caller then proxies the export.
+    """
+    if not drive_export_cache.enabled or not token:
+        return None
+    meta = get_drive_file_metadata(file_id, token)
+    if meta is None or not meta["modified_time"]:
+        return None
+    try:
+        path = drive_export_cache.get(file_id, export_mime, meta["version"], token)
+    except Exception as e:
+        print("Export cache failed:", e)
+        return None
+    if path is None:
+        return None
+
+    # Opened here so an eviction before the body is sent cannot break the response
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    size = os.fstat(handle.fileno()).st_size
+    if size == 0:
+        handle.close()
+        return None
+
+    def iter_range(start, end):
+        return _iter_file_range(handle, start, end)
+
+    response = _range_response(request, size, iter_range, export_mime, filename, meta["modified_time"])
+    if response.status_code == 416:
+        handle.close()
+    return response
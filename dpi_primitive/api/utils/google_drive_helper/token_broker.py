@@ -0,0 +1,199 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from allauth.socialaccount.models import SocialApp
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.models import GoogleAuthToken
+
+# Google access tokens are read on every stream/range request, so they are kept
+# in process memory and in the Django cache, and refreshed shortly before they
+# expire by a single caller per user (other callers keep the still valid token
+# or wait for the refresh instead of each calling Google).
+
+GOOGLE_TOKEN_REFRESH_MARGIN = timedelta(minutes=5)  # refresh this long before expires_at
+GOOGLE_TOKEN_MEMORY_TTL = 60  # seconds an in-process entry is trusted before re-reading the shared cache
+GOOGLE_TOKEN_LOCK_TIMEOUT = 30  # seconds a refresh lock is held at most
+GOOGLE_TOKEN_WAIT_TIMEOUT = 10  # seconds to wait for another process's refresh
+GOOGLE_TOKEN_MEMORY_MAX_USERS = 1000  # in-process entries kept, least recently used dropped first
+
+
+class GoogleTokenBroker:
+    def __init__(self):
+        self._memory = OrderedDict()  # user_id -> (access_token, expires_at, stored_at)
+        self._lock = threading.Lock()
+        # A user's lock lives only while a thread holds or waits on it
+        self._user_locks = weakref.WeakValueDictionary()
+        self.counters = {
+            "hits": 0,  # served from process memory
+            "cache_hits": 0,  # served from the Django cache
+            "misses": 0,  # GoogleAuthToken read from the DB
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "waits": 0,  # waited for another process's refresh
+        }
+
+    @staticmethod
+    def _cache_key(user_id):
+        return f"google_token:{user_id}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, cached_users=len(self._memory))
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    @staticmethod
+    def _is_fresh(expires_at, now):
+        return expires_at is not None and expires_at - GOOGLE_TOKEN_REFRESH_MARGIN > now
+
+    def _store(self, user_id, access_token, expires_at):
+        with self._lock:
+            self._memory[user_id] = (access_token, expires_at, time.monotonic())
+            self._memory.move_to_end(user_id)
+            while len(self._memory) > GOOGLE_TOKEN_MEMORY_MAX_USERS:
+                self._memory.popitem(last=False)
+
+    def _remember(self, user_id, access_token, expires_at):
+        ttl = int((expires_at - timezone.now()).total_seconds()) if expires_at else 0
+        if ttl <= 0:
+            return
+        self._store(user_id, access_token, expires_at)
+        cache.set(self._cache_key(user_id), {"access_token": access_token, "expires_at": expires_at}, ttl)
+
+    def _lookup(self, user_id, now):
+        with self._lock:
+            entry = self._memory.get(user_id)
+        if entry and self._is_fresh(entry[1], now) and time.monotonic() - entry[2] < GOOGLE_TOKEN_MEMORY_TTL:
+            self._count("hits")
+            with self._lock:
+                if user_id in self._memory:
+                    self._memory.move_to_end(user_id)
+            return entry[0]
+
+        cached = cache.get(self._cache_key(user_id))
+        if cached and self._is_fresh(cached["expires_at"], now):
+            self._count("cache_hits")
+            self._store(user_id, cached["access_token"], cached["expires_at"])
+            return cached["access_token"]
+        return None
+
+    def forget(self, user_id):
+        with self._lock:
+            self._memory.pop(user_id, None)
+        cache.delete(self._cache_key(user_id))
+
+    def get_token(self, user):
+        """Valid access token for user, or None if there is none and it cannot be refreshed."""
+        user_id = user.pk
+        token = self._lookup(user_id, timezone.now())
+        if token:
+            return token
+
+        # Only one thread per user goes past here at a time
+        with self._user_lock(user_id):
+            now = timezone.now()
+            token = self._lookup(user_id, now)
+            if token:
+                return token
+
+            self._count("misses")
+            try:
+                token_obj = GoogleAuthToken.objects.get(user=user)
+            except GoogleAuthToken.DoesNotExist:
+                print("No GoogleAuthToken found for user:", user.email)
+                return None
+
+            still_valid = token_obj.expires_at is not None and token_obj.expires_at > now
+            if self._is_fresh(token_obj.expires_at, now):
+                self._remember(user_id, token_obj.access_token, token_obj.expires_at)
+                return token_obj.access_token
+
+            if not token_obj.refresh_token:
+                print("No refresh token found. Re-authentication required.")
+                return token_obj.access_token if still_valid else None
+
+            # Only one process per user refreshes at a time; the lock is only
+            # released by the process that added it
+            lock_key = f"{self._cache_key(user_id)}:refreshing"
+            if not cache.add(lock_key, True, GOOGLE_TOKEN_LOCK_TIMEOUT):
+                if still_valid:
+                    return token_obj.access_token
+                token = self._wait_for_refresh(user_id)
+                if token:
+                    return token
+                # The other refresh failed or is still running; take over only
+                # if its lock is gone by now
+                if not cache.add(lock_key, True, GOOGLE_TOKEN_LOCK_TIMEOUT):
+                    print("Token refresh still running in another process; giving up.")
+                    return None
+            try:
+                return self._refresh(token_obj, still_valid)
+            finally:
+                cache.delete(lock_key)
+
+    def _wait_for_refresh(self, user_id):
+        self._count("waits")
+        deadline = time.monotonic() + GOOGLE_TOKEN_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            cached = cache.get(self._cache_key(user_id))
+            if cached and cached["expires_at"] > timezone.now():
+                return cached["access_token"]
+        return None
+
+    def _refresh(self, token_obj, still_valid):
+        try:
+            social_app = SocialApp.objects.get(provider='google')
+        except SocialApp.DoesNotExist:
+            print("Google OAuth app not configured in admin.")
+            return token_obj.access_token if still_valid else None
+
+        self._count("refreshes")
+        now = timezone.now()
+        try:
+            refresh_response = requests.post(
+                'https://oauth2.googleapis.com/token',
+                data={
+                    'client_id': social_app.client_id,
+                    'client_secret': social_app.secret,
+                    'refresh_token': token_obj.refresh_token,
+                    'grant_type': 'refresh_token',
+                },
+                timeout=15,
+            )
+        except requests.RequestException as e:
+            print("Failed to refresh token:", e)
+            refresh_response = None
+
+        if refresh_response is None or refresh_response.status_code != 200:
+            self._count("refresh_failures")
+            if refresh_response is not None:
+                print("Failed to refresh token:", refresh_response.text)
+            return token_obj.access_token if still_valid else None
+
+        new_tokens = refresh_response.json()
+        token_obj.access_token = new_tokens['access_token']
+        token_obj.expires_at = now + timedelta(seconds=new_tokens.get('expires_in', 3600))
+        token_obj.save()
+        self._remember(token_obj.user_id, token_obj.access_token, token_obj.expires_at)
+        return token_obj.access_token
+
+
+google_token_broker = GoogleTokenBroker()
+
+
+def google_token_stats():
+    """Counters of this process's broker, served by dashboard/google-token-stats/."""
+    return google_token_broker.stats()
@@ -0,0 +1,44 @@
+import base64
+
+# Keyset pagination shared by the list endpoints (notification feed, locker
+# xnodes). A cursor is the urlsafe base64 of the sort key of the last item of
+# a page, "|"-joined; the next page filters past it, so a page costs the same
+# however deep the client scrolls.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*key):
+    raw = "|".join(value.isoformat() if hasattr(value, "isoformat") else str(value) for value in key)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, *parsers):
+    """The key of cursor, each part converted by its parser (e.g. int, datetime.fromisoformat)."""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(parts) != len(parsers):
+            raise ValueError("wrong number of cursor parts")
+        return tuple(parse(part) for parse, part in zip(parsers, parts))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def keyset_page(queryset, limit, cursor_of):
+    """(items, next_cursor) of the first limit rows of queryset; next_cursor is None on the last page."""
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = cursor_of(items[-1])
+    return items, next_cursor
+
+
+def as_id(value):
+    # Ids kept in JSON (node_information, extra_data) may be stored as strings
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -1,26 +1,300 @@
 
-from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType
+from api.models import Locker, Resource, CustomUser, Connection ,Notification , ConnectionType, ConnectionTermValue
 from api.model.xnode_model import Xnode_V2
+from django.db import connection as db_connection, models, router, transaction
+from django.db.models import Q
+from django.db.models.deletion import Collector
+from api.utils.pagination import as_id
 
 
 
+# Parent pointer of a VNODE/SNODE (None for an INODE)
+def get_parent_xnode_id(xnode: Xnode_V2):
+    if xnode.xnode_Type == Xnode_V2.XnodeType.VNODE:
+        return xnode.node_information.get("link")
+    elif xnode.xnode_Type == Xnode_V2.XnodeType.SNODE:
+        return xnode.node_information.get("inode_or_snode_id")
+    return None
+
+
+# Filter for the children of xnode_ids by their parent pointer key ("link" or
+# "inode_or_snode_id"). On PostgreSQL it is written as containment
+# (node_information @> {key: id}) so that xnode_node_info_gin can serve it.
+def parent_pointer_q(key, xnode_ids):
+    xnode_ids = list(xnode_ids)
+    if db_connection.vendor != "postgresql":
+        return Q(**{f"node_information__{key}__in": xnode_ids})
+    q = Q(pk__in=[])
+    for xnode_id in xnode_ids:
+        q |= Q(node_information__contains={key: xnode_id})
+    return q
+
+
+# Walk the chain hop by hop, returns (inode, depth) or (None, depth) for a broken chain
+def walk_to_inode(xnode: Xnode_V2):
+    depth = 0
+    current = xnode
+    while current.xnode_Type != Xnode_V2.XnodeType.INODE:
+        parent_id = get_parent_xnode_id(current)
+        if parent_id is None:
+            return None, depth
+        current = Xnode_V2.objects.filter(id=parent_id).first()
+        if current is None:
+            return None, depth
+        depth += 1
+    return current, depth
+
+
+# Store root_inode/depth on a freshly created VNODE/SNODE from its parent
+def link_root_inode(xnode: Xnode_V2, parent: Xnode_V2):
+    if parent.xnode_Type == Xnode_V2.XnodeType.INODE:
+        xnode.root_inode_id = parent.id
+        xnode.depth = 1
+    elif parent.root_inode_id is not None:
+        xnode.root_inode_id = parent.root_inode_id
+        xnode.depth = parent.depth + 1
+    else:
+        inode, depth = walk_to_inode(parent)
+        xnode.root_inode_id = inode.id if inode else None
+        xnode.depth = depth + 1
+    xnode.save(update_fields=["root_inode", "depth"])
+
+
+# Call before deleting/revoking VNODEs/SNODEs: the nodes reached through them lose
+# root_inode and fall back to the hop-by-hop walk, which reports the broken chain.
+# A node's vnode_list/snode_list only go down to the next node of the other type,
+# so the lists of the reached nodes are followed too, one query per level.
+# Deleted INODEs need nothing, on_delete=SET_NULL clears root_inode of their descendants.
+def clear_root_inode_through(xnode_ids):
+    seen = {int(xnode_id) for xnode_id in xnode_ids}
+    frontier = set(seen)
+    reached = set()
+    while frontier:
+        found = set()
+        for vnode_list, snode_list in (
+            Xnode_V2.objects.filter(id__in=frontier)
+            .exclude(xnode_Type=Xnode_V2.XnodeType.INODE)
+            .values_list("vnode_list", "snode_list")
+        ):
+            found.update(int(x) for x in (vnode_list or []) + (snode_list or []))
+        frontier = found - seen
+        seen |= frontier
+        reached |= frontier
+    if reached:
+        Xnode_V2.objects.filter(id__in=reached).update(root_inode=None)
+
+
+# objs.delete() for deletes that cascade to xnodes (connections, connection types,
+# lockers): collects the delete once, clears root_inode through every xnode it
+# removes, then deletes. Returns what Model.delete/QuerySet.delete return.
+def delete_clearing_root_inode(objs):
+    if isinstance(objs, models.Model):
+        objs = [objs]
+    collector = Collector(using=router.db_for_write(Xnode_V2))
+    collector.collect(objs)
+    xnode_ids = [xnode.id for xnode in collector.data.get(Xnode_V2, ())]
+    for queryset in collector.fast_deletes:
+        if queryset.model is Xnode_V2:
+            xnode_ids += list(queryset.values_list("id", flat=True))
+    with transaction.atomic(using=collector.using):
+        clear_root_inode_through(xnode_ids)
+        return collector.delete()
+
+
 #access through xnode_id and trace back the original inode
 def access_Resource(xnode_id: int) -> Xnode_V2:
-    xnode_List = Xnode_V2.objects.filter(id=xnode_id)
-    print(xnode_List)
-    if xnode_List.exists():
-        xnode = xnode_List.first()
-        if xnode.xnode_Type == Xnode_V2.XnodeType.INODE:
-            return xnode
-        elif xnode.xnode_Type == Xnode_V2.XnodeType.VNODE:
-            return access_Resource(xnode_id=xnode.node_information["link"])
-        elif xnode.xnode_Type == Xnode_V2.XnodeType.SNODE:
-            return access_Resource(xnode_id=xnode.node_information["inode_or_snode_id"])
-    else:
+    xnode = Xnode_V2.objects.select_related("root_inode").filter(id=xnode_id).first()
+    if xnode is None:
         return None
+    if xnode.xnode_Type == Xnode_V2.XnodeType.INODE:
+        return xnode
+    if xnode.root_inode is not None:
+        return xnode.root_inode
+
+    # Nodes created before root_inode existed: resolve once and remember it
+    inode, depth = walk_to_inode(xnode)
+    if inode is not None:
+        xnode.root_inode = inode
+        xnode.depth = depth
+        xnode.save(update_fields=["root_inode", "depth"])
+    return inode
     
+def access_Resources(xnodes) -> dict:
+    """Bulk access_Resource: {xnode.id: INODE or None} for already loaded xnodes."""
+    xnodes = list(xnodes)
+    root_ids = {x.root_inode_id for x in xnodes if x.root_inode_id is not None}
+    roots = Xnode_V2.objects.in_bulk(root_ids)
+    inodes = {}
+    unlinked = []
+    for xnode in xnodes:
+        if xnode.xnode_Type == Xnode_V2.XnodeType.INODE:
+            inodes[xnode.id] = xnode
+        elif xnode.root_inode_id in roots:
+            inodes[xnode.id] = roots[xnode.root_inode_id]
+        else:
+            unlinked.append(xnode)
+
+    # Nodes created before root_inode existed: resolve them together and remember it
+    remembered = []
+    walked = walk_to_inodes(unlinked)
+    for xnode in unlinked:
+        inode, depth = walked[xnode.id]
+        inodes[xnode.id] = inode
+        if inode is not None:
+            xnode.root_inode = inode
+            xnode.depth = depth
+            remembered.append(xnode)
+    if remembered:
+        Xnode_V2.objects.bulk_update(remembered, ["root_inode", "depth"])
+    return inodes
+
+
+# walk_to_inode for many xnodes at once, one query per level of the longest chain:
+# {xnode.id: (inode, depth)}, inode None for a broken chain
+def walk_to_inodes(xnodes) -> dict:
+    found = {}
+    pending = {xnode.id: (xnode, 0) for xnode in xnodes}
+    for _ in range(MAX_ACCESS_CHAIN_DEPTH):
+        if not pending:
+            break
+        parent_ids = {as_id(get_parent_xnode_id(node)) for node, _ in pending.values()}
+        parent_ids.discard(None)
+        parents = Xnode_V2.objects.select_related("root_inode").in_bulk(parent_ids)
+        next_pending = {}
+        for xnode_id, (node, depth) in pending.items():
+            parent = parents.get(as_id(get_parent_xnode_id(node)))
+            if parent is None:
+                found[xnode_id] = (None, depth)
+            elif parent.xnode_Type == Xnode_V2.XnodeType.INODE:
+                found[xnode_id] = (parent, depth + 1)
+            elif parent.root_inode is not None:
+                found[xnode_id] = (parent.root_inode, depth + 1 + parent.depth)
+            else:
+                next_pending[xnode_id] = (parent, depth + 1)
+        pending = next_pending
+    for xnode_id, (_, depth) in pending.items():
+        found[xnode_id] = (None, depth)  # longer than MAX_ACCESS_CHAIN_DEPTH (or a cycle)
+    return found
+
+
+def access_Resource_documents(xnodes) -> dict:
+    """
+    {xnode.id: (INODE, Resource)} for already loaded xnodes, in a fixed
+    number of queries; xnodes whose INODE or Resource is gone are left out.
+    """
+    inodes = access_Resources(xnodes)
+    resource_ids = {as_id(inode.node_information.get("resource_id")) for inode in inodes.values() if inode}
+    resource_ids.discard(None)
+    resources = Resource.objects.in_bulk(resource_ids)
+    documents = {}
+    for xnode_id, inode in inodes.items():
+        resource = resources.get(as_id(inode.node_information.get("resource_id"))) if inode else None
+        if resource is not None:
+            documents[xnode_id] = (inode, resource)
+    return documents
+
+
+# Longest VNODE/SNODE chain the recursive query will follow (guards against link cycles)
+MAX_ACCESS_CHAIN_DEPTH = 64
+
+# Parent pointers are only cast when they hold digits: an empty or malformed
+# link ends the chain there instead of aborting the transaction
+ACCESS_CHAIN_SQL = """
+    WITH RECURSIVE chain(id, parent_id, hop) AS (
+        SELECT x.id,
+               CASE
+                   WHEN x."xnode_Type" = 'VNODE' AND x.node_information->>'link' ~ '^[0-9]{{1,18}}$'
+                       THEN (x.node_information->>'link')::bigint
+                   WHEN x."xnode_Type" = 'SNODE' AND x.node_information->>'inode_or_snode_id' ~ '^[0-9]{{1,18}}$'
+                       THEN (x.node_information->>'inode_or_snode_id')::bigint
+               END,
+               0
+        FROM {table} x
+        WHERE x.id = %s
+      UNION ALL
+        SELECT p.id,
+               CASE
+                   WHEN p."xnode_Type" = 'VNODE' AND p.node_information->>'link' ~ '^[0-9]{{1,18}}$'
+                       THEN (p.node_information->>'link')::bigint
+                   WHEN p."xnode_Type" = 'SNODE' AND p.node_information->>'inode_or_snode_id' ~ '^[0-9]{{1,18}}$'
+                       THEN (p.node_information->>'inode_or_snode_id')::bigint
+               END,
+               c.hop + 1
+        FROM {table} p
+        JOIN chain c ON p.id = c.parent_id
+        WHERE c.hop < %s
+    )
+    SELECT id FROM chain ORDER BY hop
+"""
+
+
+# Fetch the xnode and all its ancestors up to the INODE with one recursive query (PostgreSQL only)
+def resolve_access_chain(xnode: Xnode_V2):
+    with db_connection.cursor() as cursor:
+        cursor.execute(
+            ACCESS_CHAIN_SQL.format(table=db_connection.ops.quote_name(Xnode_V2._meta.db_table)),
+            [xnode.id, MAX_ACCESS_CHAIN_DEPTH],
+        )
+        chain_ids = [row[0] for row in cursor.fetchall()]
+
+    nodes = Xnode_V2.objects.select_related("locker", "connection__connection_type").in_bulk(chain_ids)
+    return [nodes[node_id] for node_id in chain_ids if node_id in nodes]
+
+
+# Owner shown for a node in the access path
+def _path_user_id(node: Xnode_V2):
+    if node.xnode_Type in ["SNODE", "INODE"]:
+        return node.node_information.get("primary_owner")
+    return node.node_information.get("current_owner")
+
+
+def _access_path_step(current_node, parent_node, users):
+    conn = current_node.connection
+    from_user_id = _path_user_id(parent_node)
+    to_user_id = _path_user_id(current_node)
+    from_user = users.get(from_user_id)
+    to_user = users.get(to_user_id)
+
+    return {
+        "from_user": from_user.username if from_user else "unknown",
+        "from_user_id": from_user.user_id if from_user else None,
+        "to_user": to_user.username if to_user else "unknown",
+        "to_user_id": to_user.user_id if to_user else None,
+        "from_locker": getattr(parent_node.locker, 'name', 'unknown'),
+        "from_locker_id": parent_node.locker_id,
+        "to_locker": getattr(current_node.locker, 'name', 'unknown'),
+        "to_locker_id": current_node.locker_id,
+        "connection_type": conn.connection_type if conn else "Direct",
+        "connection_type_id": conn.connection_type_id if conn else None,
+        "via_node_type": current_node.xnode_Type
+    }
+
+
 # Build the access path from the initial xnode up to the root INODE
 def build_access_path_from_nodes(xnode: Xnode_V2):
+    if db_connection.vendor != "postgresql":
+        return build_access_path_by_walk(xnode)
+
+    chain = resolve_access_chain(xnode)
+    user_ids = set()
+    for node in chain:
+        user_id = _path_user_id(node)
+        if isinstance(user_id, int) or (isinstance(user_id, str) and user_id.isdigit()):
+            user_ids.add(int(user_id))
+    users = CustomUser.objects.in_bulk(user_ids)
+    users.update({str(user_id): user for user_id, user in users.items()})
+
+    access_path = []
+    for current_node, parent_node in zip(chain, chain[1:]):
+        if current_node.xnode_Type == "INODE":
+            break
+        access_path.append(_access_path_step(current_node, parent_node, users))
+
+    return list(reversed(access_path))
+
+
+# Hop-by-hop walker, used where recursive CTEs on JSON fields are not available (SQLite)
+def build_access_path_by_walk(xnode: Xnode_V2):
     access_path = []
     current_node = xnode
 
@@ -41,48 +315,14 @@ def build_access_path_from_nodes(xnode: Xnode_V2):
         except Xnode_V2.DoesNotExist:
             break
 
-        conn = current_node.connection
-
-        # Determine from_user_id
-        if parent_node.xnode_Type in ["SNODE", "INODE"]:
-            from_user_id = parent_node.node_information.get("primary_owner")
-        else:
-            from_user_id = parent_node.node_information.get("current_owner")
-
-        # Determine to_user_id
-        if current_node.xnode_Type in ["SNODE", "INODE"]:
-            to_user_id = current_node.node_information.get("primary_owner")
-        else:
-            to_user_id = current_node.node_information.get("current_owner")
-
-        # Get usernames
-        try:
-            from_user = CustomUser.objects.get(user_id=from_user_id).username
-        except CustomUser.DoesNotExist:
-            from_user = "unknown"
-
-        try:
-            to_user = CustomUser.objects.get(user_id=to_user_id).username
-        except CustomUser.DoesNotExist:
-            to_user = "unknown"
-
-        # Get locker names from each node (assumes node has locker FK)
-        from_locker = getattr(parent_node.locker, 'name', 'unknown')
-        to_locker = getattr(current_node.locker, 'name', 'unknown')
-
-        if conn:
-            conn_type = conn.connection_type
-        else:
-            conn_type = "Direct"
+        users = {}
+        for user_id in (_path_user_id(parent_node), _path_user_id(current_node)):
+            try:
+                users[user_id] = CustomUser.objects.get(user_id=user_id)
+            except (CustomUser.DoesNotExist, ValueError, TypeError):
+                pass
 
-        access_path.append({
-            "from_user": from_user,
-            "to_user": to_user,
-            "from_locker": from_locker,
-            "to_locker": to_locker,
-            "connection_type": conn_type,
-            "via_node_type": current_node.xnode_Type
-        })
+        access_path.append(_access_path_step(current_node, parent_node, users))
 
         current_node = parent_node
 
@@ -107,19 +347,11 @@ def format_access_path(access_path, accessing_user, resource_name, accessed_lock
 
 # Check if the xnode is approved for access
 def is_xnode_approved(connection, xnode_id):
-    approved_ids = []
-
-    for terms in filter(None, [connection.terms_value, connection.terms_value_reverse]):
-        for key, value in terms.items():
-            if not isinstance(value, str) or '|' not in value or ';' not in value:
-                continue
-            try:
-                _, rest = value.split("|")
-                x_id, status = rest.split(";")
-                if status.strip() == "T":
-                    approved_ids.append(x_id)
-            except ValueError:
-                continue
-
-    return str(xnode_id) in approved_ids
+    try:
+        xnode_id = int(xnode_id)
+    except (TypeError, ValueError):
+        return False
+    return ConnectionTermValue.objects.filter(
+        connection=connection, xnode_id=xnode_id, status=ConnectionTermValue.APPROVED, extra=False
+    ).exists()
 
@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+from django.conf import settings
+from pypdf import PdfReader, PdfWriter
+
+# Page count, size and content hash of a resource are read from the file once
+# (when it is registered or subsetted) and kept on the Resource row, so page
+# range checks never have to open the PDF again.
+
+METADATA_FIELDS = ["page_count", "file_size", "content_hash"]
+
+
+def local_resource_path(resource):
+    # Subset PDFs (and older uploads) live under MEDIA_ROOT, Drive files are stored by id
+    return os.path.join(settings.MEDIA_ROOT, resource.i_node_pointer).replace("\\", "/")
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def extract_pdf_metadata(path, page_count=None):
+    """page_count/file_size/content_hash of a local file; page_count is None if it is not a readable PDF."""
+    if page_count is None:
+        try:
+            page_count = len(PdfReader(path).pages)
+        except Exception as e:
+            print(f"Could not read pages of {path}: {e}")
+    return {
+        "page_count": page_count,
+        "file_size": os.path.getsize(path),
+        "content_hash": file_sha256(path),
+    }
+
+
+def write_pdf_subset(source_path, dest_path, from_page, to_page):
+    """
+    Writes pages from_page..to_page (1 based) of source_path to dest_path and
+    returns the new file's metadata. Runs in the subset process pool, so it
+    must not touch Django.
+    """
+    reader = PdfReader(source_path)
+    writer = PdfWriter()
+    for i in range(from_page - 1, to_page):
+        writer.add_page(reader.pages[i])
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as output_file:
+            writer.write(output_file)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return extract_pdf_metadata(dest_path, page_count=to_page - from_page + 1)
+
+
+def store_local_metadata(resource, path=None, page_count=None):
+    """Reads the metadata of the resource's local file and saves it; False if there is no file."""
+    path = path or local_resource_path(resource)
+    if not os.path.isfile(path):
+        return False
+    for field, value in extract_pdf_metadata(path, page_count=page_count).items():
+        setattr(resource, field, value)
+    resource.save(update_fields=METADATA_FIELDS)
+    return True
+
+
+def store_drive_metadata(resource, drive_service):
+    """
+    Saves size and Drive's md5 of a Drive backed resource. The page count of a
+    Drive file is not known without downloading it and is left empty.
+    """
+    meta = drive_service.files().get(
+        fileId=resource.i_node_pointer,
+        fields="size, md5Checksum",
+        supportsAllDrives=True,
+    ).execute()
+    resource.file_size = int(meta["size"]) if meta.get("size") else None
+    resource.content_hash = f"md5:{meta['md5Checksum']}" if meta.get("md5Checksum") else None
+    resource.save(update_fields=["file_size", "content_hash"])
+    return True
+
+
+def get_resource_page_count(resource):
+    """
+    Stored page count of a resource. Rows from before the metadata existed are
+    read once and saved; None if the resource has no local PDF.
+    """
+    if resource.page_count is not None:
+        return resource.page_count
+    if resource.content_hash is not None:
+        # Metadata was read already and found no pages (not a PDF, or a Drive file)
+        return None
+    store_local_metadata(resource)
+    return resource.page_count
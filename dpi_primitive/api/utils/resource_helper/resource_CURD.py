@@ -21,7 +21,6 @@ from api.models import Locker, Resource, CustomUser, Connection ,Notification ,
 from api.model.xnode_model import Xnode_V2
 from api.serializers import ResourceSerializer, XnodeV2Serializer
 from django.db import models
-from django.db.models import Q
 from api.serializers import ConnectionSerializer
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -35,7 +34,7 @@ import requests
 from django.http import StreamingHttpResponse, HttpResponse, JsonResponse
 from django.utils.http import http_date
 from django.utils.decorators import method_decorator
-from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.utils.resource_helper.access_resource_helper import access_Resource, clear_root_inode_through, parent_pointer_q
 
 
 # This function deletes a node and its descendants recursively
@@ -47,7 +46,7 @@ def delete_descendants(xnode):
 
     # Get all direct children
     child_nodes = Xnode_V2.objects.filter(
-        Q(node_information__link=xnode.id) | Q(node_information__inode_or_snode_id=xnode.id)
+        parent_pointer_q("link", [xnode.id]) | parent_pointer_q("inode_or_snode_id", [xnode.id])
     )
 
     for child in child_nodes:
@@ -75,6 +74,7 @@ def delete_descendants(xnode):
 
         delete_xnode_list.append(child.id)  # Add child to deletion list
         print(f"Deleting child Xnode: {child.id} ({child.xnode_Type})")
+        clear_root_inode_through([child.id])
         child.delete()  # Delete child node
 
     return delete_xnode_list
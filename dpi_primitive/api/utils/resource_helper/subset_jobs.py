@@ -0,0 +1,271 @@
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.model.xnode_model import Xnode_V2
+from api.models import Resource, SubsetJob
+from api.utils.resource_helper.access_resource_helper import access_Resource
+from api.utils.resource_helper.document_metadata import (
+    extract_pdf_metadata,
+    METADATA_FIELDS,
+    write_pdf_subset,
+)
+
+# create_subset_resource queues a SubsetJob; the page copying runs in a process
+# pool (pypdf is CPU bound and would hold the GIL of the web worker) and the
+# Resource/INODE are created when the file is ready. Subsets of the same
+# source file and page range are written once to a shared file and reused.
+
+# Queued/running jobs older than this are assumed lost with their process
+SUBSET_JOB_STALE_AFTER = timedelta(minutes=15)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Results are saved from one thread of the web process, not the pool's callback thread
+_finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="subset-finish")
+_inflight = {}  # (source_id, from_page, to_page, source_hash) -> future
+_inflight_lock = threading.Lock()
+
+
+def subset_jobs_async():
+    # SUBSET_JOBS_ASYNC = False writes subsets inside the request
+    return getattr(settings, "SUBSET_JOBS_ASYNC", True)
+
+
+def _subset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "SUBSET_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def subset_output_path(source, from_page, to_page):
+    """Relative path of the shared subset file of a source version and page range."""
+    digest = (source.content_hash or "").split(":")[-1][:12] or "nohash"
+    return os.path.join("documents", "subsets", f"{source.resource_id}_{from_page}-{to_page}_{digest}.pdf")
+
+
+def serialize_subset_job(job):
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "source_resource_id": job.source_id,
+        "from_page": job.from_page,
+        "to_page": job.to_page,
+        "resource_name": job.resource_name,
+        "reused": job.reused,
+        "subset_resource_id": job.subset_resource_id,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def is_stale_subset_job(job, stale_after=SUBSET_JOB_STALE_AFTER):
+    return (
+        job.status in (SubsetJob.Status.QUEUED, SubsetJob.Status.RUNNING)
+        and job.created_at < timezone.now() - stale_after
+    )
+
+
+def fail_stale_subset_jobs(stale_after=SUBSET_JOB_STALE_AFTER):
+    return SubsetJob.objects.filter(
+        status__in=[SubsetJob.Status.QUEUED, SubsetJob.Status.RUNNING],
+        created_at__lt=timezone.now() - stale_after,
+    ).update(
+        status=SubsetJob.Status.FAILED,
+        error="Subset generation did not finish",
+        finished_at=timezone.now(),
+    )
+
+
+def _reusable_metadata(source, from_page, to_page, output_path):
+    # Metadata of an already generated subset file, None if it has to be written
+    if not os.path.isfile(os.path.join(settings.MEDIA_ROOT, output_path)):
+        return None
+    generated = SubsetJob.objects.filter(
+        source=source,
+        from_page=from_page,
+        to_page=to_page,
+        source_hash=source.content_hash,
+        output_path=output_path,
+        status=SubsetJob.Status.SUCCEEDED,
+    ).exists()
+    if not generated:
+        return None
+    existing = (
+        Resource.objects.filter(i_node_pointer=output_path, content_hash__isnull=False)
+        .values(*METADATA_FIELDS)
+        .first()
+    )
+    return existing or extract_pdf_metadata(
+        os.path.join(settings.MEDIA_ROOT, output_path), page_count=to_page - from_page + 1
+    )
+
+
+def enqueue_subset_job(source, xnode_id, from_page, to_page, resource_name, requested_by=None):
+    """
+    Queues a subset of source. The returned job is already finished when an
+    earlier job generated the same subset or SUBSET_JOBS_ASYNC is off.
+    """
+    fail_stale_subset_jobs()
+    output_path = subset_output_path(source, from_page, to_page)
+    job = SubsetJob.objects.create(
+        source=source,
+        source_hash=source.content_hash,
+        xnode_id=xnode_id,
+        from_page=from_page,
+        to_page=to_page,
+        resource_name=resource_name,
+        output_path=output_path,
+        requested_by=requested_by,
+    )
+
+    metadata = _reusable_metadata(source, from_page, to_page, output_path)
+    if metadata is not None:
+        print(f"Subset job {job.job_id} reuses {output_path}")
+        finish_subset_job(job.job_id, metadata, reused=True)
+        job.refresh_from_db()
+        return job
+
+    source_path = os.path.join(settings.MEDIA_ROOT, source.i_node_pointer)
+    dest_path = os.path.join(settings.MEDIA_ROOT, output_path)
+    if not subset_jobs_async():
+        try:
+            metadata = write_pdf_subset(source_path, dest_path, from_page, to_page)
+        except Exception as e:
+            traceback.print_exc()
+            fail_subset_job(job.job_id, str(e))
+        else:
+            finish_subset_job(job.job_id, metadata)
+        job.refresh_from_db()
+        return job
+
+    # Requests for a range that is being written wait for the same future
+    key = (source.resource_id, from_page, to_page, source.content_hash)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        reused = future is not None
+        if future is None:
+            future = _subset_pool().submit(write_pdf_subset, source_path, dest_path, from_page, to_page)
+            _inflight[key] = future
+            future.add_done_callback(lambda _f: _forget_inflight(key))
+
+    job.status = SubsetJob.Status.RUNNING
+    job.reused = reused
+    job.save(update_fields=["status", "reused"])
+    future.add_done_callback(lambda f: _finisher.submit(_finish_from_future, job.job_id, f, reused))
+    return job
+
+
+def _forget_inflight(key):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+
+def _finish_from_future(job_id, future, reused):
+    try:
+        try:
+            metadata = future.result()
+        except Exception as e:
+            print(f"Subset job {job_id} failed: {e}")
+            fail_subset_job(job_id, str(e))
+        else:
+            finish_subset_job(job_id, metadata, reused=reused)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        connection.close()
+
+
+def fail_subset_job(job_id, error):
+    SubsetJob.objects.filter(job_id=job_id).update(
+        status=SubsetJob.Status.FAILED,
+        error=error,
+        finished_at=timezone.now(),
+    )
+
+
+def finish_subset_job(job_id, metadata, reused=False):
+    """Registers the generated file as a new Resource/INODE, like an uploaded resource."""
+    with transaction.atomic():
+        job = SubsetJob.objects.select_for_update().select_related("source__owner", "source__locker").get(job_id=job_id)
+        source = job.source
+
+        if Resource.objects.filter(document_name=job.resource_name, locker=source.locker).exists():
+            fail_subset_job(job_id, "A resource with this name already exists in this locker.")
+            return None
+        original_inode = access_Resource(xnode_id=job.xnode_id)
+        if not original_inode:
+            fail_subset_job(job_id, f"No INODE found for xnode_id: {job.xnode_id}")
+            return None
+
+        subset_resource = Resource.objects.create(
+            document_name=job.resource_name,
+            i_node_pointer=job.output_path,
+            locker=source.locker,
+            owner=source.owner,
+            type=source.type,
+            validity_time=source.validity_time,
+            page_count=metadata["page_count"],
+            file_size=metadata["file_size"],
+            content_hash=metadata["content_hash"],
+        )
+
+        resource_url = os.path.join(settings.MEDIA_URL, job.output_path)
+
+        # Create Xnode_V2 (INODE)
+        subset_xnode = Xnode_V2.objects.create(
+            locker=source.locker,
+            created_at=timezone.now(),
+            validity_until=source.validity_time.isoformat(),
+            xnode_Type=Xnode_V2.XnodeType.INODE,
+            creator=source.owner.user_id,
+            post_conditions=original_inode.post_conditions,
+            snode_list=[],
+            vnode_list=[],
+            node_information={
+                "resource_id": subset_resource.resource_id,
+                "method_name": "subset",
+                "method_params": {},
+                "resourse_link": resource_url,
+                "resource_name": subset_resource.document_name,
+                "primary_owner": subset_resource.owner.user_id,
+                "current_owner": subset_resource.owner.user_id
+            },
+        )
+
+        job.status = SubsetJob.Status.SUCCEEDED
+        job.reused = reused
+        job.subset_resource = subset_resource
+        job.finished_at = timezone.now()
+        job.result = {
+            "success": True,
+            "document_name": job.resource_name,
+            "resource_url": resource_url,
+            "ID_Of_Xnode_Created": subset_xnode.id,
+            "validity_until": subset_resource.validity_time.isoformat(),
+            "primary_owner": {
+                "id": subset_resource.owner.user_id,
+                "username": subset_resource.owner.username
+            },
+            "current_owner": {
+                "id": subset_resource.owner.user_id,
+                "username": subset_resource.owner.username,
+            }
+        }
+        job.save(update_fields=["status", "reused", "subset_resource", "finished_at", "result"])
+    print(f"Subset job {job.job_id} created resource {subset_resource.resource_id}")
+    return job
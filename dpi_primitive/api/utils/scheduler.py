@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+import traceback
+import zlib
+
+from django.db import connection
+from django.utils.module_loading import import_string
+
+# In-process replacement for django-crontab: `manage.py run_scheduler` loads
+# Django once and runs the SCHEDULED_TASKS from api/tasks.py on jittered
+# intervals. A task is never started again while its previous run is still
+# going, in this process or (on PostgreSQL, via an advisory lock) in another
+# scheduler.
+
+
+def _try_task_lock(name):
+    # Cross-process overlap protection; other databases only get the in-process flag
+    if connection.vendor != "postgresql":
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [zlib.crc32(name.encode())])
+        return cursor.fetchone()[0]
+
+
+def _release_task_lock(name):
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [zlib.crc32(name.encode())])
+
+
+class PeriodicTask:
+    def __init__(self, path, interval, jitter=0.1):
+        self.path = path
+        self.name = path.rsplit(".", 1)[-1]
+        self.interval = interval
+        self.jitter = jitter
+        self.func = import_string(path)
+        self.next_run = time.monotonic() + random.uniform(0, min(interval * jitter, 30))
+        self.running = False
+        self._lock = threading.Lock()
+        self.metrics = {
+            "runs": 0,
+            "failures": 0,
+            "skipped": 0,  # due while still running (here or in another scheduler)
+            "last_duration": None,
+            "max_duration": 0.0,
+            "total_duration": 0.0,
+            "last_error": None,
+        }
+
+    def schedule_next(self):
+        spread = self.interval * self.jitter
+        self.next_run = time.monotonic() + self.interval + random.uniform(-spread, spread)
+
+    def stats(self):
+        with self._lock:
+            runs = self.metrics["runs"]
+            return dict(
+                self.metrics,
+                avg_duration=self.metrics["total_duration"] / runs if runs else None,
+                running=self.running,
+            )
+
+    def start(self):
+        """Runs the task in a thread unless its previous run is still going; False if skipped."""
+        with self._lock:
+            if self.running:
+                self.metrics["skipped"] += 1
+                return False
+            self.running = True
+        thread = threading.Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        thread.start()
+        return True
+
+    def _run(self):
+        started = time.monotonic()
+        locked = False
+        error = None
+        try:
+            locked = _try_task_lock(self.path)
+            if not locked:
+                with self._lock:
+                    self.metrics["skipped"] += 1
+                print(f"[scheduler] {self.name} is running in another scheduler, skipped.")
+                return
+            self.func()
+        except Exception as e:
+            error = repr(e)
+            traceback.print_exc()
+        finally:
+            if locked:
+                try:
+                    _release_task_lock(self.path)
+                except Exception:
+                    traceback.print_exc()
+            connection.close()
+            duration = time.monotonic() - started
+            with self._lock:
+                self.running = False
+                if locked:
+                    self.metrics["runs"] += 1
+                    self.metrics["last_duration"] = duration
+                    self.metrics["max_duration"] = max(self.metrics["max_duration"], duration)
+                    self.metrics["total_duration"] += duration
+                    if error:
+                        self.metrics["failures"] += 1
+                        self.metrics["last_error"] = error
+            if locked:
+                print(f"[scheduler] {self.name} {'failed' if error else 'finished'} in {duration:.2f}s")
+
+
+class Scheduler:
+    def __init__(self, tasks, tick=1.0):
+        self.tasks = tasks
+        self.tick = tick
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pending(self):
+        now = time.monotonic()
+        for task in self.tasks:
+            if task.next_run <= now:
+                task.start()
+                task.schedule_next()
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            wait = min(task.next_run for task in self.tasks) - time.monotonic()
+            self._stop.wait(max(min(wait, self.tick), 0.05))
+
+    def wait_idle(self, timeout=None):
+        # Waits for the running tasks to finish (used on shutdown and by --once)
+        deadline = time.monotonic() + timeout if timeout else None
+        while any(task.running for task in self.tasks):
+            if deadline and time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def stats(self):
+        return {task.path: task.stats() for task in self.tasks}
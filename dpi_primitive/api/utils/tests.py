@@ -1,3 +1,264 @@
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection as db_connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.connection_type.views.connectionType_CURD import edit_delete_connectiontype_details
+from api.locker.views.Delete_update_locker import delete_Update_Locker
+from api.model.xnode_model import Xnode_V2
+from api.models import Connection, ConnectionType, CustomUser, GoogleAuthToken, Locker
+from api.tasks import check_connections_valid_until
+from api.utils.google_drive_helper import token_broker
+from api.utils.resource_helper.access_resource_helper import (
+    access_Resource,
+    build_access_path_by_walk,
+    build_access_path_from_nodes,
+    link_root_inode,
+)
+
+
+class XnodeChainMixin:
+    """
+    Four users each with one locker, connected in a line l1 -> l2 -> l3 -> l4,
+    every connection of its own connection type, and helpers that build xnodes
+    the way the sharing views do (parent pointer, vnode_list/snode_list, root_inode).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create(username=f"user{i}", email=f"user{i}@example.com") for i in range(1, 5)
+        ]
+        cls.lockers = [Locker.objects.create(name=f"locker{i}", user=user) for i, user in enumerate(cls.users, 1)]
+        cls.connections = []
+        for host, guest in zip(range(3), range(1, 4)):
+            connection_type = ConnectionType.objects.create(
+                connection_type_name=f"type{host + 1}",
+                owner_user=cls.users[host],
+                owner_locker=cls.lockers[host],
+            )
+            cls.connections.append(Connection.objects.create(
+                connection_name=f"conn{host + 1}{guest + 1}",
+                connection_type=connection_type,
+                host_user=cls.users[host],
+                host_locker=cls.lockers[host],
+                guest_user=cls.users[guest],
+                guest_locker=cls.lockers[guest],
+            ))
+
+    def xnode(self, xnode_type, locker, connection=None, **node_information):
+        return Xnode_V2.objects.create(
+            locker=locker,
+            connection=connection,
+            creator=locker.user_id,
+            created_at=timezone.now(),
+            validity_until=timezone.now() + timedelta(days=10),
+            xnode_Type=xnode_type,
+            node_information=node_information,
+        )
+
+    def inode(self, locker):
+        return self.xnode(
+            Xnode_V2.XnodeType.INODE, locker,
+            resource_id=1, primary_owner=locker.user_id, current_owner=locker.user_id,
+        )
+
+    def vnode(self, parent, locker, connection):
+        vnode = self.xnode(Xnode_V2.XnodeType.VNODE, locker, connection, link=parent.id, current_owner=locker.user_id)
+        self._list_under(parent, vnode, "vnode_list", Xnode_V2.XnodeType.VNODE, "link")
+        link_root_inode(vnode, parent)
+        return vnode
+
+    def snode(self, parent, locker, connection):
+        snode = self.xnode(
+            Xnode_V2.XnodeType.SNODE, locker, connection,
+            inode_or_snode_id=parent.id, primary_owner=locker.user_id, current_owner=locker.user_id,
+        )
+        self._list_under(parent, snode, "snode_list", Xnode_V2.XnodeType.SNODE, "inode_or_snode_id")
+        link_root_inode(snode, parent)
+        return snode
+
+    def _list_under(self, parent, child, field, chain_type, parent_key):
+        # The new node is listed on its parent and on every node of chain_type above it
+        node = parent
+        while node is not None:
+            node.refresh_from_db()
+            setattr(node, field, getattr(node, field) + [child.id])
+            node.save(update_fields=[field])
+            if node.xnode_Type != chain_type:
+                break
+            parent_id = node.node_information.get(parent_key)
+            node = Xnode_V2.objects.filter(id=parent_id).first() if isinstance(parent_id, int) else None
+
+
+class RootInodeInvalidationTests(XnodeChainMixin, TestCase):
+    def setUp(self):
+        # inode (l1) -> v1 (l2, conn12) -> v2 (l3, conn23) -> v3 (l4, conn34)
+        self.inode_node = self.inode(self.lockers[0])
+        self.v1 = self.vnode(self.inode_node, self.lockers[1], self.connections[0])
+        self.v2 = self.vnode(self.v1, self.lockers[2], self.connections[1])
+        self.v3 = self.vnode(self.v2, self.lockers[3], self.connections[2])
+
+    def assertResolves(self, xnodes, inode):
+        for xnode in xnodes:
+            with self.subTest(xnode=xnode.id):
+                self.assertEqual(access_Resource(xnode.id), inode)
+
+    def test_stored_root_inode_is_one_lookup(self):
+        self.assertEqual(self.v3.root_inode_id, self.inode_node.id)
+        self.assertEqual(self.v3.depth, 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(access_Resource(self.v3.id), self.inode_node)
+
+    def test_unrelated_delete_keeps_the_chain(self):
+        expired = Connection.objects.create(
+            connection_name="expired",
+            connection_type=self.connections[0].connection_type,
+            host_user=self.users[0],
+            host_locker=self.lockers[0],
+            guest_user=self.users[1],
+            guest_locker=self.lockers[1],
+            validity_time=timezone.now() - timedelta(days=1),
+        )
+        other = self.vnode(self.inode_node, self.lockers[1], expired)
+        check_connections_valid_until()
+        self.assertFalse(Xnode_V2.objects.filter(id=other.id).exists())
+        self.assertResolves([self.v1, self.v2, self.v3], self.inode_node)
+
+    def test_connection_expiry_breaks_the_chain(self):
+        Connection.objects.filter(pk=self.connections[0].pk).update(validity_time=timezone.now() - timedelta(days=1))
+        check_connections_valid_until()
+        self.assertFalse(Xnode_V2.objects.filter(id=self.v1.id).exists())
+        self.assertResolves([self.v2, self.v3], None)
+
+    def test_connection_type_delete_breaks_the_chain(self):
+        request = APIRequestFactory().delete(
+            "/", {"connection_type_id": self.connections[0].connection_type_id}, format="json"
+        )
+        force_authenticate(request, user=self.users[0])
+        response = edit_delete_connectiontype_details(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Xnode_V2.objects.filter(id=self.v1.id).exists())
+        self.assertResolves([self.v2, self.v3], None)
+
+    def test_locker_delete_breaks_the_chain(self):
+        request = APIRequestFactory().delete("/", {"locker_name": self.lockers[1].name}, format="json")
+        force_authenticate(request, user=self.users[1])
+        response = delete_Update_Locker(request)
+        self.assertEqual(response.status_code, 200)
+        # v2 goes with conn23, which was made from locker2
+        self.assertFalse(Xnode_V2.objects.filter(id__in=[self.v1.id, self.v2.id]).exists())
+        self.assertResolves([self.v3], None)
+
+    def test_inode_delete_breaks_the_chain(self):
+        self.inode_node.delete()
+        self.assertResolves([self.v1, self.v2, self.v3], None)
+
+    def test_clearing_follows_snode_and_vnode_lists(self):
+        # inode (l1) -> s1 (l2, conn12) -> s2 (l3, conn23) -> v (l4, conn34):
+        # v is listed on s2 only, so it is reached through s1's snode_list
+        inode_node = self.inode(self.lockers[0])
+        s1 = self.snode(inode_node, self.lockers[1], self.connections[0])
+        s2 = self.snode(s1, self.lockers[2], self.connections[1])
+        vnode = self.vnode(s2, self.lockers[3], self.connections[2])
+        self.assertResolves([s1, s2, vnode], inode_node)
+
+        Connection.objects.filter(pk=self.connections[0].pk).update(validity_time=timezone.now() - timedelta(days=1))
+        check_connections_valid_until()
+        self.assertResolves([s2, vnode], None)
+
+
+@unittest.skipUnless(db_connection.vendor == "postgresql", "the recursive access chain query needs PostgreSQL")
+class AccessChainQueryTests(XnodeChainMixin, TestCase):
+    def assertSamePath(self, xnode):
+        xnode.refresh_from_db()
+        walked = build_access_path_by_walk(xnode)
+        self.assertEqual(build_access_path_from_nodes(xnode), walked)
+        return walked
+
+    def test_matches_the_walk(self):
+        inode_node = self.inode(self.lockers[0])
+        v1 = self.vnode(inode_node, self.lockers[1], self.connections[0])
+        v2 = self.vnode(v1, self.lockers[2], self.connections[1])
+        s1 = self.snode(inode_node, self.lockers[1], self.connections[0])
+        s2 = self.snode(s1, self.lockers[2], self.connections[1])
+        sv = self.vnode(s2, self.lockers[3], self.connections[2])
+
+        # node, number of steps in its access path
+        cases = [(inode_node, 0), (v1, 1), (v2, 2), (s1, 1), (s2, 2), (sv, 3)]
+        for xnode, steps in cases:
+            with self.subTest(xnode=xnode.xnode_Type, steps=steps):
+                path = self.assertSamePath(xnode)
+                self.assertEqual(len(path), steps)
+        path = self.assertSamePath(sv)
+        self.assertEqual(
+            [(step["from_user_id"], step["to_user_id"]) for step in path],
+            [(user.user_id, next_user.user_id) for user, next_user in zip(self.users, self.users[1:])],
+        )
+
+    def test_broken_chain_matches_the_walk(self):
+        inode_node = self.inode(self.lockers[0])
+        v1 = self.vnode(inode_node, self.lockers[1], self.connections[0])
+        v2 = self.vnode(v1, self.lockers[2], self.connections[1])
+        v3 = self.vnode(v2, self.lockers[3], self.connections[2])
+        Xnode_V2.objects.filter(id=v1.id).delete()
+        self.assertEqual(len(self.assertSamePath(v3)), 1)
+
+    def test_query_count_does_not_grow_with_depth(self):
+        node = self.inode(self.lockers[0])
+        for _ in range(6):
+            node = self.vnode(node, self.lockers[1], self.connections[0])
+        node.refresh_from_db()
+        with self.assertNumQueries(3):
+            self.assertEqual(len(build_access_path_from_nodes(node)), 6)
+
+    def test_malformed_parent_pointer_ends_the_chain(self):
+        inode_node = self.inode(self.lockers[0])
+        for link in ["", "abc", "12abc", None, "99999999999999999999"]:
+            with self.subTest(link=link):
+                vnode = self.xnode(Xnode_V2.XnodeType.VNODE, self.lockers[1], self.connections[0], link=link)
+                child = self.xnode(Xnode_V2.XnodeType.VNODE, self.lockers[2], self.connections[1], link=vnode.id)
+                self.assertEqual(len(build_access_path_from_nodes(child)), 1)
+                # the transaction is still usable
+                self.assertTrue(Xnode_V2.objects.filter(id=inode_node.id).exists())
+
+
+class GoogleTokenBrokerTests(TestCase):
+    # Each GoogleTokenBroker stands for the broker of one server process
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username="owner", email="owner@example.com")
+
+    def token(self, expires_in):
+        return GoogleAuthToken.objects.create(
+            user=self.user,
+            access_token="access",
+            refresh_token="refresh",
+            expires_at=timezone.now() + expires_in,
+        )
+
+    def test_other_process_is_served_from_the_shared_cache(self):
+        self.token(timedelta(hours=1))
+        self.assertEqual(token_broker.GoogleTokenBroker().get_token(self.user), "access")
+
+        other = token_broker.GoogleTokenBroker()
+        self.assertEqual(other.get_token(self.user), "access")
+        self.assertEqual(other.stats()["cache_hits"], 1)
+        self.assertEqual(other.stats()["misses"], 0)
+
+    def test_refresh_lock_of_other_process_is_respected(self):
+        self.token(-timedelta(minutes=1))
+        cache.add(f"google_token:{self.user.pk}:refreshing", True, token_broker.GOOGLE_TOKEN_LOCK_TIMEOUT)
 
-# Create your tests here.
+        broker = token_broker.GoogleTokenBroker()
+        with mock.patch.object(token_broker, "GOOGLE_TOKEN_WAIT_TIMEOUT", 0.3), \
+                mock.patch.object(token_broker.requests, "post") as post:
+            self.assertIsNone(broker.get_token(self.user))
+        post.assert_not_called()
+        self.assertEqual(broker.stats()["waits"], 1)
@@ -2,145 +2,138 @@
 
 
 from http import HTTPStatus
-from django.http import JsonResponse,HttpRequest
 from django.utils import timezone
+from django.db import transaction
 from api.models import Locker, CustomUser, Connection, Resource, Notification, ConnectionType, ConnectionTerms
-from api.model.xnode_model import Xnode_V2
+from api.model.xnode_model import Xnode_V2, XnodeProvenance
+from django.db.models import Max, Min
 from datetime import timedelta
 
 def get_provenance_stack(xnode, connection, share_type, xnode_id):
-    xnode = Xnode_V2.objects.get(id=xnode)
-    print("xnode provenance:")
-    print(xnode.provenance_stack)
-    print("details")
-    print(f"connection: {connection}, xnode_id = {xnode_id}, t_o_s = {str(xnode.provenance_stack[0]['type_of_share']).lower()}")
-    
-    for item in xnode.provenance_stack:
-        conn = item.get('connection')
-        print(f"l {connection} l connection:{conn}")
-        x_id = item.get('xnode_id')
-        print(f"l {xnode_id} l xnode_id:{x_id}")
-        type_o_s =  item.get('type_of_share', '')
-        print(f"l {type_o_s} l type_of_share:{type_o_s}")
-        # if str(conn) == str(connection):
-        if str(x_id) == str(xnode_id):
-            if type_o_s == share_type:
-                print("---------")
-                print(f"item:{item}")
-                return {
-                    "connection": item.get("connection"),
-                    "from_user": item.get("from_user"),
-                    "to_user": item.get("to_user"),
-                    "from_locker": item.get("from_locker"),
-                    "to_locker": item.get("to_locker"),
-                    "type_of_share": item.get("type_of_share"),
-                    "reverse": item.get("reverse"),
-                    "xnode_id": item.get("xnode_id"),
-                    "xnode_post_conditions": item.get("xnode_post_conditions")
-                }
-            else:
-                print("share not matched")
-        else:
-            print("xnode id not matched")
-        # else:
-        #     print("connection not matched")
-
-    return None  # Return None if no match found
-
-def delete_vnode(target, connections, notification_message):
     try:
-        target = int(target)
-        # Build mapping from child -> parent and parent -> list of children
-        child_to_parent = {}
-        parent_to_children = {}
-
-        for relation in connections:
-            for child, parent in relation.items():
-                child_to_parent[int(child)] = int(parent)
-                parent_to_children.setdefault(int(parent), []).append(int(child))
-
-        deleted_pairs = []
-        print(f"child_to_parent: {child_to_parent}")
-        print(f"parent_to_children: {parent_to_children}")
-        def delete_recursively(node):
-            # Get children of the current node
-            children = parent_to_children.get(node, [])
-            print(f"children: {children}")
-            print("he 1 re")
-            for child in children:
-                # Recurse if the child has further children
-                if child in parent_to_children:
-                    print(f"he 2 re {child}")
-                    delete_recursively(child)
-                print("he 3 re")
-                child_xnode = Xnode_V2.objects.get(id=int(child))
-                parent_xnode = Xnode_V2.objects.get(id=int(child_to_parent[child]))
-                p_stack = get_provenance_stack(parent_xnode.id, parent_xnode.connection, "Share", child_xnode.id)
-                link_connection = Connection.objects.get(connection_id=p_stack.get("connection"))
-                print("he 4 re")
-                Notification.objects.create(
-                    connection=link_connection,
-                    guest_user= CustomUser.objects.get(user_id=p_stack.get("to_user")),
-                    host_user= CustomUser.objects.get(user_id=p_stack.get("to_user")),
-                    guest_locker= Locker.objects.get(locker_id=p_stack.get("to_locker")),
-                    host_locker= Locker.objects.get(locker_id=p_stack.get("to_locker")),
-                    connection_type=link_connection.connection_type, 
-                    created_at=timezone.now(),
-                    message=notification_message,
-                    notification_type="node_deleted",
-                    target_type="xnode",
-                    target_id=str(child_xnode.id),
-                    extra_data={
-                        "xnode_id": child_xnode.id,
-                        "xnode_type": child_xnode.xnode_Type,
-                        "locker_id": p_stack.get("to_locker"),
-                        "locker_name": Locker.objects.get(locker_id=p_stack.get("to_locker")).name,
-                        "user_id": p_stack.get("to_user"),
-                        "username": CustomUser.objects.get(user_id=p_stack.get("to_user")).username,
-                        "connection_id": link_connection.connection_id,
-                        "connection_name": link_connection.connection_name,
-                    }
-                )
-                print(f"Notification sent to {p_stack.get('to_user')} for affected locker {p_stack.get('to_locker')}")
-
-                try:
-                    temp_id = parent_xnode.id    
-                    while True:
-                        temp = Xnode_V2.objects.get(id=temp_id)
-                        print("here 4.6")
-                        if str(child_xnode.id) in map(str, temp.vnode_list):
-                            temp.vnode_list = [v for v in temp.vnode_list if str(v) != str(child_xnode.id)]
-                            temp.save(update_fields=["vnode_list"])
-                        if temp.xnode_Type == Xnode_V2.XnodeType.INODE or temp.xnode_Type == Xnode_V2.XnodeType.SNODE:
-                            break
-                        elif temp.xnode_Type == Xnode_V2.XnodeType.VNODE:
-                            temp_id = temp.node_information["link"]
-                        else:
-                            break  # or raise an error if other types should not appear
-                except Xnode_V2.DoesNotExist:
-                    return JsonResponse({"success": False, "error": "Inode does not exist"}, status=400)
-
-                child_xnode.delete()
-
-                # Then delete the leaf child
-                print(f"Deleting node: {child}")
-                deleted_pairs.append({child: child_to_parent[child]})
-                parent_to_children.pop(child, None)
-
-            # Finally delete the current node
-            # if node in child_to_parent:  # don't include the root if it's not a child
-            #     print(f"Deleting node: {node}")
-            #     deleted_pairs.append({node: child_to_parent[node]})
-            # parent_to_children.pop(node, None)
-
-        delete_recursively(target)
-        return deleted_pairs
-    except Exception as e:
-        print(f"error deleting vnodes {str(e)}")
-
-
-
-
+        xnode_id = int(xnode_id)
+    except (TypeError, ValueError):
+        return None
+    entry = XnodeProvenance.objects.filter(
+        xnode_id=xnode,
+        shared_xnode_id=xnode_id,
+        type_of_share=share_type,
+    ).first()
+    print(f"provenance of xnode {xnode} for {share_type} xnode_id={xnode_id}: {entry}")
+    if entry is None:
+        return None  # Return None if no match found
+    entry = entry.as_dict()
+    entry.pop("timestamp")
+    return entry
+
+def subtree_post_order(target, parent_to_children):
+    # Children before their parent, the order the old recursive deletion used
+    order = []
+    seen = {target}
+    stack = [(target, iter(parent_to_children.get(target, [])))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if node != target:
+                order.append(node)
+            continue
+        if child in seen:
+            continue
+        seen.add(child)
+        stack.append((child, iter(parent_to_children.get(child, []))))
+    return order
+
+
+def build_node_deleted_notifications(deletions):
+    """
+    deletions: list of (child_id, parent_id, xnode_type, message).
+    Returns unsaved "node_deleted" Notifications for the user/locker each child was
+    shared to (the "Share" provenance entry on its parent), using four queries in total.
+    """
+    provenance = {}
+    for entry in XnodeProvenance.objects.filter(
+        xnode_id__in={parent for _, parent, _, _ in deletions},
+        shared_xnode_id__in={child for child, _, _, _ in deletions},
+        type_of_share="Share",
+    ):
+        provenance.setdefault((entry.xnode_id, entry.shared_xnode_id), entry)
+
+    entries = [provenance.get((parent, child)) for child, parent, _, _ in deletions]
+    found = [entry for entry in entries if entry is not None]
+    connections_by_id = Connection.objects.select_related("connection_type").in_bulk(
+        {entry.connection for entry in found}
+    )
+    users = CustomUser.objects.in_bulk({entry.to_user for entry in found})
+    lockers = Locker.objects.in_bulk({entry.to_locker for entry in found})
+
+    notifications = []
+    for (child, _, xnode_type, message), entry in zip(deletions, entries):
+        link_connection = connections_by_id.get(entry.connection) if entry else None
+        user = users.get(entry.to_user) if entry else None
+        locker = lockers.get(entry.to_locker) if entry else None
+        if link_connection is None or user is None or locker is None:
+            print(f"No share provenance for node {child}, skipping notification")
+            continue
+        notifications.append(Notification(
+            connection=link_connection,
+            guest_user=user,
+            host_user=user,
+            guest_locker=locker,
+            host_locker=locker,
+            connection_type=link_connection.connection_type,
+            created_at=timezone.now(),
+            message=message,
+            notification_type="node_deleted",
+            target_type="xnode",
+            target_id=str(child),
+            extra_data={
+                "xnode_id": child,
+                "xnode_type": xnode_type,
+                "locker_id": locker.locker_id,
+                "locker_name": locker.name,
+                "user_id": user.user_id,
+                "username": user.username,
+                "connection_id": link_connection.connection_id,
+                "connection_name": link_connection.connection_name,
+            }
+        ))
+    return notifications
+
+
+def load_xnode_chains(start_ids, follow_type=None, parent_key=None):
+    """
+    Loads (and row locks) the xnodes in start_ids and every ancestor reached by
+    following node_information[parent_key] while the node is of follow_type.
+    One query per level of the chain; returns {id: xnode}.
+    """
+    xnodes = {}
+    frontier = {int(xnode_id) for xnode_id in start_ids if xnode_id is not None}
+    while frontier:
+        level = Xnode_V2.objects.select_for_update().in_bulk(frontier)
+        xnodes.update(level)
+        frontier = set()
+        for xnode in level.values():
+            if follow_type is None or xnode.xnode_Type != follow_type:
+                continue
+            parent_id = xnode.node_information.get(parent_key)
+            if parent_id is not None and int(parent_id) not in xnodes:
+                frontier.add(int(parent_id))
+    return xnodes
+
+
+def strip_xnode_list(xnodes, field, removed_ids):
+    # Drop removed_ids from the vnode_list/snode_list of each xnode, returns the changed ones
+    removed = {str(xnode_id) for xnode_id in removed_ids}
+    changed = []
+    for xnode in xnodes:
+        values = getattr(xnode, field)
+        kept = [v for v in values if str(v) not in removed]
+        if len(kept) != len(values):
+            setattr(xnode, field, kept)
+            changed.append(xnode)
+    return changed
 
 
 def get_defalut_validity():
@@ -227,60 +220,72 @@ class NodeLockChecker:
  ### This is the end of the NodeLockChecker class definition.
 
 
-def compute_terms_status(terms_value):
-    count_T = 0
-    count_F = 0
-    count_R = 0
-    filled = 0
-    empty = 0
-
-    if terms_value:
-        filtered_terms = {
-            key: value
-            for key, value in terms_value.items()
-            if key != "canShareMoreData"
-        }
-
-        for key, value in filtered_terms.items():
-            value = value.strip()
-            if value.endswith("; T") or value.endswith(";T"):
-                count_T += 1
-            elif value.endswith("; F") or value.endswith(";F"):
-                count_F += 1
-            elif value.endswith("; R") or value.endswith(";R"):
-                count_R += 1
-
-            stripped_value = (
-                value.rstrip("; T")
-                .rstrip(";T")
-                .rstrip("; F")
-                .rstrip(";F")
-                .rstrip("; R")
-                .rstrip(";R")
-                .strip()
-            )
-            if stripped_value:
-                filled += 1
-            else:
-                empty += 1
-
-        total_terms = count_T + count_F + count_R
-        if total_terms > 0:
-            empty = total_terms - filled
-    else:
-        total_terms = 0
-        empty = 0
-        filled = 0
+def compute_terms_status(connection):
+    """(summary of terms_value, summary of terms_value_reverse) of connection, from its stored counts."""
+    return connection.terms_status()
+
+
+def _provenance_entry_fields(entry):
+    def as_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
 
     return {
-        "count_T": count_T,
-        "count_F": count_F,
-        "count_R": count_R,
-        "empty": empty,
-        "filled": filled,
+        "connection": as_int(entry.get("connection")),
+        "from_locker": as_int(entry.get("from_locker")),
+        "to_locker": as_int(entry.get("to_locker")),
+        "from_user": as_int(entry.get("from_user")),
+        "to_user": as_int(entry.get("to_user")),
+        "type_of_share": entry.get("type_of_share") or "",
+        "shared_xnode_id": as_int(entry.get("xnode_id")),
+        "xnode_post_conditions": entry.get("xnode_post_conditions"),
+        "reverse": bool(entry.get("reverse", False)),
     }
 
 
+def _lock_provenance_stack(xnode_id):
+    # Lock the xnode row so concurrent pushes/appends do not read the same top/bottom position
+    Xnode_V2.objects.select_for_update().only("id").filter(id=xnode_id).first()
+
+
+def push_xnode_provenance(xnode_instance, entry):
+    """
+    Puts a provenance entry (old JSON dict shape) on top of the xnode's stack,
+    the equivalent of provenance_stack.insert(0, entry).
+    """
+    with transaction.atomic():
+        _lock_provenance_stack(xnode_instance.id)
+        top = XnodeProvenance.objects.filter(xnode_id=xnode_instance.id).aggregate(top=Min("position"))["top"]
+        return XnodeProvenance.objects.create(
+            xnode_id=xnode_instance.id,
+            position=(top - 1) if top is not None else 0,
+            **_provenance_entry_fields(entry),
+        )
+
+
+def copy_xnode_provenance(source_xnode, target_xnode):
+    """Copies the provenance stack of source_xnode onto a newly created target_xnode."""
+    XnodeProvenance.objects.bulk_create([
+        XnodeProvenance(
+            xnode_id=target_xnode.id,
+            position=entry.position,
+            connection=entry.connection,
+            from_locker=entry.from_locker,
+            to_locker=entry.to_locker,
+            from_user=entry.from_user,
+            to_user=entry.to_user,
+            type_of_share=entry.type_of_share,
+            shared_xnode_id=entry.shared_xnode_id,
+            xnode_post_conditions=entry.xnode_post_conditions,
+            reverse=entry.reverse,
+            created_at=entry.created_at,
+        )
+        for entry in XnodeProvenance.objects.filter(xnode_id=source_xnode.id)
+    ])
+
+
 def append_xnode_provenance(
     xnode_instance,
     connection_id,
@@ -293,30 +298,26 @@ def append_xnode_provenance(
     reverse
 ):
     """
-    Appends a full snapshot of the Xnode_V2 instance to the provenance stack.
+    Appends an entry to the bottom of the xnode's provenance stack.
     """
-    xnode = Xnode_V2.objects.get(id=xnode_instance.id)
-    # Serialize the full model instance as a dictionary
-    # serialized_data = json.loads(serializers.serialize("json", [xnode_instance]))[0]["fields"]
-
-    new_entry = {
-        "connection": connection_id,
-        "from_locker": from_locker,
-        "to_locker": to_locker,
-        "from_user": from_user,
-        "to_user": to_user,
-        "type_of_share": type_of_share,
-        "xnode_id": xnode_instance.id,
-        "xnode_post_conditions": xnode_post_conditions,
-        # "xnode_snapshot": serialized_data,  # 💾 Full snapshot here
-        "reverse": reverse
-    }
-
-    if not isinstance(xnode.provenance_stack, list):
-        xnode.provenance_stack = []
-
-    xnode.provenance_stack.append(new_entry)
-    xnode.save(update_fields=["provenance_stack"])
+    with transaction.atomic():
+        _lock_provenance_stack(xnode_instance.id)
+        bottom = XnodeProvenance.objects.filter(xnode_id=xnode_instance.id).aggregate(bottom=Max("position"))["bottom"]
+        XnodeProvenance.objects.create(
+            xnode_id=xnode_instance.id,
+            position=(bottom + 1) if bottom is not None else 0,
+            **_provenance_entry_fields({
+                "connection": connection_id,
+                "from_locker": from_locker,
+                "to_locker": to_locker,
+                "from_user": from_user,
+                "to_user": to_user,
+                "type_of_share": type_of_share,
+                "xnode_id": xnode_instance.id,
+                "xnode_post_conditions": xnode_post_conditions,
+                "reverse": reverse,
+            }),
+        )
 
 
 def remove_xnode_provenance_entry(
@@ -329,44 +330,19 @@ def remove_xnode_provenance_entry(
     xnode_id,
     type_of_share
 ):
-    xnode = Xnode_V2.objects.get(id=xnode_instance)
-    xnode.refresh_from_db()
-    # Ensure the provenance_stack is a list
-    if not isinstance(xnode.provenance_stack, list):
-        # print(error)
-        return  # or raise error if needed
-
-    # Define match criteria
-    def is_matching_entry(entry):
-        print("Parameters:", connection_id, from_locker, to_locker, from_user, to_user, type_of_share, xnode_id)
-        print("Checking entry:", entry)
-
-        try:
-            match = (
-                int(entry.get("connection")) == int(connection_id) and
-                int(entry.get("from_locker")) == int(from_locker) and
-                int(entry.get("to_locker")) == int(to_locker) and
-                int(entry.get("from_user")) == int(from_user) and
-                int(entry.get("to_user")) == int(to_user) and
-                entry.get("type_of_share") == type_of_share and
-                int(entry.get("xnode_id")) == int(xnode_id)
-            )
-
-            print("Match result:", match)
-            return match
-
-        except Exception as e:
-            print(f"Error in matching: {e}")
-            return False
-
-
-    original_len = len(xnode.provenance_stack)
-    xnode.provenance_stack = [
-        entry for entry in xnode.provenance_stack
-        if not is_matching_entry(entry)
-    ]
-    print(f"Removed {original_len - len(xnode.provenance_stack)} entries")
-
-    xnode.save(update_fields=["provenance_stack"])
-    xnode.refresh_from_db()
-    print("Updated provenance_stack:", xnode.provenance_stack)
+    print("Parameters:", connection_id, from_locker, to_locker, from_user, to_user, type_of_share, xnode_id)
+    try:
+        deleted, _ = XnodeProvenance.objects.filter(
+            xnode_id=int(xnode_instance),
+            shared_xnode_id=int(xnode_id),
+            type_of_share=type_of_share,
+            connection=int(connection_id),
+            from_locker=int(from_locker),
+            to_locker=int(to_locker),
+            from_user=int(from_user),
+            to_user=int(to_user),
+        ).delete()
+    except (TypeError, ValueError) as e:
+        print(f"Error in matching: {e}")
+        return
+    print(f"Removed {deleted} entries")
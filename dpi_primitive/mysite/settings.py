@@ -142,6 +142,16 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process, so the Google token broker's cached tokens and
+# refresh lock, and the invalidation of cached connection stats, hold across
+# processes. Create the table with `python manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 
 
 # Password validation
@@ -217,9 +227,53 @@ AUTHENTICATION_BACKENDS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CRONJOBS = [
-    ('*/5 * * * *', 'api.tasks.check_connections_valid_until')
+# Periodic tasks, run in-process by `python manage.py run_scheduler`: (task, interval in seconds).
+# Each run is shifted by up to SCHEDULER_JITTER of its interval.
+SCHEDULED_TASKS = [
+    ('api.tasks.check_connections_valid_until', 5 * 60),
+    ('api.tasks.close_expired_xnodes', 5 * 60),
+    ('api.tasks.fail_stale_subset_jobs', 5 * 60),
+    ('api.tasks.fail_stale_drive_jobs', 5 * 60),
 ]
+SCHEDULER_JITTER = 0.1
+
+# django-crontab is replaced by run_scheduler; left empty so `manage.py crontab remove`
+# still cleans up old crontab entries.
+CRONJOBS = []
+
+# check_connections_valid_until deletes expired connections (and their cascades) in
+# batches of this size, one transaction each, pausing between batches and stopping
+# after the time budget (seconds); whatever is left is deleted by the next run.
+CONNECTION_EXPIRY_BATCH_SIZE = 100
+CONNECTION_EXPIRY_TIME_BUDGET = 120
+CONNECTION_EXPIRY_PAUSE = 0.2
+
+# Drive copies of transfer/collateral approvals run inside the request by default.
+# Set to True to queue them instead (the approve endpoints then answer 202 with a job_id
+# to poll at sharing/drive-jobs/<job_id>/); this needs `python manage.py run_drive_jobs`.
+DRIVE_JOBS_ASYNC = False
+
+# Local chunk cache of Drive files served by resource/stream (video seeking etc.).
+# Least recently used chunks are evicted past the cap; 0 disables the cache.
+DRIVE_STREAM_CACHE_DIR = os.path.join(BASE_DIR, 'drive_cache', 'chunks')
+DRIVE_STREAM_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Exports of Google Docs/Sheets/Slides/Drawings, removed after a day without reads
+DRIVE_EXPORT_CACHE_DIR = os.path.join(BASE_DIR, 'drive_cache', 'exports')
+DRIVE_EXPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DRIVE_EXPORT_CACHE_MAX_AGE = 24 * 60 * 60
+
+# Subset PDFs (resource/create-subset) are written by a pool of SUBSET_WORKERS processes.
+# Set SUBSET_JOBS_ASYNC to False to write them inside the request.
+SUBSET_JOBS_ASYNC = True
+SUBSET_WORKERS = 2
+
+# dashboard/stats/ and locker/get-status/ read ConnectionStatsCounter instead of counting
+# Connection rows. Run `manage.py rebuild_connection_stats` before turning it on.
+CONNECTION_STATS_COUNTERS = False
+
+# Backend of the notification/stream/ pub/sub (api/notifications/services/pubsub.py).
+# Defaults to PostgresBroker (LISTEN/NOTIFY) on PostgreSQL; use InProcessBroker for a single process.
+NOTIFICATION_BROKER = "api.notifications.services.pubsub.PostgresBroker"
 
 #google
 # --------------------------
@@ -14,7 +14,7 @@ import { Viewer, Worker } from "@react-pdf-viewer/core"; // PDF Viewer
 import { TextField } from "@mui/material";
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faBars } from '@fortawesome/free-solid-svg-icons';
-import { apiFetch } from "../../utils/api.js";
+import { apiFetch, driveJobPath, jobResponseData } from "../../utils/api.js";
 import ViewerModal from "../Modal/IFrameModal.js";
 
 
@@ -1357,7 +1357,7 @@ useEffect(() => {
       //   throw new Error("Failed to transfer resource");
       // }
 
-      const data = response.data;
+      const data = await jobResponseData(response, driveJobPath);
       // console.log("transfer", data);
       if (data.success) {
         alert(data.message || "Resource transfered successful");
@@ -1483,7 +1483,7 @@ useEffect(() => {
       //   throw new Error("Failed to collateral resource");
       // }
 
-      const data = response.data;
+      const data = await jobResponseData(response, driveJobPath);
       if (data.success) {
         alert(data.message || "Resource pledged successful");
       } else {
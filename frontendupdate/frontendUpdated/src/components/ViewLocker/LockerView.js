@@ -2,7 +2,7 @@ import React from 'react';
 import Sidebar from "../Sidebar/Sidebar"
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faBars } from '@fortawesome/free-solid-svg-icons';
-import { apiFetch } from "../../utils/api";
+import { apiFetch, jobResponseData, subsetJobPath } from "../../utils/api";
 // import "./page2.css";
 import { useNavigate, useLocation } from 'react-router-dom';
 import { useState, useEffect, useContext } from "react"
@@ -1079,8 +1079,9 @@ export const LockerView = () => {
             }
             const response = await apiFetch.post(`/resource/create-subset/`, payload);
 
-            const data = response.data;
-            if (response.status >= 200 && response.status < 300) {
+            // 202: the subset is written in the background, wait for its job
+            const data = await jobResponseData(response, subsetJobPath);
+            if (data.success) {
                 alert("Subset resource created successfully!");
                 setTimeout(() => {
                     setShowSubsetModal(false);
@@ -18,7 +18,7 @@ import "@react-pdf-viewer/core/lib/styles/index.css";
 import { ConnectionContext } from "../../ConnectionContext";
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faBars } from '@fortawesome/free-solid-svg-icons';
-import { apiFetch } from "../../utils/api";
+import { apiFetch, jobResponseData, subsetJobPath } from "../../utils/api";
 import ViewerModal from "../Modal/IFrameModal.js";
 // import { Menu } from "lucide-react";
 
@@ -1036,8 +1036,9 @@ console.log(connections?.incoming_connections?.[0]?.guest_user.username)
       }
       const response = await apiFetch.post(`/resource/create-subset/`, payload);
 
-      const data = response.data;
-      if (response.status >= 200 && response.status < 300) {
+      // 202: the subset is written in the background, wait for its job
+      const data = await jobResponseData(response, subsetJobPath);
+      if (data.success) {
         alert("Subset resource created successfully!");
         setTimeout(() => {
           setShowSubsetModal(false);
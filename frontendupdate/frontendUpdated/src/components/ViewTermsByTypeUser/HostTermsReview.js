@@ -14,7 +14,7 @@ import { TextField } from "@mui/material";
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faBars } from '@fortawesome/free-solid-svg-icons';
 import Sidebar from "../Sidebar/Sidebar.js";
-import { apiFetch } from "../../utils/api";
+import { apiFetch, driveJobPath, jobResponseData } from "../../utils/api";
 import ViewerModal from "../Modal/IFrameModal.js";
 
 export const HostTermsReview = () => {
@@ -1257,7 +1257,7 @@ const handleCloseModalClose = () => {
         throw new Error("Failed to transfer resource");
       }
 
-      const data = response.data;
+      const data = await jobResponseData(response, driveJobPath);
       // console.log("transfer", data);
       if (data.success) {
         alert("Resource transfer successful");
@@ -1386,7 +1386,7 @@ const handleCloseModalClose = () => {
         throw new Error("Failed to collateral resource");
       }
 
-      const data = response.data;
+      const data = await jobResponseData(response, driveJobPath);
       console.log("transfer", data);
       if (data.success) {
         alert("Resource collateral successful");
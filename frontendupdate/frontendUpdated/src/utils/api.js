@@ -162,3 +162,31 @@ apiFetch.interceptors.response.use(
     return Promise.reject(error);
   }
 );
+
+// -------- Background jobs (DriveJob / SubsetJob) --------
+// Endpoints that run their work as a job answer 202 with a job_id. Polls the job's
+// status endpoint until it has finished and returns the body the endpoint would
+// have answered with; other responses are returned as they are.
+export async function jobResponseData(response, jobPath, { interval = 2000, timeout = 10 * 60 * 1000 } = {}) {
+  if (response.status !== 202 || !response.data.job_id) {
+    return response.data;
+  }
+
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, interval));
+    const { data } = await apiFetch.get(jobPath(response.data.job_id));
+    const job = data.job;
+    if (job.status === 'succeeded') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      const result = job.result || {};
+      return { ...result, success: false, error: result.error || job.error || 'The job failed' };
+    }
+  }
+  return { success: false, error: 'Timed out waiting for the job to finish' };
+}
+
+export const driveJobPath = (jobId) => `/sharing/drive-jobs/${jobId}/`;
+export const subsetJobPath = (jobId) => `/resource/subset-jobs/${jobId}/`;